@@ -156,7 +156,7 @@ def get_dtc_detail(
 
     sensors = execute_query(
         """SELECT name, sensor_type, typical_range, unit
-           FROM refined.sensors WHERE %s = ANY(related_dtc_codes)""",
+           FROM refined.sensors WHERE related_dtc_codes @> ARRAY[%s]""",
         (code,), fetch=True
     ) or []
 
@@ -65,7 +65,7 @@ def vector_search(req: SearchRequest):
                WHERE dc.embedding IS NOT NULL
                  AND (ce.trust_score IS NULL OR ce.trust_score >= %s)
                  AND (ce.relevance_score IS NULL OR ce.relevance_score >= %s)
-               ORDER BY dc.embedding <=> %s::vector
+               ORDER BY dc.embedding::halfvec(768) <=> %s::halfvec(768)
                LIMIT %s""",
             (embedding_str, req.min_trust, req.min_relevance,
              embedding_str, req.limit)
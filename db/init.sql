@@ -15,6 +15,7 @@ CREATE TABLE IF NOT EXISTS research.documents (
     title TEXT NOT NULL,
     source_url TEXT,
     content_hash TEXT NOT NULL,
+    raw_content_hash TEXT,
     mime_type TEXT DEFAULT 'text/plain',
     minio_bucket TEXT DEFAULT 'documents',
     minio_key TEXT,
@@ -29,6 +30,9 @@ CREATE INDEX IF NOT EXISTS idx_documents_stage
     ON research.documents(processing_stage);
 CREATE INDEX IF NOT EXISTS idx_documents_hash
     ON research.documents(content_hash);
+CREATE INDEX IF NOT EXISTS idx_documents_raw_hash
+    ON research.documents(raw_content_hash)
+    WHERE raw_content_hash IS NOT NULL;
 
 CREATE TABLE IF NOT EXISTS research.document_chunks (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -45,8 +49,35 @@ CREATE TABLE IF NOT EXISTS research.document_chunks (
 
 CREATE INDEX IF NOT EXISTS idx_chunks_document
     ON research.document_chunks(document_id);
-CREATE INDEX IF NOT EXISTS idx_chunks_embedding
-    ON research.document_chunks USING hnsw (embedding vector_cosine_ops);
+-- fp16 HNSW index (half the size of an fp32 one); semantic search
+-- orders by embedding::halfvec(768) to use it
+CREATE INDEX IF NOT EXISTS idx_chunks_embedding_half
+    ON research.document_chunks
+    USING hnsw ((embedding::halfvec(768)) halfvec_cosine_ops);
+
+-- Embedding vectors by model and SHA-256 of the chunk text
+CREATE TABLE IF NOT EXISTS research.embedding_cache (
+    model TEXT NOT NULL,
+    content_hash BYTEA NOT NULL,
+    embedding VECTOR(768) NOT NULL,
+    simhash BIGINT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (model, content_hash)
+);
+
+-- One index per 16-bit SimHash band for near-duplicate lookups
+CREATE INDEX IF NOT EXISTS idx_embedding_cache_simhash_b0
+    ON research.embedding_cache (model, ((simhash >> 48) & 65535))
+    WHERE simhash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_embedding_cache_simhash_b1
+    ON research.embedding_cache (model, ((simhash >> 32) & 65535))
+    WHERE simhash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_embedding_cache_simhash_b2
+    ON research.embedding_cache (model, ((simhash >> 16) & 65535))
+    WHERE simhash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_embedding_cache_simhash_b3
+    ON research.embedding_cache (model, (simhash & 65535))
+    WHERE simhash IS NOT NULL;
 
 CREATE TABLE IF NOT EXISTS research.chunk_evaluations (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -124,6 +155,9 @@ CREATE TABLE IF NOT EXISTS refined.dtc_sources (
     UNIQUE(dtc_id, chunk_id)
 );
 
+CREATE INDEX IF NOT EXISTS idx_dtc_sources_chunk
+    ON refined.dtc_sources(chunk_id);
+
 CREATE TABLE IF NOT EXISTS refined.diagnostic_steps (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     dtc_id UUID REFERENCES refined.dtc_codes(id) ON DELETE SET NULL,
@@ -138,6 +172,10 @@ CREATE TABLE IF NOT EXISTS refined.diagnostic_steps (
 
 CREATE INDEX IF NOT EXISTS idx_diag_steps_dtc
     ON refined.diagnostic_steps(dtc_id);
+CREATE INDEX IF NOT EXISTS idx_diag_steps_dtc_norm_desc
+    ON refined.diagnostic_steps(dtc_id, LOWER(TRIM(description)));
+CREATE INDEX IF NOT EXISTS idx_diag_steps_source_chunk
+    ON refined.diagnostic_steps(source_chunk_id);
 
 CREATE TABLE IF NOT EXISTS refined.causes (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -151,6 +189,10 @@ CREATE TABLE IF NOT EXISTS refined.causes (
 
 CREATE INDEX IF NOT EXISTS idx_causes_dtc
     ON refined.causes(dtc_id);
+CREATE INDEX IF NOT EXISTS idx_causes_dtc_norm_desc
+    ON refined.causes(dtc_id, LOWER(TRIM(description)));
+CREATE INDEX IF NOT EXISTS idx_causes_source_chunk
+    ON refined.causes(source_chunk_id);
 
 CREATE TABLE IF NOT EXISTS refined.sensors (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -165,6 +207,9 @@ CREATE TABLE IF NOT EXISTS refined.sensors (
     UNIQUE(name, sensor_type)
 );
 
+CREATE INDEX IF NOT EXISTS idx_refined_sensors_dtc_codes
+    ON refined.sensors USING GIN (related_dtc_codes);
+
 CREATE TABLE IF NOT EXISTS refined.tsb_references (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     tsb_number TEXT NOT NULL,
@@ -195,8 +240,9 @@ CREATE TABLE IF NOT EXISTS research.healing_log (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
-CREATE INDEX IF NOT EXISTS idx_healing_log_created
-    ON research.healing_log(created_at DESC);
+-- Append-only and time-ordered: BRIN covers time-range scans cheaply
+CREATE INDEX IF NOT EXISTS idx_healing_log_created_brin
+    ON research.healing_log USING brin (created_at);
 
 CREATE INDEX IF NOT EXISTS idx_healing_log_component
     ON research.healing_log(component, created_at DESC);
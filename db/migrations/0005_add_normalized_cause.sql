@@ -0,0 +1,81 @@
+-- ==========================================================
+-- Migration 0005: Normalized Cause Key
+-- ==========================================================
+-- Adds a stored generated column holding the case/whitespace
+-- normalized cause text, plus a unique index on
+-- (dtc_master_id, normalized_cause). The conflict worker
+-- upserts causes with ON CONFLICT on this index so exact
+-- duplicates that differ only by case or surrounding spaces
+-- are folded by Postgres instead of in Python.
+--
+-- The old key lower(cause) allowed rows that differ only by
+-- surrounding spaces; those would block the new unique index,
+-- so they are first folded into the oldest row of each group
+-- (the same merge rules as the upsert: max weight, summed
+-- evidence, averaged scores) and their provenance re-pointed.
+-- Re-running is a no-op once no collisions remain.
+--
+-- uq_dtc_causes (dtc_master_id, lower(cause)) is redundant
+-- after this migration: the worker never targets it, and any
+-- pair it rejects the new index rejects too. Dropping it
+-- needs separate approval.
+--
+-- Depends on: 0001_add_dtc_knowledge_graph.sql,
+--             0002_add_entity_sources_and_resolution_logs.sql
+-- ==========================================================
+
+ALTER TABLE knowledge.dtc_possible_causes
+    ADD COLUMN IF NOT EXISTS normalized_cause TEXT
+    GENERATED ALWAYS AS (lower(btrim(cause))) STORED;
+
+BEGIN;
+
+CREATE TEMP TABLE cause_folds ON COMMIT DROP AS
+SELECT id, keep_id
+FROM (
+    SELECT id,
+           first_value(id) OVER (
+               PARTITION BY dtc_master_id, normalized_cause
+               ORDER BY created_at, id
+           ) AS keep_id
+    FROM knowledge.dtc_possible_causes
+) ranked
+WHERE id <> keep_id;
+
+UPDATE knowledge.dtc_possible_causes k
+SET probability_weight = g.probability_weight,
+    evidence_count = g.evidence_count,
+    avg_trust = g.avg_trust,
+    avg_relevance = g.avg_relevance,
+    conflict_flag = g.conflict_flag
+FROM (
+    SELECT f.keep_id,
+           max(c.probability_weight) AS probability_weight,
+           sum(c.evidence_count) AS evidence_count,
+           avg(c.avg_trust) AS avg_trust,
+           avg(c.avg_relevance) AS avg_relevance,
+           bool_or(c.conflict_flag) AS conflict_flag
+    FROM (
+        SELECT id, keep_id FROM cause_folds
+        UNION
+        SELECT keep_id, keep_id FROM cause_folds
+    ) f
+    JOIN knowledge.dtc_possible_causes c ON c.id = f.id
+    GROUP BY f.keep_id
+) g
+WHERE k.id = g.keep_id;
+
+UPDATE knowledge.dtc_entity_sources es
+SET entity_id = f.keep_id
+FROM cause_folds f
+WHERE es.entity_table = 'knowledge.dtc_possible_causes'
+  AND es.entity_id = f.id;
+
+DELETE FROM knowledge.dtc_possible_causes c
+USING cause_folds f
+WHERE c.id = f.id;
+
+COMMIT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_dtc_causes_normalized
+    ON knowledge.dtc_possible_causes(dtc_master_id, normalized_cause);
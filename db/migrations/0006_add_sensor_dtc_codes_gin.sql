@@ -0,0 +1,13 @@
+-- ==========================================================
+-- Migration 0006: GIN Index on refined.sensors DTC Codes
+-- ==========================================================
+-- Adds a GIN index on refined.sensors.related_dtc_codes so
+-- per-code lookups written as array containment
+-- (related_dtc_codes @> ARRAY[code]) use an index probe
+-- instead of scanning every sensor row.
+--
+-- Depends on: init.sql (refined.sensors)
+-- ==========================================================
+
+CREATE INDEX IF NOT EXISTS idx_refined_sensors_dtc_codes
+    ON refined.sensors USING GIN (related_dtc_codes);
@@ -0,0 +1,22 @@
+-- ==========================================================
+-- Migration 0007: Refined Dedup Indexes
+-- ==========================================================
+-- The conflict worker deduplicates refined.causes and
+-- refined.diagnostic_steps only for the DTCs a finished
+-- document contributed to. These indexes let it find that
+-- document's rows by source chunk and match duplicates by
+-- (dtc_id, normalized description) with index lookups
+-- instead of scanning and self-joining the whole table.
+--
+-- Depends on: init.sql (refined.causes, refined.diagnostic_steps)
+-- ==========================================================
+
+CREATE INDEX IF NOT EXISTS idx_causes_dtc_norm_desc
+    ON refined.causes(dtc_id, LOWER(TRIM(description)));
+CREATE INDEX IF NOT EXISTS idx_causes_source_chunk
+    ON refined.causes(source_chunk_id);
+
+CREATE INDEX IF NOT EXISTS idx_diag_steps_dtc_norm_desc
+    ON refined.diagnostic_steps(dtc_id, LOWER(TRIM(description)));
+CREATE INDEX IF NOT EXISTS idx_diag_steps_source_chunk
+    ON refined.diagnostic_steps(source_chunk_id);
@@ -0,0 +1,19 @@
+-- ==========================================================
+-- Migration 0008: Raw Content Hash on Documents
+-- ==========================================================
+-- Adds research.documents.raw_content_hash, the SHA-256 of the
+-- fetched body before text extraction. The crawler checks it
+-- right after downloading so re-crawled pages and PDFs are
+-- recognised as duplicates without being parsed again.
+-- content_hash (hash of the extracted text) is unchanged and
+-- remains the authoritative duplicate check.
+--
+-- Depends on: init.sql (research.documents)
+-- ==========================================================
+
+ALTER TABLE research.documents
+    ADD COLUMN IF NOT EXISTS raw_content_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_documents_raw_hash
+    ON research.documents(raw_content_hash)
+    WHERE raw_content_hash IS NOT NULL;
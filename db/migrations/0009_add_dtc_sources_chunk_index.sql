@@ -0,0 +1,14 @@
+-- ==========================================================
+-- Migration 0009: refined.dtc_sources Chunk Index
+-- ==========================================================
+-- The conflict worker recalculates confidence only for DTCs
+-- cited by the document it just resolved, found by joining
+-- refined.dtc_sources to that document's chunks. The
+-- existing UNIQUE(dtc_id, chunk_id) index cannot serve a
+-- lookup by chunk_id alone, so add one that can.
+--
+-- Depends on: init.sql (refined.dtc_sources)
+-- ==========================================================
+
+CREATE INDEX IF NOT EXISTS idx_dtc_sources_chunk
+    ON refined.dtc_sources(chunk_id);
@@ -0,0 +1,20 @@
+-- ==========================================================
+-- Migration 0010: Embedding Cache
+-- ==========================================================
+-- Adds research.embedding_cache, keyed by embedding model and
+-- the SHA-256 of the chunk text. The embedding worker reuses
+-- a cached vector for any chunk whose exact text was already
+-- embedded (repeated headers, footers, standard DTC tables)
+-- instead of calling Ollama again. Including the model in the
+-- key means a model change never serves stale vectors.
+--
+-- Depends on: init.sql (vector extension, research schema)
+-- ==========================================================
+
+CREATE TABLE IF NOT EXISTS research.embedding_cache (
+    model TEXT NOT NULL,
+    content_hash BYTEA NOT NULL,
+    embedding VECTOR(768) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (model, content_hash)
+);
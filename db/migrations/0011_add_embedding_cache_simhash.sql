@@ -0,0 +1,29 @@
+-- ==========================================================
+-- Migration 0011: SimHash on Embedding Cache
+-- ==========================================================
+-- Adds research.embedding_cache.simhash, a 64-bit SimHash of
+-- the cached chunk's word tokens. The embedding worker reuses
+-- a cached vector for a near-duplicate chunk (same text up to
+-- minor formatting or typo differences) when the SimHashes
+-- differ in at most 3 bits. By pigeonhole such a pair agrees
+-- on at least one of the four 16-bit bands, so one index per
+-- band turns the candidate lookup into equality probes.
+--
+-- Depends on: 0010_add_embedding_cache.sql
+-- ==========================================================
+
+ALTER TABLE research.embedding_cache
+    ADD COLUMN IF NOT EXISTS simhash BIGINT;
+
+CREATE INDEX IF NOT EXISTS idx_embedding_cache_simhash_b0
+    ON research.embedding_cache (model, ((simhash >> 48) & 65535))
+    WHERE simhash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_embedding_cache_simhash_b1
+    ON research.embedding_cache (model, ((simhash >> 32) & 65535))
+    WHERE simhash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_embedding_cache_simhash_b2
+    ON research.embedding_cache (model, ((simhash >> 16) & 65535))
+    WHERE simhash IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_embedding_cache_simhash_b3
+    ON research.embedding_cache (model, (simhash & 65535))
+    WHERE simhash IS NOT NULL;
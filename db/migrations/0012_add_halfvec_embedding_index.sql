@@ -0,0 +1,29 @@
+-- ==========================================================
+-- Migration 0012: Half-Precision Embedding Index
+-- ==========================================================
+-- Adds an HNSW index over research.document_chunks.embedding
+-- cast to halfvec(768) (fp16). The index is half the size of
+-- the fp32 vector index, so more of it stays in memory during
+-- ANN search. Recall loss from fp16 is negligible for cosine
+-- ranking. Semantic search orders by
+-- embedding::halfvec(768) <=> query::halfvec(768) to use it,
+-- and still reports the exact fp32 similarity.
+--
+-- The fp32 idx_chunks_embedding has no readers once search
+-- orders by the halfvec expression, so it is dropped here and
+-- inserts build one HNSW graph instead of two. The stored
+-- vector(768) column is unchanged.
+--
+-- Requires pgvector >= 0.7 (halfvec); the extension is updated
+-- in place after moving to the pgvector/pgvector image.
+--
+-- Depends on: init.sql (research.document_chunks)
+-- ==========================================================
+
+ALTER EXTENSION vector UPDATE;
+
+CREATE INDEX IF NOT EXISTS idx_chunks_embedding_half
+    ON research.document_chunks
+    USING hnsw ((embedding::halfvec(768)) halfvec_cosine_ops);
+
+DROP INDEX IF EXISTS research.idx_chunks_embedding;
@@ -0,0 +1,20 @@
+-- ==========================================================
+-- Migration 0013: BRIN Index on Healing Log Time
+-- ==========================================================
+-- research.healing_log is append-only and created_at rises
+-- with physical row order, so a BRIN index answers time-range
+-- scans ("last N hours") at a tiny fraction of a B-tree's size
+-- and with almost no insert maintenance. It replaces the
+-- idx_healing_log_created B-tree; the (component, created_at)
+-- B-tree stays for per-component lookups.
+--
+-- A partial B-tree limited to recent rows is not possible:
+-- index predicates cannot use NOW().
+--
+-- Depends on: init.sql (research.healing_log)
+-- ==========================================================
+
+CREATE INDEX IF NOT EXISTS idx_healing_log_created_brin
+    ON research.healing_log USING brin (created_at);
+
+DROP INDEX IF EXISTS research.idx_healing_log_created;
@@ -0,0 +1,198 @@
+"""Batch scoring kernel for DTC knowledge graph entities.
+
+Computes the same S = EQS + CS + VSS + PIS score as scorer.compute_score,
+but over a whole batch of candidates at once. When numba is installed the
+per-entity formula is JIT-compiled and the batch loop runs in parallel
+across cores (prange); otherwise the same code runs as a plain Python loop.
+
+Inputs are column arrays (structure-of-arrays): entity types are passed
+as scorer.ETYPE_* integer codes and make/model IDs as small integer codes
+(0 = none) assigned per batch by encode_ids().
+"""
+import math
+from typing import Dict, List, Optional, Sequence
+
+from scorer import entity_type_code
+
+try:
+    import numpy as np
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    np = None
+    prange = range
+    NUMBA_AVAILABLE = False
+
+_INV_LOG2_11 = 1.0 / math.log2(11.0)
+_INV_LOG2_51 = 1.0 / math.log2(51.0)
+
+
+def _score_one(trust, relevance, evidence_count, code, probability_weight,
+               confirmed_repair_count, frequency_score, solution_marked,
+               e_make, e_model, e_year_start, e_year_end,
+               c_make, c_model, c_year):
+    """Score a single entity.
+
+    Performs scorer.compute_score's operations in the same order. The
+    kernels are compiled without fastmath, so no reassociation or
+    approximate math can move a score across a strict > comparison
+    when merge winners are picked.
+    """
+    # Evidence Quality Score (0-50)
+    t = min(1.0, max(0.0, trust))
+    r = min(1.0, max(0.0, relevance))
+    eqs = 50.0 * (0.65 * t + 0.35 * r)
+
+    # Consensus Score (0-20)
+    cs = 0.0
+    if evidence_count > 0:
+        cs = 20.0 * min(
+            1.0, math.log2(1.0 + evidence_count) * _INV_LOG2_11)
+
+    # Vehicle Specificity Score (-20 to +20)
+    if c_make == 0 or e_make == 0:
+        vss = 6.0
+    elif e_make != c_make:
+        vss = -20.0
+    elif c_model == 0 or e_model == 0:
+        vss = 12.0
+    elif e_model != c_model:
+        vss = -20.0
+    elif c_year and e_year_start and e_year_end:
+        vss = 20.0 if e_year_start <= c_year <= e_year_end else -20.0
+    elif c_year and e_year_start:
+        vss = 20.0 if c_year >= e_year_start else -20.0
+    else:
+        vss = 20.0
+
+    # Practical Impact Score (0-10), see scorer.ETYPE_* for codes
+    pis = 0.0
+    if code == 1:
+        if confirmed_repair_count > 0:
+            pis = 10.0 * min(
+                1.0, math.log2(1.0 + confirmed_repair_count) * _INV_LOG2_51)
+    elif code == 2:
+        pis = 10.0 * min(1.0, max(0.0, probability_weight))
+    elif code == 3:
+        pis = 10.0 * min(1.0, max(0.0, frequency_score / 10.0))
+    elif code == 4:
+        pis = 6.0 if solution_marked else 0.0
+
+    return min(100.0, max(0.0, eqs + cs + vss + pis))
+
+
+if NUMBA_AVAILABLE:
+    _score_one = njit(cache=True)(_score_one)
+
+    @njit(parallel=True, cache=True)
+    def _score_batch_kernel(trust, relevance, evidence_count, code,
+                            probability_weight, confirmed_repair_count,
+                            frequency_score, solution_marked,
+                            e_make, e_model, e_year_start, e_year_end,
+                            c_make, c_model, c_year):
+        n = trust.shape[0]
+        out = np.empty(n)
+        for i in prange(n):
+            out[i] = _score_one(
+                trust[i], relevance[i], evidence_count[i], code[i],
+                probability_weight[i], confirmed_repair_count[i],
+                frequency_score[i], solution_marked[i],
+                e_make[i], e_model[i], e_year_start[i], e_year_end[i],
+                c_make, c_model, c_year,
+            )
+        return out
+
+
+def score_batch(trust, relevance, evidence_count, code, probability_weight,
+                confirmed_repair_count, frequency_score, solution_marked,
+                e_make, e_model, e_year_start, e_year_end,
+                c_make: int = 0, c_model: int = 0, c_year: int = 0):
+    """Score a batch of entities given as equal-length column sequences.
+
+    Returns a numpy float64 array when numba is available, else a list.
+    Scores are already clamped to [0, 100].
+    """
+    if NUMBA_AVAILABLE:
+        return _score_batch_kernel(
+            np.asarray(trust, dtype=np.float64),
+            np.asarray(relevance, dtype=np.float64),
+            np.asarray(evidence_count, dtype=np.int64),
+            np.asarray(code, dtype=np.int64),
+            np.asarray(probability_weight, dtype=np.float64),
+            np.asarray(confirmed_repair_count, dtype=np.int64),
+            np.asarray(frequency_score, dtype=np.int64),
+            np.asarray(solution_marked, dtype=np.bool_),
+            np.asarray(e_make, dtype=np.int32),
+            np.asarray(e_model, dtype=np.int32),
+            np.asarray(e_year_start, dtype=np.int64),
+            np.asarray(e_year_end, dtype=np.int64),
+            c_make, c_model, c_year,
+        )
+    return [
+        _score_one(
+            trust[i], relevance[i], evidence_count[i], code[i],
+            probability_weight[i], confirmed_repair_count[i],
+            frequency_score[i], solution_marked[i],
+            e_make[i], e_model[i], e_year_start[i], e_year_end[i],
+            c_make, c_model, c_year,
+        )
+        for i in prange(len(trust))
+    ]
+
+
+def encode_ids(ids: Sequence[Optional[str]],
+               codes: Dict[str, int]) -> List[int]:
+    """Map string IDs to small integer codes (None/empty -> 0).
+
+    ``codes`` is shared across calls so entity and context IDs that are
+    equal get the same code.
+    """
+    out = []
+    for v in ids:
+        if not v:
+            out.append(0)
+            continue
+        c = codes.get(v)
+        if c is None:
+            c = codes[v] = len(codes) + 1
+        out.append(c)
+    return out
+
+
+def score_entities(entities: List[dict], entity_type: str,
+                   ctx_make_id: Optional[str] = None,
+                   ctx_model_id: Optional[str] = None,
+                   ctx_year: Optional[int] = None) -> List[float]:
+    """Score a list of candidate dicts of one entity_type in one batch.
+
+    Dict keys match the compute_score keyword arguments; missing keys
+    fall back to the same defaults compute_score uses.
+    """
+    n = len(entities)
+    if n == 0:
+        return []
+    id_codes: Dict[str, int] = {}
+    c_make, c_model = encode_ids([ctx_make_id, ctx_model_id], id_codes)
+    scores = score_batch(
+        [e.get("avg_trust", 0.0) for e in entities],
+        [e.get("avg_relevance", 0.0) for e in entities],
+        [e.get("evidence_count", 0) for e in entities],
+        [entity_type_code(entity_type)] * n,
+        [e.get("probability_weight", 0.0) for e in entities],
+        [e.get("confirmed_repair_count", 0) for e in entities],
+        [e.get("frequency_score", 0) for e in entities],
+        [bool(e.get("solution_marked", False)) for e in entities],
+        encode_ids([e.get("entity_make_id") for e in entities], id_codes),
+        encode_ids([e.get("entity_model_id") for e in entities], id_codes),
+        [e.get("entity_year_start") or 0 for e in entities],
+        [e.get("entity_year_end") or 0 for e in entities],
+        c_make, c_model, ctx_year or 0,
+    )
+    return [float(s) for s in scores]
+
+
+if NUMBA_AVAILABLE:
+    # Warm up (and populate the on-disk cache) at import so the first
+    # real batch does not pay JIT compilation latency.
+    score_batch([0.5], [0.5], [1], [0], [0.0], [0], [0], [False],
+                [0], [0], [0], [0])
@@ -5,8 +5,11 @@ representing the same underlying fact into canonical rows.
 """
 import re
 import unicodedata
+from dataclasses import dataclass
 from typing import List, Dict, Optional, Tuple
 
+from scorer import make_scorer
+
 
 def normalize_text(text: str) -> str:
     """Normalize a string for deduplication comparison.
@@ -100,6 +103,128 @@ def merge_text_entities(
     return merged, rejected
 
 
+@dataclass(slots=True)
+class Candidate:
+    """Slotted view of a candidate row carrying just the ranking fields.
+
+    Ranking reads these attributes instead of doing dict lookups per
+    comparison. The full original row rides along in ``row`` and is
+    restored by to_dict() at the API boundary.
+    """
+    id: str
+    score: float
+    evidence_count: int
+    avg_trust: float
+    avg_relevance: float
+    row: dict
+
+    @classmethod
+    def from_dict(cls, row: dict, score_field: str = "score") -> "Candidate":
+        return cls(
+            str(row.get("id", "")),
+            row.get(score_field, 0.0),
+            row.get("evidence_count", 0),
+            row.get("avg_trust", 0.0),
+            row.get("avg_relevance", 0.0),
+            row,
+        )
+
+    def to_dict(self) -> dict:
+        """Return the underlying row dict."""
+        return self.row
+
+
+def candidate_sort_key(c: Candidate) -> tuple:
+    """Attribute-based equivalent of scorer.sort_key for Candidate."""
+    return (-c.score, -c.evidence_count, -c.avg_trust, -c.avg_relevance, c.id)
+
+
+def score_and_rank(
+    candidates: List[dict],
+    text_field: str,
+    entity_type: str,
+    ctx: Optional[dict] = None,
+    score_field: str = "score",
+) -> Tuple[List[dict], List[dict]]:
+    """Merge, rescore and rank text entities in a single pass.
+
+    Equivalent to merge_text_entities() followed by compute_score() on
+    every merged entity and a sort_key ordering, but each candidate dict
+    is visited once: normalization, winner selection and evidence
+    aggregation happen in the same loop. Ranking runs over Candidate
+    rows; plain dicts are returned.
+
+    Returns:
+        (ranked_canonical_list, rejected_list)
+    """
+    ctx = ctx or {}
+    # Every candidate shares entity_type: dispatch on it once
+    score = make_scorer(entity_type)
+    ctx_make_id = ctx.get("ctx_make_id")
+    ctx_model_id = ctx.get("ctx_model_id")
+    ctx_year = ctx.get("ctx_year")
+    # norm_key -> [winner, members, total_evidence,
+    #              trust_sum, relevance_sum, n_with_evidence, sources]
+    buckets: Dict[str, list] = {}
+    for c in candidates:
+        key = normalize_text(str(c.get(text_field, "")))
+        if not key:
+            continue
+        ec = c.get("evidence_count", 0)
+        b = buckets.get(key)
+        if b is None:
+            b = buckets[key] = [c, [], 0, 0.0, 0.0, 0, []]
+        elif c.get(score_field, 0.0) > b[0].get(score_field, 0.0):
+            b[0] = c
+        b[1].append(c)
+        b[2] += ec
+        if ec > 0:
+            b[3] += c.get("avg_trust", 0)
+            b[4] += c.get("avg_relevance", 0)
+            b[5] += 1
+        b[6].extend(c.get("source_chunk_ids", []))
+
+    merged = []
+    rejected = []
+    for winner, members, total_evidence, trust_sum, rel_sum, n, sources in \
+            buckets.values():
+        if len(members) > 1:
+            original = winner
+            winner = dict(winner)
+            winner["evidence_count"] = total_evidence
+            if n:
+                winner["avg_trust"] = trust_sum / n
+                winner["avg_relevance"] = rel_sum / n
+            winner["source_chunk_ids"] = list(set(sources))
+            for loser in members:
+                if loser is original:
+                    continue
+                loser["_rejected_reason"] = "duplicate_merged"
+                loser["_merged_into"] = winner.get("id")
+                rejected.append(loser)
+
+        winner_score = winner[score_field] = score(
+            avg_trust=winner.get("avg_trust", 0),
+            avg_relevance=winner.get("avg_relevance", 0),
+            evidence_count=winner.get("evidence_count", 0),
+            probability_weight=winner.get("probability_weight", 0.5),
+            ctx_make_id=ctx_make_id,
+            ctx_model_id=ctx_model_id,
+            ctx_year=ctx_year,
+        )
+        merged.append(Candidate(
+            str(winner.get("id", "")),
+            winner_score,
+            winner.get("evidence_count", 0),
+            winner.get("avg_trust", 0.0),
+            winner.get("avg_relevance", 0.0),
+            winner,
+        ))
+
+    merged.sort(key=candidate_sort_key)
+    return [c.to_dict() for c in merged], rejected
+
+
 def merge_numeric_ranges(
     candidates: List[dict],
     value_fields: List[str],
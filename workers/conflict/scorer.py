@@ -4,14 +4,28 @@ Computes a unified score S(entity, context) in [0, 100] for ranking
 causes, fixes, parts, sensors, threads, steps, and symptoms.
 
 S = EvidenceQualityScore + ConsensusScore + VehicleSpecificityScore + PracticalImpactScore
+
+The module is pure typed scalar arithmetic so the conflict worker image
+AOT-compiles it with mypyc (see conflict/Dockerfile). Keep every
+signature fully annotated and avoid dynamic features so the compiled
+and interpreted versions stay interchangeable.
 """
+import functools
 import math
-from typing import Optional
+from typing import Callable
+
+# Precomputed divisors for the log-scaled components (log2 ratio == ln ratio)
+_INV_LOG2_11 = 1.0 / math.log2(11.0)
+_INV_LOG2_51 = 1.0 / math.log2(51.0)
 
 
 def clamp(value: float, lo: float = 0.0, hi: float = 1.0) -> float:
-    """Clamp value to [lo, hi]."""
-    return max(lo, min(hi, float(value)))
+    """Clamp value to [lo, hi].
+
+    Callers pass floats already (DB columns are FLOAT), so there is no
+    float() conversion here.
+    """
+    return lo if value < lo else hi if value > hi else value
 
 
 def evidence_quality_score(avg_trust: float, avg_relevance: float) -> float:
@@ -34,20 +48,18 @@ def consensus_score(evidence_count: int) -> float:
     """
     if evidence_count <= 0:
         return 0.0
-    consensus = clamp(
-        math.log(1 + evidence_count) / math.log(1 + 10), 0.0, 1.0
-    )
+    consensus = clamp(math.log2(1 + evidence_count) * _INV_LOG2_11, 0.0, 1.0)
     return 20.0 * consensus
 
 
 def vehicle_specificity_score(
-    entity_make_id: Optional[str],
-    entity_model_id: Optional[str],
-    entity_year_start: Optional[int],
-    entity_year_end: Optional[int],
-    ctx_make_id: Optional[str] = None,
-    ctx_model_id: Optional[str] = None,
-    ctx_year: Optional[int] = None,
+    entity_make_id: str | None,
+    entity_model_id: str | None,
+    entity_year_start: int | None,
+    entity_year_end: int | None,
+    ctx_make_id: str | None = None,
+    ctx_model_id: str | None = None,
+    ctx_year: int | None = None,
 ) -> float:
     """Vehicle Specificity Score (-20 to +20).
 
@@ -90,14 +102,77 @@ def vehicle_specificity_score(
     return 20.0  # make + model match, no year constraint
 
 
-def practical_impact_score(
-    entity_type: str,
+# Integer entity-type codes. Resolve the string once per entity with
+# entity_type_code() and dispatch on the int; fixes and parts share a code
+# because they are scored identically.
+ETYPE_OTHER = 0
+ETYPE_FIX = 1
+ETYPE_PART = 1
+ETYPE_CAUSE = 2
+ETYPE_SYMPTOM = 3
+ETYPE_THREAD = 4
+
+_ETYPE_CODE: dict[str, int] = {
+    "fix": ETYPE_FIX,
+    "part": ETYPE_PART,
+    "cause": ETYPE_CAUSE,
+    "symptom": ETYPE_SYMPTOM,
+    "thread": ETYPE_THREAD,
+}
+
+
+def entity_type_code(entity_type: str) -> int:
+    """Map an entity_type string to its integer code (ETYPE_OTHER if unknown)."""
+    return _ETYPE_CODE.get(entity_type, ETYPE_OTHER)
+
+
+def _pis_other(confirmed_repair_count: int, probability_weight: float,
+               frequency_score: int, solution_marked: bool) -> float:
+    # steps, sensors, live_data, explanation
+    return 0.0
+
+
+def _pis_fix(confirmed_repair_count: int, probability_weight: float,
+             frequency_score: int, solution_marked: bool) -> float:
+    if confirmed_repair_count <= 0:
+        return 0.0
+    impact = clamp(
+        math.log2(1 + confirmed_repair_count) * _INV_LOG2_51, 0.0, 1.0
+    )
+    return 10.0 * impact
+
+
+def _pis_cause(confirmed_repair_count: int, probability_weight: float,
+               frequency_score: int, solution_marked: bool) -> float:
+    return 10.0 * clamp(probability_weight)
+
+
+def _pis_symptom(confirmed_repair_count: int, probability_weight: float,
+                 frequency_score: int, solution_marked: bool) -> float:
+    return 10.0 * clamp(frequency_score / 10.0)
+
+
+def _pis_thread(confirmed_repair_count: int, probability_weight: float,
+                frequency_score: int, solution_marked: bool) -> float:
+    return 6.0 if solution_marked else 0.0
+
+
+PisFn = Callable[[int, float, int, bool], float]
+
+# Indexed by ETYPE_* code
+_PIS_BY_CODE: tuple[PisFn, ...] = (
+    _pis_other, _pis_fix, _pis_cause, _pis_symptom, _pis_thread,
+)
+
+
+def practical_impact_score_code(
+    code: int,
     confirmed_repair_count: int = 0,
     probability_weight: float = 0.0,
     frequency_score: int = 0,
     solution_marked: bool = False,
 ) -> float:
-    """Practical Impact Score (0-10).
+    """Practical Impact Score (0-10) dispatched on an ETYPE_* code.
 
     - fixes/parts: higher confirmed_repair_count -> higher score
     - causes: probability_weight directly
@@ -105,25 +180,60 @@ def practical_impact_score(
     - threads: solution_marked -> +6
     - steps/sensors/live_data: 0 (neutral)
     """
-    if entity_type in ("fix", "part"):
-        if confirmed_repair_count <= 0:
-            return 0.0
-        impact = clamp(
-            math.log(1 + confirmed_repair_count) / math.log(1 + 50), 0.0, 1.0
-        )
-        return 10.0 * impact
+    return _PIS_BY_CODE[code](
+        confirmed_repair_count, probability_weight,
+        frequency_score, solution_marked,
+    )
 
-    if entity_type == "cause":
-        return 10.0 * clamp(probability_weight)
 
-    if entity_type == "symptom":
-        return 10.0 * clamp(frequency_score / 10.0)
+def practical_impact_score(
+    entity_type: str,
+    confirmed_repair_count: int = 0,
+    probability_weight: float = 0.0,
+    frequency_score: int = 0,
+    solution_marked: bool = False,
+) -> float:
+    """Practical Impact Score (0-10) for an entity_type string.
 
-    if entity_type == "thread":
-        return 6.0 if solution_marked else 0.0
+    Thin wrapper around practical_impact_score_code().
+    """
+    return practical_impact_score_code(
+        entity_type_code(entity_type),
+        confirmed_repair_count=confirmed_repair_count,
+        probability_weight=probability_weight,
+        frequency_score=frequency_score,
+        solution_marked=solution_marked,
+    )
 
-    # steps, sensors, live_data, explanation
-    return 0.0
+
+def _score(
+    pis_fn: PisFn,
+    avg_trust: float = 0.0,
+    avg_relevance: float = 0.0,
+    evidence_count: int = 0,
+    entity_make_id: str | None = None,
+    entity_model_id: str | None = None,
+    entity_year_start: int | None = None,
+    entity_year_end: int | None = None,
+    ctx_make_id: str | None = None,
+    ctx_model_id: str | None = None,
+    ctx_year: int | None = None,
+    confirmed_repair_count: int = 0,
+    probability_weight: float = 0.0,
+    frequency_score: int = 0,
+    solution_marked: bool = False,
+) -> float:
+    """Score body shared by compute_score and make_scorer."""
+    vss = vehicle_specificity_score(
+        entity_make_id, entity_model_id,
+        entity_year_start, entity_year_end,
+        ctx_make_id, ctx_model_id, ctx_year,
+    )
+    eqs = evidence_quality_score(avg_trust, avg_relevance)
+    cs = consensus_score(evidence_count)
+    pis = pis_fn(confirmed_repair_count, probability_weight,
+                 frequency_score, solution_marked)
+    return clamp(eqs + cs + vss + pis, 0.0, 100.0)
 
 
 def compute_score(
@@ -131,13 +241,13 @@ def compute_score(
     avg_trust: float = 0.0,
     avg_relevance: float = 0.0,
     evidence_count: int = 0,
-    entity_make_id: Optional[str] = None,
-    entity_model_id: Optional[str] = None,
-    entity_year_start: Optional[int] = None,
-    entity_year_end: Optional[int] = None,
-    ctx_make_id: Optional[str] = None,
-    ctx_model_id: Optional[str] = None,
-    ctx_year: Optional[int] = None,
+    entity_make_id: str | None = None,
+    entity_model_id: str | None = None,
+    entity_year_start: int | None = None,
+    entity_year_end: int | None = None,
+    ctx_make_id: str | None = None,
+    ctx_model_id: str | None = None,
+    ctx_year: int | None = None,
     confirmed_repair_count: int = 0,
     probability_weight: float = 0.0,
     frequency_score: int = 0,
@@ -149,21 +259,34 @@ def compute_score(
     then avg_trust desc, then avg_relevance desc,
     then uuid asc (stable tie-breaker).
     """
-    eqs = evidence_quality_score(avg_trust, avg_relevance)
-    cs = consensus_score(evidence_count)
-    vss = vehicle_specificity_score(
+    return _score(
+        _PIS_BY_CODE[entity_type_code(entity_type)],
+        avg_trust, avg_relevance, evidence_count,
         entity_make_id, entity_model_id,
         entity_year_start, entity_year_end,
         ctx_make_id, ctx_model_id, ctx_year,
+        confirmed_repair_count, probability_weight,
+        frequency_score, solution_marked,
     )
-    pis = practical_impact_score(
-        entity_type,
-        confirmed_repair_count=confirmed_repair_count,
-        probability_weight=probability_weight,
-        frequency_score=frequency_score,
-        solution_marked=solution_marked,
-    )
-    return clamp(eqs + cs + vss + pis, 0.0, 100.0)
+
+
+_SCORERS: dict[str, Callable[..., float]] = {}
+
+
+def make_scorer(entity_type: str) -> Callable[..., float]:
+    """Return a compute_score specialized for one entity_type.
+
+    The entity_type dispatch happens once here instead of on every call;
+    use it when scoring a batch of uniform type. The returned callable
+    takes the same keyword arguments as compute_score minus entity_type.
+    Scorers are cached per type.
+    """
+    scorer = _SCORERS.get(entity_type)
+    if scorer is None:
+        scorer = functools.partial(
+            _score, _PIS_BY_CODE[entity_type_code(entity_type)])
+        _SCORERS[entity_type] = scorer
+    return scorer
 
 
 def sort_key(entity: dict) -> tuple:
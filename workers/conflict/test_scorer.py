@@ -4,11 +4,15 @@ import unittest
 from scorer import (
     clamp, evidence_quality_score, consensus_score,
     vehicle_specificity_score, practical_impact_score,
-    compute_score, sort_key,
+    practical_impact_score_code, entity_type_code,
+    ETYPE_OTHER, ETYPE_FIX, ETYPE_CAUSE,
+    compute_score, make_scorer, sort_key,
 )
+from batch_scorer import score_entities
 from merger import (
     normalize_text, group_duplicates, merge_text_entities,
-    merge_numeric_ranges,
+    merge_numeric_ranges, score_and_rank,
+    Candidate, candidate_sort_key,
 )
 
 
@@ -131,6 +135,22 @@ class TestPracticalImpactScore(unittest.TestCase):
         score = practical_impact_score("step")
         self.assertEqual(score, 0.0)
 
+    def test_entity_type_codes(self):
+        self.assertEqual(entity_type_code("fix"), ETYPE_FIX)
+        self.assertEqual(entity_type_code("part"), ETYPE_FIX)
+        self.assertEqual(entity_type_code("cause"), ETYPE_CAUSE)
+        self.assertEqual(entity_type_code("sensor"), ETYPE_OTHER)
+
+    def test_code_variant_matches_string(self):
+        self.assertAlmostEqual(
+            practical_impact_score_code(ETYPE_CAUSE, probability_weight=0.8),
+            practical_impact_score("cause", probability_weight=0.8),
+        )
+        self.assertAlmostEqual(
+            practical_impact_score_code(ETYPE_FIX, confirmed_repair_count=5),
+            practical_impact_score("part", confirmed_repair_count=5),
+        )
+
 
 class TestComputeScore(unittest.TestCase):
     def test_perfect_cause(self):
@@ -177,6 +197,39 @@ class TestComputeScore(unittest.TestCase):
         # EQS=0, CS=0, VSS=6, PIS=0 => 6
         self.assertAlmostEqual(score, 6.0, places=0)
 
+    def test_make_scorer_matches_compute_score(self):
+        kwargs = dict(avg_trust=0.7, avg_relevance=0.6, evidence_count=3,
+                      confirmed_repair_count=12, probability_weight=0.4,
+                      frequency_score=6, solution_marked=True)
+        for etype in ("fix", "part", "cause", "symptom", "thread", "step"):
+            self.assertAlmostEqual(
+                make_scorer(etype)(**kwargs),
+                compute_score(entity_type=etype, **kwargs),
+            )
+        self.assertIs(make_scorer("fix"), make_scorer("fix"))
+
+
+class TestBatchScoring(unittest.TestCase):
+    def test_matches_compute_score(self):
+        entities = [
+            {"avg_trust": 0.9, "avg_relevance": 0.7, "evidence_count": 4,
+             "probability_weight": 0.85},
+            {"avg_trust": 0.2, "avg_relevance": 0.4, "evidence_count": 0,
+             "probability_weight": 0.25, "entity_make_id": "ford"},
+            {"avg_trust": 0.6, "avg_relevance": 0.6, "evidence_count": 2,
+             "entity_make_id": "toyota", "entity_model_id": "camry",
+             "entity_year_start": 2018, "entity_year_end": 2022},
+        ]
+        ctx = {"ctx_make_id": "toyota", "ctx_model_id": "camry",
+               "ctx_year": 2020}
+        scores = score_entities(entities, "cause", **ctx)
+        for entity, score in zip(entities, scores):
+            expected = compute_score(entity_type="cause", **entity, **ctx)
+            self.assertAlmostEqual(score, expected, places=6)
+
+    def test_empty(self):
+        self.assertEqual(score_entities([], "cause"), [])
+
 
 class TestSortKey(unittest.TestCase):
     def test_sorts_by_score_desc(self):
@@ -275,6 +328,57 @@ class TestMergeTextEntities(unittest.TestCase):
         self.assertEqual(len(rejected), 0)
 
 
+class TestScoreAndRank(unittest.TestCase):
+    def _candidates(self):
+        return [
+            {"id": "1", "cause": "Bad Spark Plug", "score": 80,
+             "evidence_count": 3, "avg_trust": 0.8, "avg_relevance": 0.7,
+             "probability_weight": 0.85, "source_chunk_ids": ["c1"]},
+            {"id": "2", "cause": "bad spark plug!", "score": 60,
+             "evidence_count": 2, "avg_trust": 0.6, "avg_relevance": 0.5,
+             "probability_weight": 0.55, "source_chunk_ids": ["c2"]},
+            {"id": "3", "cause": "Faulty coil", "score": 70,
+             "evidence_count": 1, "avg_trust": 0.7, "avg_relevance": 0.6,
+             "probability_weight": 0.25, "source_chunk_ids": ["c3"]},
+        ]
+
+    def test_matches_merge_then_score(self):
+        merged, rejected = merge_text_entities(self._candidates(), "cause")
+        for e in merged:
+            e["score"] = compute_score(
+                entity_type="cause",
+                avg_trust=e["avg_trust"], avg_relevance=e["avg_relevance"],
+                evidence_count=e["evidence_count"],
+                probability_weight=e["probability_weight"],
+            )
+        expected = sorted(merged, key=sort_key)
+
+        ranked, rejected2 = score_and_rank(
+            self._candidates(), "cause", "cause")
+        self.assertEqual([e["id"] for e in ranked],
+                         [e["id"] for e in expected])
+        for got, want in zip(ranked, expected):
+            self.assertAlmostEqual(got["score"], want["score"])
+            self.assertEqual(got["evidence_count"], want["evidence_count"])
+            self.assertEqual(sorted(got["source_chunk_ids"]),
+                             sorted(want["source_chunk_ids"]))
+        self.assertEqual([r["id"] for r in rejected2], ["2"])
+        self.assertEqual(rejected2[0]["_merged_into"], "1")
+
+
+class TestCandidate(unittest.TestCase):
+    def test_sort_key_matches_dict_sort_key(self):
+        rows = [
+            {"id": "b", "score": 70, "evidence_count": 3, "avg_trust": 0.8},
+            {"id": "a", "score": 70, "evidence_count": 3, "avg_trust": 0.8},
+            {"id": "c", "score": 90, "evidence_count": 1},
+        ]
+        ranked = sorted((Candidate.from_dict(r) for r in rows),
+                        key=candidate_sort_key)
+        self.assertEqual([c.to_dict() for c in ranked],
+                         sorted(rows, key=sort_key))
+
+
 class TestMergeNumericRanges(unittest.TestCase):
     def test_no_conflict(self):
         candidates = [
@@ -4,30 +4,135 @@ Reads extracted data from refined.* tables and chunk_evaluations,
 runs scoring and merging, then upserts into knowledge.* tables
 with full provenance tracking.
 """
+import io
+import json
 import logging
 import uuid
 import time
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set, Tuple
+
+from psycopg2.extras import execute_values, register_uuid
 
 from shared.db import get_connection, return_connection
 
-from scorer import compute_score, sort_key
-from merger import (
-    merge_text_entities,
-    merge_numeric_ranges,
-    normalize_text,
-    build_resolution_entry,
-)
+from batch_scorer import score_entities
+from merger import score_and_rank, build_resolution_entry
 
 logger = logging.getLogger(__name__)
 
+# Canonical text -> value mappings. The Python helpers and the SQL CASE
+# expressions below are both generated from these.
+_CATEGORY_MAP = {
+    "powertrain": "powertrain",
+    "chassis": "chassis",
+    "body": "body",
+    "network": "network",
+    "engine": "powertrain",
+    "transmission": "powertrain",
+    "electrical": "electrical",
+    "emissions": "emissions",
+}
+_SEVERITY_MAP = {
+    "critical": 5, "high": 4, "medium": 3,
+    "low": 2, "informational": 1, "info": 1,
+}
+_LIKELIHOOD_WEIGHTS = {
+    "high": 0.85, "medium": 0.55, "low": 0.25,
+    "very high": 0.95, "very low": 0.10,
+    "certain": 1.0, "unlikely": 0.15,
+}
+
+
+# Rows fetched per round-trip when streaming from server-side cursors
+_ITERSIZE = 2000
+
+# Above this many merged causes, upsert through COPY + a staging table
+_COPY_THRESHOLD = 10_000
+
+# Upserts causes from {source}, rows of (ord, dtc_master_id, cause,
+# probability_weight, evidence_count, avg_trust, avg_relevance), and
+# returns (ord, id) for each. Upserted rows are matched back to their
+# input row server-side with the same lower(btrim(cause)) expression as
+# the normalized_cause column, so the key is never rebuilt in Python.
+_CAUSE_UPSERT_SQL = """
+    WITH input AS (
+        {source}
+    ), upserted AS (
+        INSERT INTO knowledge.dtc_possible_causes
+            (dtc_master_id, cause, probability_weight,
+             evidence_count, avg_trust, avg_relevance)
+        SELECT dtc_master_id, cause, probability_weight,
+               evidence_count, avg_trust, avg_relevance
+        FROM input
+        ON CONFLICT (dtc_master_id, normalized_cause) DO UPDATE SET
+            probability_weight = GREATEST(
+                knowledge.dtc_possible_causes.probability_weight,
+                EXCLUDED.probability_weight
+            ),
+            evidence_count = knowledge.dtc_possible_causes.evidence_count
+                + EXCLUDED.evidence_count,
+            avg_trust = (knowledge.dtc_possible_causes.avg_trust
+                + EXCLUDED.avg_trust) / 2.0,
+            avg_relevance = (knowledge.dtc_possible_causes.avg_relevance
+                + EXCLUDED.avg_relevance) / 2.0
+        RETURNING id, dtc_master_id, normalized_cause
+    )
+    SELECT input.ord, upserted.id
+    FROM input
+    JOIN upserted
+      ON upserted.dtc_master_id = input.dtc_master_id
+     AND upserted.normalized_cause = lower(btrim(input.cause))
+"""
+_CAUSE_VALUES_SOURCE = """
+        SELECT * FROM (VALUES %s) AS v
+            (ord, dtc_master_id, cause, probability_weight,
+             evidence_count, avg_trust, avg_relevance)"""
+
+
+def _copy_text(value) -> str:
+    """Format a value for COPY text format."""
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def _sql_case(expr: str, mapping: dict, default: str) -> str:
+    """Render a mapping as a SQL CASE over lower(trim(expr))."""
+    whens = " ".join(
+        f"WHEN '{k}' THEN {v!r}" if isinstance(v, str)
+        else f"WHEN '{k}' THEN {v}"
+        for k, v in mapping.items()
+    )
+    return f"(CASE lower(trim({expr})) {whens} ELSE {default} END)"
+
+
+_CATEGORY_SQL_CASE = (
+    "(CASE WHEN COALESCE(d.category, '') = '' THEN 'unknown' ELSE "
+    + _sql_case("d.category", _CATEGORY_MAP, "lower(trim(d.category))")
+    + " END)"
+)
+_SEVERITY_SQL_CASE = _sql_case("d.severity", _SEVERITY_MAP, "3")
+_LIKELIHOOD_SQL_CASE = (
+    _sql_case("c.likelihood", _LIKELIHOOD_WEIGHTS, "0.5") + "::float8")
+
 
 class KnowledgeUpserter:
     """Upserts extracted DTC data into the normalized knowledge graph."""
 
-    def __init__(self):
-        self.run_id = str(uuid.uuid4())
+    def __init__(self, strict: bool = False):
+        """strict=True keeps full commit durability for the run.
+
+        By default the run commits with synchronous_commit off: the run is
+        idempotent, so a crash that loses the tail of the WAL is repaired by
+        the next run.
+        """
+        self.strict = strict
+        self.run_id = uuid.uuid4()
         self.resolution_log: List[dict] = []
+        self._known_tables: Optional[Set[Tuple[str, str]]] = None
+        self._pending_sources: List[tuple] = []
 
     def process_all(self) -> dict:
         """Run the full upsert pipeline for all DTCs.
@@ -49,22 +154,34 @@ class KnowledgeUpserter:
         }
 
         conn = get_connection()
+        cur = conn.cursor()
+        # Keep UUIDs as uuid.UUID end to end instead of str round-trips
+        register_uuid(conn_or_curs=cur)
+        discard = False
         try:
+            # Session tuning, scoped to this transaction. JIT compilation
+            # only adds latency to these short statements.
+            settings = "SET LOCAL jit = off;"
+            if not self.strict:
+                settings += " SET LOCAL synchronous_commit = off;"
+            cur.execute(settings)
+
             # Ensure knowledge schema exists
-            self._ensure_schema(conn)
+            self._ensure_schema(cur)
 
             # Step 1: Upsert dtc_master from refined.dtc_codes
-            dtc_map = self._upsert_dtc_master(conn)
+            dtc_map = self._upsert_dtc_master(cur)
             stats["dtc_master_upserted"] = len(dtc_map)
 
-            # Step 2: For each DTC, process child entities
-            for refined_dtc_id, master_id in dtc_map.items():
-                s = self._process_dtc_children(conn, refined_dtc_id, master_id)
+            # Step 2: Process child entities for all DTCs at once
+            if dtc_map:
+                s = self._process_dtc_children(cur, dtc_map)
                 for k, v in s.items():
                     stats[k] = stats.get(k, 0) + v
 
-            # Step 3: Write resolution log
-            self._write_resolution_log(conn)
+            # Step 3: Write queued provenance and the resolution log
+            self._flush_sources(cur)
+            self._write_resolution_log(cur)
 
             conn.commit()
             stats["duration_ms"] = int((time.time() - start) * 1000)
@@ -72,94 +189,110 @@ class KnowledgeUpserter:
             return stats
 
         except Exception:
-            conn.rollback()
+            # Don't let a failed rollback mask the original error; a
+            # connection that cannot roll back is discarded below.
+            try:
+                conn.rollback()
+            except Exception:
+                logger.exception("Rollback failed")
+                discard = True
             raise
         finally:
-            return_connection(conn)
+            try:
+                cur.close()
+            except Exception:
+                discard = True
+            return_connection(conn, close=discard)
 
-    def _ensure_schema(self, conn):
+    def _ensure_schema(self, cur):
         """Create knowledge schema if it doesn't exist yet."""
-        cur = conn.cursor()
-        cur.execute("CREATE SCHEMA IF NOT EXISTS knowledge")
+        self._load_known_tables(cur, "CREATE SCHEMA IF NOT EXISTS knowledge;")
+
+    def _load_known_tables(self, cur, prefix: str = ""):
+        """Fetch every table in the schemas we touch in one catalog query.
+
+        prefix is sent ahead of the query in the same round-trip.
+        """
+        cur.execute(prefix + """
+            SELECT table_schema, table_name FROM information_schema.tables
+            WHERE table_schema IN ('knowledge', 'refined', 'research')
+        """)
+        self._known_tables = {(schema, table) for schema, table in cur.fetchall()}
 
-    def _upsert_dtc_master(self, conn) -> dict:
+    def _upsert_dtc_master(self, cur) -> dict:
         """Upsert refined.dtc_codes -> knowledge.dtc_master.
 
         Returns mapping of refined_dtc_id -> knowledge_master_id.
         """
-        cur = conn.cursor()
 
         # Check if knowledge.dtc_master exists
-        cur.execute("""
-            SELECT EXISTS (
-                SELECT 1 FROM information_schema.tables
-                WHERE table_schema = 'knowledge' AND table_name = 'dtc_master'
-            )
-        """)
-        if not cur.fetchone()[0]:
+        if not self._table_exists(cur, "knowledge", "dtc_master"):
             logger.warning("knowledge.dtc_master table does not exist, skipping")
             return {}
 
-        cur.execute("""
-            SELECT d.id, d.code, d.description, d.category, d.severity,
-                   d.confidence_score, d.source_count
+        # Map, normalize and collapse refined rows to one row per code in
+        # SQL. DISTINCT ON prefers a row with a description so the batch
+        # never touches a code twice.
+        cur.execute(f"""
+            INSERT INTO knowledge.dtc_master
+                (code, system_category, generic_description,
+                 severity_level, emissions_related, created_at, updated_at)
+            SELECT DISTINCT ON (upper(trim(d.code)))
+                   upper(trim(d.code)),
+                   {_CATEGORY_SQL_CASE},
+                   d.description,
+                   {_SEVERITY_SQL_CASE},
+                   upper(trim(d.code)) LIKE 'P0%'
+                       AND length(trim(d.code)) = 5,
+                   NOW(), NOW()
             FROM refined.dtc_codes d
-            ORDER BY d.code
+            WHERE trim(COALESCE(d.code, '')) <> ''
+            ORDER BY upper(trim(d.code)), COALESCE(d.description, '') = ''
+            ON CONFLICT (code) DO UPDATE SET
+                generic_description = COALESCE(
+                    NULLIF(EXCLUDED.generic_description, ''),
+                    knowledge.dtc_master.generic_description
+                ),
+                system_category = COALESCE(
+                    NULLIF(EXCLUDED.system_category, ''),
+                    knowledge.dtc_master.system_category
+                ),
+                severity_level = COALESCE(
+                    EXCLUDED.severity_level,
+                    knowledge.dtc_master.severity_level
+                ),
+                updated_at = NOW()
         """)
-        rows = cur.fetchall()
 
-        dtc_map = {}
-        for row in rows:
-            refined_id, code, description, category, severity, conf, src_count = row
-            code = (code or "").strip().upper()
-            if not code:
-                continue
+        # Stream the refined_id -> master_id map through a server-side cursor
+        src = self._stream(cur, "dtc_master_src", """
+            SELECT d.id, m.id, m.code, d.confidence_score, d.source_count
+            FROM refined.dtc_codes d
+            JOIN knowledge.dtc_master m ON m.code = upper(trim(d.code))
+            ORDER BY m.code
+        """)
 
-            # Map category to system_category
-            system_category = self._map_category(category)
-            severity_level = self._map_severity(severity)
-
-            # Determine emissions_related from code prefix
-            emissions_related = code.startswith("P0") and len(code) == 5
-
-            cur.execute("""
-                INSERT INTO knowledge.dtc_master
-                    (code, system_category, generic_description,
-                     severity_level, emissions_related, created_at, updated_at)
-                VALUES (%s, %s, %s, %s, %s, NOW(), NOW())
-                ON CONFLICT (code) DO UPDATE SET
-                    generic_description = COALESCE(
-                        NULLIF(EXCLUDED.generic_description, ''),
-                        knowledge.dtc_master.generic_description
-                    ),
-                    system_category = COALESCE(
-                        NULLIF(EXCLUDED.system_category, ''),
-                        knowledge.dtc_master.system_category
-                    ),
-                    severity_level = COALESCE(
-                        EXCLUDED.severity_level,
-                        knowledge.dtc_master.severity_level
-                    ),
-                    updated_at = NOW()
-                RETURNING id
-            """, (code, system_category, description,
-                  severity_level, emissions_related))
-
-            master_id = cur.fetchone()[0]
-            dtc_map[str(refined_id)] = str(master_id)
+        dtc_map = {}
+        for refined_id, master_id, code, conf, src_count in src:
+            dtc_map[refined_id] = master_id
 
             self.resolution_log.append(build_resolution_entry(
                 "created" if src_count == 1 else "updated",
-                "knowledge.dtc_master", str(master_id),
+                "knowledge.dtc_master", master_id,
                 {"code": code, "source_count": src_count,
                  "confidence": conf},
             ))
+        src.close()
 
         return dtc_map
 
-    def _process_dtc_children(self, conn, refined_dtc_id: str,
-                              master_id: str) -> dict:
-        """Process all child entities for a single DTC."""
+    def _process_dtc_children(self, cur, dtc_map: dict) -> dict:
+        """Process child entities for every DTC in dtc_map.
+
+        dtc_map is materialized as a temp table so each child table is
+        handled with a constant number of set-based statements instead
+        of a query loop per DTC.
+        """
         stats = {
             "causes_upserted": 0,
             "steps_upserted": 0,
@@ -169,136 +302,150 @@ class KnowledgeUpserter:
             "entities_rejected": 0,
         }
 
-        cur = conn.cursor()
+        self._load_dtc_map(cur, dtc_map)
+        self._load_chunk_evals(cur)
 
-        # Get DTC code for sensor lookup
-        cur.execute("SELECT code FROM refined.dtc_codes WHERE id = %s",
-                    (refined_dtc_id,))
-        row = cur.fetchone()
-        if not row:
-            return stats
-        dtc_code = row[0]
+        # Merge/score causes in a helper thread while the connection runs
+        # the step and sensor statements; psycopg2 releases the GIL while
+        # waiting on the server. Only this thread touches the connection.
+        candidates_by_master = self._fetch_causes(cur)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            merging = pool.submit(self._merge_causes, candidates_by_master)
+
+            # Process diagnostic steps
+            s = self._upsert_diagnostic_steps(cur)
+            stats["steps_upserted"] += s.get("upserted", 0)
+            stats["entities_merged"] += s.get("merged", 0)
+            stats["sources_recorded"] += s.get("sources", 0)
+
+            # Process sensors
+            s = self._upsert_sensors(cur)
+            stats["sensors_upserted"] += s.get("upserted", 0)
+            stats["sources_recorded"] += s.get("sources", 0)
+
+            merged, rejected = merging.result()
 
         # Process causes
-        s = self._upsert_causes(conn, refined_dtc_id, master_id)
+        s = self._write_causes(cur, merged, rejected)
         stats["causes_upserted"] += s.get("upserted", 0)
         stats["entities_merged"] += s.get("merged", 0)
         stats["entities_rejected"] += s.get("rejected", 0)
         stats["sources_recorded"] += s.get("sources", 0)
 
-        # Process diagnostic steps
-        s = self._upsert_diagnostic_steps(conn, refined_dtc_id, master_id)
-        stats["steps_upserted"] += s.get("upserted", 0)
-        stats["entities_merged"] += s.get("merged", 0)
-        stats["sources_recorded"] += s.get("sources", 0)
-
-        # Process sensors
-        s = self._upsert_sensors(conn, dtc_code, master_id)
-        stats["sensors_upserted"] += s.get("upserted", 0)
-        stats["sources_recorded"] += s.get("sources", 0)
-
         return stats
 
-    def _upsert_causes(self, conn, refined_dtc_id: str,
-                       master_id: str) -> dict:
-        """Upsert refined.causes -> knowledge.dtc_possible_causes."""
-        cur = conn.cursor()
-        stats = {"upserted": 0, "merged": 0, "rejected": 0, "sources": 0}
+    def _load_dtc_map(self, cur, dtc_map: dict):
+        """Materialize refined_id -> master_id (plus the raw code) as tmp_dtc_map."""
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS tmp_dtc_map (
+                refined_id UUID PRIMARY KEY,
+                master_id UUID NOT NULL,
+                code TEXT NOT NULL
+            ) ON COMMIT DROP;
+            TRUNCATE tmp_dtc_map;
+        """)
+        execute_values(cur, """
+            INSERT INTO tmp_dtc_map (refined_id, master_id, code)
+            SELECT d.id, v.master_id, d.code
+            FROM (VALUES %s) AS v (refined_id, master_id)
+            JOIN refined.dtc_codes d ON d.id = v.refined_id
+        """, list(dtc_map.items()), template="(%s::uuid, %s::uuid)",
+            page_size=1000)
+        cur.execute("ANALYZE tmp_dtc_map")
+
+    def _load_chunk_evals(self, cur):
+        """Materialize chunk trust/relevance once as tmp_chunk_eval.
+
+        Causes, steps and sensors all join this narrow, indexed copy
+        instead of each re-joining research.chunk_evaluations.
+        """
+        cur.execute("""
+            DROP TABLE IF EXISTS tmp_chunk_eval;
+            CREATE TEMP TABLE tmp_chunk_eval (
+                chunk_id UUID PRIMARY KEY,
+                trust FLOAT NOT NULL,
+                relevance FLOAT NOT NULL
+            ) ON COMMIT DROP;
+            INSERT INTO tmp_chunk_eval (chunk_id, trust, relevance)
+            SELECT chunk_id, trust_score, relevance_score
+            FROM research.chunk_evaluations;
+            ANALYZE tmp_chunk_eval;
+        """)
+
+    @staticmethod
+    def _stream(cur, name: str, query: str):
+        """Run query on a named (server-side) cursor and return it.
 
-        # Check table exists
+        Rows are fetched _ITERSIZE at a time while iterating, so large
+        result sets are never fully materialized client-side.
+        """
+        src = cur.connection.cursor(name=name)
+        src.itersize = _ITERSIZE
+        register_uuid(conn_or_curs=src)
+        src.execute(query)
+        return src
+
+    def _fetch_causes(self, cur) -> dict:
+        """Read refined.causes for all DTCs as candidate lists per master id."""
         if not self._table_exists(cur, "knowledge", "dtc_possible_causes"):
-            return stats
+            return {}
 
-        # Fetch causes with evaluation scores
-        cur.execute("""
-            SELECT c.id, c.description, c.likelihood, c.confidence_score,
-                   c.source_chunk_id,
-                   COALESCE(ce.trust_score, 0.5) AS trust,
-                   COALESCE(ce.relevance_score, 0.5) AS relevance
+        # Stream causes for all DTCs with evaluation scores
+        src = self._stream(cur, "refined_causes_src", f"""
+            SELECT m.master_id, c.id, c.description,
+                   {_LIKELIHOOD_SQL_CASE} AS probability_weight,
+                   c.confidence_score, c.source_chunk_id,
+                   COALESCE(ce.trust, 0.5) AS trust,
+                   COALESCE(ce.relevance, 0.5) AS relevance
             FROM refined.causes c
-            LEFT JOIN research.chunk_evaluations ce
+            JOIN tmp_dtc_map m ON c.dtc_id = m.refined_id
+            LEFT JOIN tmp_chunk_eval ce
                 ON c.source_chunk_id = ce.chunk_id
-            WHERE c.dtc_id = %s
-        """, (refined_dtc_id,))
-        rows = cur.fetchall()
-
-        if not rows:
-            return stats
+        """)
 
-        # Build candidate list
-        candidates = []
-        for row in rows:
-            cid, desc, likelihood, conf, chunk_id, trust, relevance = row
-            prob_weight = self._likelihood_to_weight(likelihood)
-            score = compute_score(
-                entity_type="cause",
-                avg_trust=trust,
-                avg_relevance=relevance,
-                evidence_count=1,
-                probability_weight=prob_weight,
-            )
-            candidates.append({
-                "id": str(cid),
+        # Build candidate lists per master DTC
+        candidates_by_master: dict = {}
+        for row in src:
+            master_id, cid, desc, prob_weight, conf, chunk_id, trust, relevance = row
+            candidates_by_master.setdefault(master_id, []).append({
+                "id": cid,
                 "cause": desc or "",
                 "probability_weight": prob_weight,
                 "avg_trust": trust,
                 "avg_relevance": relevance,
                 "evidence_count": 1,
-                "score": score,
-                "source_chunk_ids": [str(chunk_id)] if chunk_id else [],
+                "source_chunk_ids": [chunk_id] if chunk_id else [],
             })
+        src.close()
+        return candidates_by_master
 
-        # Merge duplicates
-        merged, rejected = merge_text_entities(candidates, "cause")
-        stats["merged"] = len(rejected)
-        stats["rejected"] = len(rejected)
-
-        # Rescore merged entities
-        for entity in merged:
-            entity["score"] = compute_score(
-                entity_type="cause",
-                avg_trust=entity.get("avg_trust", 0),
-                avg_relevance=entity.get("avg_relevance", 0),
-                evidence_count=entity.get("evidence_count", 0),
-                probability_weight=entity.get("probability_weight", 0.5),
-            )
-
-        # Sort and upsert
-        merged.sort(key=sort_key)
-        for entity in merged:
-            cur.execute("""
-                INSERT INTO knowledge.dtc_possible_causes
-                    (dtc_master_id, cause, probability_weight,
-                     evidence_count, avg_trust, avg_relevance)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                ON CONFLICT (dtc_master_id, lower(cause)) DO UPDATE SET
-                    probability_weight = GREATEST(
-                        knowledge.dtc_possible_causes.probability_weight,
-                        EXCLUDED.probability_weight
-                    ),
-                    evidence_count = knowledge.dtc_possible_causes.evidence_count
-                        + EXCLUDED.evidence_count,
-                    avg_trust = (knowledge.dtc_possible_causes.avg_trust
-                        + EXCLUDED.avg_trust) / 2.0,
-                    avg_relevance = (knowledge.dtc_possible_causes.avg_relevance
-                        + EXCLUDED.avg_relevance) / 2.0
-                RETURNING id
-            """, (master_id, entity["cause"],
-                  entity.get("probability_weight", 0.5),
-                  entity.get("evidence_count", 1),
-                  entity.get("avg_trust", 0.5),
-                  entity.get("avg_relevance", 0.5)))
-
-            entity_id = str(cur.fetchone()[0])
-            stats["upserted"] += 1
+    @staticmethod
+    def _merge_causes(candidates_by_master: dict) -> Tuple[list, list]:
+        """Score, merge and rank cause candidates. Pure Python, no I/O.
 
-            # Record provenance
-            for chunk_id in entity.get("source_chunk_ids", []):
-                self._record_source(cur, "knowledge.dtc_possible_causes",
-                                    entity_id, chunk_id,
-                                    entity.get("avg_trust", 0),
-                                    entity.get("avg_relevance", 0))
-                stats["sources"] += 1
+        Returns ([(master_id, entity), ...], rejected_candidates).
+        """
+        # Score every candidate in one vectorized batch
+        all_candidates = [c for group in candidates_by_master.values()
+                          for c in group]
+        for c, score in zip(all_candidates,
+                            score_entities(all_candidates, "cause")):
+            c["score"] = score
+
+        # Merge duplicates, rescore and rank each DTC's causes
+        merged = []
+        rejected = []
+        for master_id, candidates in candidates_by_master.items():
+            ranked, group_rejected = score_and_rank(candidates, "cause", "cause")
+            rejected.extend(group_rejected)
+            for entity in ranked:
+                merged.append((master_id, entity))
+        return merged, rejected
+
+    def _write_causes(self, cur, merged: list, rejected: list) -> dict:
+        """Upsert merged causes -> knowledge.dtc_possible_causes."""
+        stats = {"upserted": 0, "merged": len(rejected),
+                 "rejected": len(rejected), "sources": 0}
 
         # Log rejected
         for rej in rejected:
@@ -310,68 +457,146 @@ class KnowledgeUpserter:
                  "original_text": rej.get("cause", "")[:200]},
             ))
 
+        if not merged:
+            return stats
+
+        rows = [
+            (i, master_id, entity["cause"],
+             entity.get("probability_weight", 0.5),
+             entity.get("evidence_count", 1),
+             entity.get("avg_trust", 0.5),
+             entity.get("avg_relevance", 0.5))
+            for i, (master_id, entity) in enumerate(merged)
+        ]
+        if len(rows) > _COPY_THRESHOLD:
+            returned = self._copy_upsert_causes(cur, rows)
+        else:
+            # One multi-row upsert for all merged causes
+            returned = execute_values(
+                cur,
+                _CAUSE_UPSERT_SQL.format(source=_CAUSE_VALUES_SOURCE),
+                rows,
+                template="(%s, %s::uuid, %s::text, %s::float8, %s::int,"
+                         " %s::float8, %s::float8)",
+                page_size=500, fetch=True)
+        stats["upserted"] = len(returned)
+        id_by_ord = dict(returned)
+
+        # Queue provenance for all causes; flushed once per run
+        unmatched = 0
+        for i, (master_id, entity) in enumerate(merged):
+            entity_id = id_by_ord.get(i)
+            if entity_id is None:
+                unmatched += 1
+                continue
+            for chunk_id in entity.get("source_chunk_ids", []):
+                self._record_source("knowledge.dtc_possible_causes",
+                                    entity_id, chunk_id,
+                                    entity.get("avg_trust", 0),
+                                    entity.get("avg_relevance", 0))
+                stats["sources"] += 1
+
+        if unmatched:
+            logger.warning(f"{unmatched} upserted causes returned no id; "
+                           f"their provenance was not recorded")
         return stats
 
-    def _upsert_diagnostic_steps(self, conn, refined_dtc_id: str,
-                                 master_id: str) -> dict:
-        """Upsert refined.diagnostic_steps -> knowledge.dtc_diagnostic_steps."""
-        cur = conn.cursor()
+    def _copy_upsert_causes(self, cur, rows: List[tuple]) -> List[tuple]:
+        """Upsert causes by COPYing into a staging table first.
+
+        Used for large runs, where execute_values' per-page statement
+        overhead dominates. Returns the same (ord, id) rows as the
+        execute_values path.
+        """
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS tmp_causes_stage (
+                ord INT,
+                dtc_master_id UUID,
+                cause TEXT,
+                probability_weight FLOAT,
+                evidence_count INT,
+                avg_trust FLOAT,
+                avg_relevance FLOAT
+            ) ON COMMIT DROP;
+            TRUNCATE tmp_causes_stage;
+        """)
+        buf = io.StringIO()
+        for row in rows:
+            buf.write("\t".join(_copy_text(v) for v in row))
+            buf.write("\n")
+        buf.seek(0)
+        cur.copy_expert("COPY tmp_causes_stage FROM STDIN", buf)
+        cur.execute(_CAUSE_UPSERT_SQL.format(
+            source="SELECT * FROM tmp_causes_stage"))
+        return cur.fetchall()
+
+    def _upsert_diagnostic_steps(self, cur) -> dict:
+        """Upsert refined.diagnostic_steps -> knowledge.dtc_diagnostic_steps.
+
+        Steps and their provenance rows are written by a single
+        INSERT ... SELECT over tmp_dtc_map. Step ids are generated in the
+        source CTE so provenance can join on them directly.
+        """
         stats = {"upserted": 0, "merged": 0, "sources": 0}
 
         if not self._table_exists(cur, "knowledge", "dtc_diagnostic_steps"):
             return stats
 
+        if self._table_exists(cur, "knowledge", "dtc_entity_sources"):
+            provenance = """
+                , prov AS (
+                    INSERT INTO knowledge.dtc_entity_sources
+                        (entity_table, entity_id, chunk_id,
+                         trust_score, relevance_score)
+                    SELECT 'knowledge.dtc_diagnostic_steps', id,
+                           source_chunk_id, trust, relevance
+                    FROM src
+                    WHERE source_chunk_id IS NOT NULL
+                    RETURNING 1
+                )
+                SELECT (SELECT count(*) FROM src), (SELECT count(*) FROM prov)
+            """
+        else:
+            provenance = "SELECT (SELECT count(*) FROM src), 0"
+
+        # dtc_diagnostic_steps has no unique key, so every source row is
+        # inserted and provenance can use the pre-generated ids directly.
         cur.execute("""
-            SELECT ds.id, ds.step_order, ds.description, ds.tools_required,
-                   ds.expected_values, ds.confidence_score, ds.source_chunk_id,
-                   COALESCE(ce.trust_score, 0.5) AS trust,
-                   COALESCE(ce.relevance_score, 0.5) AS relevance
-            FROM refined.diagnostic_steps ds
-            LEFT JOIN research.chunk_evaluations ce
-                ON ds.source_chunk_id = ce.chunk_id
-            WHERE ds.dtc_id = %s
-            ORDER BY ds.step_order
-        """, (refined_dtc_id,))
-        rows = cur.fetchall()
-
-        if not rows:
-            return stats
-
-        for row in rows:
-            (sid, step_order, desc, tools, expected,
-             conf, chunk_id, trust, relevance) = row
-
-            score = compute_score(
-                entity_type="step",
-                avg_trust=trust,
-                avg_relevance=relevance,
-                evidence_count=1,
-            )
-
-            cur.execute("""
+            WITH src AS MATERIALIZED (
+                SELECT uuid_generate_v4() AS id, m.master_id,
+                       COALESCE(ds.step_order, 1) AS step_order,
+                       COALESCE(ds.description, '') AS instruction,
+                       ds.source_chunk_id,
+                       COALESCE(ce.trust, 0.5) AS trust,
+                       COALESCE(ce.relevance, 0.5) AS relevance
+                FROM refined.diagnostic_steps ds
+                JOIN tmp_dtc_map m ON ds.dtc_id = m.refined_id
+                LEFT JOIN tmp_chunk_eval ce
+                    ON ds.source_chunk_id = ce.chunk_id
+            ),
+            ins AS (
                 INSERT INTO knowledge.dtc_diagnostic_steps
-                    (dtc_master_id, step_order, instruction,
+                    (id, dtc_master_id, step_order, instruction,
                      evidence_count, avg_trust, avg_relevance)
-                VALUES (%s, %s, %s, 1, %s, %s)
-                ON CONFLICT DO NOTHING
-                RETURNING id
-            """, (master_id, step_order or 1, desc or "", trust, relevance))
-
-            result = cur.fetchone()
-            if result:
-                entity_id = str(result[0])
-                stats["upserted"] += 1
-                if chunk_id:
-                    self._record_source(
-                        cur, "knowledge.dtc_diagnostic_steps",
-                        entity_id, str(chunk_id), trust, relevance)
-                    stats["sources"] += 1
+                SELECT id, master_id, step_order, instruction,
+                       1, trust, relevance
+                FROM src
+                ORDER BY master_id, step_order
+            )
+        """ + provenance)
+        stats["upserted"], stats["sources"] = cur.fetchone()
 
         return stats
 
-    def _upsert_sensors(self, conn, dtc_code: str, master_id: str) -> dict:
-        """Upsert refined.sensors -> knowledge.dtc_related_sensors."""
-        cur = conn.cursor()
+    def _upsert_sensors(self, cur) -> dict:
+        """Upsert refined.sensors -> knowledge.dtc_related_sensors.
+
+        Matching refined sensors are staged once in tmp_dtc_sensors; sensor
+        types, sensors and DTC links are then each written by one
+        set-based statement over that staging table. Links are aggregated
+        per (DTC, sensor) before the upsert so a statement never touches
+        the same row twice.
+        """
         stats = {"upserted": 0, "sources": 0}
 
         if not self._table_exists(cur, "knowledge", "sensors"):
@@ -379,132 +604,172 @@ class KnowledgeUpserter:
         if not self._table_exists(cur, "knowledge", "dtc_related_sensors"):
             return stats
 
+        # Resolve refined sensors for all DTCs once; every statement below
+        # reads from this instead of re-running the code match and the
+        # evaluation join. Unnesting the code array turns the match into
+        # an equi-join the planner can hash.
         cur.execute("""
-            SELECT s.id, s.name, s.sensor_type, s.typical_range, s.unit,
-                   s.source_chunk_id, s.confidence_score,
-                   COALESCE(ce.trust_score, 0.5) AS trust,
-                   COALESCE(ce.relevance_score, 0.5) AS relevance
+            DROP TABLE IF EXISTS tmp_dtc_sensors;
+            CREATE TEMP TABLE tmp_dtc_sensors ON COMMIT DROP AS
+            SELECT m.master_id,
+                   COALESCE(NULLIF(s.name, ''), 'unknown') AS name,
+                   NULLIF(s.sensor_type, '') AS sensor_type,
+                   s.source_chunk_id,
+                   COALESCE(ce.trust, 0.5) AS trust,
+                   COALESCE(ce.relevance, 0.5) AS relevance
             FROM refined.sensors s
-            LEFT JOIN research.chunk_evaluations ce
+            CROSS JOIN LATERAL (
+                SELECT DISTINCT unnest(s.related_dtc_codes) AS code
+            ) rc
+            JOIN tmp_dtc_map m ON m.code = rc.code
+            LEFT JOIN tmp_chunk_eval ce
                 ON s.source_chunk_id = ce.chunk_id
-            WHERE %s = ANY(s.related_dtc_codes)
-        """, (dtc_code,))
-        rows = cur.fetchall()
-
-        if not rows:
+        """)
+        if not cur.rowcount:
             return stats
 
-        for row in rows:
-            (sid, name, stype, range_str, unit,
-             chunk_id, conf, trust, relevance) = row
-
-            # Ensure sensor_type exists
-            sensor_type_id = None
-            if stype:
-                cur.execute("""
-                    INSERT INTO knowledge.sensor_types (name)
-                    VALUES (%s)
-                    ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
-                    RETURNING id
-                """, (stype,))
-                sensor_type_id = str(cur.fetchone()[0])
-
-            # Upsert sensor
-            cur.execute("""
-                INSERT INTO knowledge.sensors
-                    (name, sensor_type_id, manufacturer)
-                VALUES (%s, %s, NULL)
-                ON CONFLICT (name, COALESCE(manufacturer, ''))
-                DO UPDATE SET name = EXCLUDED.name
-                RETURNING id
-            """, (name or "unknown", sensor_type_id))
-            knowledge_sensor_id = str(cur.fetchone()[0])
-
-            # Link to DTC
-            score = compute_score(
-                entity_type="sensor",
-                avg_trust=trust,
-                avg_relevance=relevance,
-                evidence_count=1,
-            )
+        # Ensure each distinct sensor type exists
+        cur.execute("""
+            INSERT INTO knowledge.sensor_types (name)
+            SELECT DISTINCT sensor_type FROM tmp_dtc_sensors
+            WHERE sensor_type IS NOT NULL
+            ON CONFLICT (name) DO NOTHING
+        """)
+
+        # Ensure sensors exist; types are resolved with one join
+        cur.execute("""
+            INSERT INTO knowledge.sensors (name, sensor_type_id, manufacturer)
+            SELECT DISTINCT ON (t.name) t.name, st.id, NULL
+            FROM tmp_dtc_sensors t
+            LEFT JOIN knowledge.sensor_types st ON st.name = t.sensor_type
+            ORDER BY t.name, st.id IS NULL
+            ON CONFLICT (name, COALESCE(manufacturer, '')) DO NOTHING
+        """)
 
-            cur.execute("""
+        if self._table_exists(cur, "knowledge", "dtc_entity_sources"):
+            provenance = """
+                , prov AS (
+                    INSERT INTO knowledge.dtc_entity_sources
+                        (entity_table, entity_id, chunk_id,
+                         trust_score, relevance_score)
+                    SELECT 'knowledge.dtc_related_sensors', ins.id,
+                           src.source_chunk_id, src.trust, src.relevance
+                    FROM src
+                    JOIN ins ON ins.dtc_master_id = src.master_id
+                        AND ins.sensor_id = src.sensor_id
+                    WHERE src.source_chunk_id IS NOT NULL
+                    ON CONFLICT DO NOTHING
+                    RETURNING 1
+                )
+                SELECT (SELECT count(*) FROM ins), (SELECT count(*) FROM prov)
+            """
+        else:
+            provenance = "SELECT (SELECT count(*) FROM ins), 0"
+
+        # Link sensors to DTCs
+        cur.execute("""
+            WITH src AS MATERIALIZED (
+                SELECT t.master_id, ks.id AS sensor_id, t.source_chunk_id,
+                       t.trust, t.relevance
+                FROM tmp_dtc_sensors t
+                JOIN knowledge.sensors ks
+                    ON ks.name = t.name AND ks.manufacturer IS NULL
+            ),
+            agg AS (
+                SELECT master_id, sensor_id, count(*) AS evidence_count,
+                       avg(trust) AS avg_trust,
+                       avg(relevance) AS avg_relevance,
+                       row_number() OVER (
+                           PARTITION BY master_id
+                           ORDER BY avg(trust) DESC, avg(relevance) DESC,
+                                    sensor_id
+                       ) AS priority_rank
+                FROM src
+                GROUP BY master_id, sensor_id
+            ),
+            ins AS (
                 INSERT INTO knowledge.dtc_related_sensors
                     (dtc_master_id, sensor_id, priority_rank,
                      evidence_count, avg_trust, avg_relevance)
-                VALUES (%s, %s, %s, 1, %s, %s)
+                SELECT master_id, sensor_id, priority_rank,
+                       evidence_count, avg_trust, avg_relevance
+                FROM agg
                 ON CONFLICT (dtc_master_id, sensor_id) DO UPDATE SET
-                    evidence_count = knowledge.dtc_related_sensors.evidence_count + 1,
+                    evidence_count = knowledge.dtc_related_sensors.evidence_count
+                        + EXCLUDED.evidence_count,
                     avg_trust = (knowledge.dtc_related_sensors.avg_trust
                         + EXCLUDED.avg_trust) / 2.0,
                     avg_relevance = (knowledge.dtc_related_sensors.avg_relevance
                         + EXCLUDED.avg_relevance) / 2.0
-                RETURNING id
-            """, (master_id, knowledge_sensor_id,
-                  stats["upserted"] + 1, trust, relevance))
-
-            result = cur.fetchone()
-            if result:
-                stats["upserted"] += 1
-                if chunk_id:
-                    self._record_source(
-                        cur, "knowledge.dtc_related_sensors",
-                        str(result[0]), str(chunk_id), trust, relevance)
-                    stats["sources"] += 1
+                RETURNING id, dtc_master_id, sensor_id
+            )
+        """ + provenance)
+        stats["upserted"], stats["sources"] = cur.fetchone()
 
         return stats
 
-    def _record_source(self, cur, entity_table: str, entity_id: str,
+    def _record_source(self, entity_table: str, entity_id: str,
                        chunk_id: str, trust: float, relevance: float):
-        """Record provenance in knowledge.dtc_entity_sources."""
+        """Queue a provenance row for knowledge.dtc_entity_sources.
+
+        Rows are written in bulk by _flush_sources.
+        """
+        self._pending_sources.append(
+            (entity_table, entity_id, chunk_id, trust, relevance))
+
+    def _flush_sources(self, cur):
+        """Write all queued provenance rows in one batch."""
+        if not self._pending_sources:
+            return
         if not self._table_exists(cur, "knowledge", "dtc_entity_sources"):
+            self._pending_sources.clear()
             return
         try:
-            cur.execute("""
+            execute_values(cur, """
                 INSERT INTO knowledge.dtc_entity_sources
                     (entity_table, entity_id, chunk_id,
                      trust_score, relevance_score)
-                VALUES (%s, %s, %s, %s, %s)
+                VALUES %s
                 ON CONFLICT DO NOTHING
-            """, (entity_table, entity_id, chunk_id, trust, relevance))
+            """, self._pending_sources, page_size=1000)
         except Exception as e:
-            logger.warning(f"Failed to record source: {e}")
+            logger.warning(f"Failed to record sources: {e}")
+        self._pending_sources.clear()
 
-    def _write_resolution_log(self, conn):
+    def _write_resolution_log(self, cur):
         """Write all resolution log entries to knowledge.resolution_log."""
-        cur = conn.cursor()
         if not self._table_exists(cur, "knowledge", "resolution_log"):
             return
 
-        for entry in self.resolution_log:
-            try:
-                import json
-                cur.execute("""
-                    INSERT INTO knowledge.resolution_log
-                        (dtc_master_id, run_id, action,
-                         entity_table, entity_id, details)
-                    VALUES (%s, %s, %s, %s, %s, %s::jsonb)
-                """, (
-                    entry.get("dtc_master_id"),
-                    self.run_id,
-                    entry["action"],
-                    entry.get("entity_table"),
-                    entry.get("entity_id"),
-                    json.dumps(entry.get("details", {})),
-                ))
-            except Exception as e:
-                logger.warning(f"Failed to write resolution log: {e}")
+        if not self.resolution_log:
+            return
 
-    @staticmethod
-    def _table_exists(cur, schema: str, table: str) -> bool:
-        """Check if a table exists in the database."""
-        cur.execute("""
-            SELECT EXISTS (
-                SELECT 1 FROM information_schema.tables
-                WHERE table_schema = %s AND table_name = %s
-            )
-        """, (schema, table))
-        return cur.fetchone()[0]
+        rows = [
+            (entry.get("dtc_master_id"), self.run_id, entry["action"],
+             entry.get("entity_table"), entry.get("entity_id"),
+             json.dumps(entry.get("details", {}), default=str))
+            for entry in self.resolution_log
+        ]
+        try:
+            execute_values(cur, """
+                INSERT INTO knowledge.resolution_log
+                    (dtc_master_id, run_id, action,
+                     entity_table, entity_id, details)
+                VALUES %s
+            """, rows, template="(%s, %s, %s, %s, %s, %s::jsonb)",
+                page_size=1000)
+        except Exception as e:
+            logger.warning(f"Failed to write resolution log: {e}")
+
+    def _table_exists(self, cur, schema: str, table: str) -> bool:
+        """Check if a table exists in the database.
+
+        Answered from the table set loaded once per run by _ensure_schema;
+        tables are not created or dropped mid-run.
+        """
+        if self._known_tables is None:
+            self._load_known_tables(cur)
+        return (schema, table) in self._known_tables
 
     @staticmethod
     def _map_category(category: Optional[str]) -> str:
@@ -512,39 +777,18 @@ class KnowledgeUpserter:
         if not category:
             return "unknown"
         cat = category.lower().strip()
-        mapping = {
-            "powertrain": "powertrain",
-            "chassis": "chassis",
-            "body": "body",
-            "network": "network",
-            "engine": "powertrain",
-            "transmission": "powertrain",
-            "electrical": "electrical",
-            "emissions": "emissions",
-        }
-        return mapping.get(cat, cat)
+        return _CATEGORY_MAP.get(cat, cat)
 
     @staticmethod
     def _map_severity(severity: Optional[str]) -> int:
         """Map severity text to 1-5 integer."""
         if not severity:
             return 3
-        sev = severity.lower().strip()
-        mapping = {
-            "critical": 5, "high": 4, "medium": 3,
-            "low": 2, "informational": 1, "info": 1,
-        }
-        return mapping.get(sev, 3)
+        return _SEVERITY_MAP.get(severity.lower().strip(), 3)
 
     @staticmethod
     def _likelihood_to_weight(likelihood: Optional[str]) -> float:
         """Map likelihood text to probability_weight 0-1."""
         if not likelihood:
             return 0.5
-        lik = likelihood.lower().strip()
-        mapping = {
-            "high": 0.85, "medium": 0.55, "low": 0.25,
-            "very high": 0.95, "very low": 0.10,
-            "certain": 1.0, "unlikely": 0.15,
-        }
-        return mapping.get(lik, 0.5)
+        return _LIKELIHOOD_WEIGHTS.get(likelihood.lower().strip(), 0.5)
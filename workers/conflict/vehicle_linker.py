@@ -10,19 +10,37 @@ Also rolls up per-chunk document_categories into a majority-vote
 document_type on research.documents.
 """
 
+import io
+import re
 import sys
 import logging
 
 sys.path.insert(0, "/app")
 
+from psycopg2.extras import execute_values
+
 from shared.db import get_connection, return_connection
 
 logger = logging.getLogger(__name__)
 
+# Above this many rows, link tables are loaded with COPY into a staging
+# table instead of execute_values
+_COPY_THRESHOLD = 10_000
+
+# Vehicle mention rows fetched per round-trip from the server-side cursor
+_MENTION_ITERSIZE = 500
+
+# Keywords marking an automatic transmission, matched in one scan
+_AUTOMATIC_RE = re.compile("auto|cvt|dct|dsg")
+
 
 def link_vehicles_for_document(doc_id: str) -> dict:
     """Process all unlinked vehicle mentions for chunks belonging to doc_id.
 
+    Mentions are expanded to (make, model, year) keys in Python and each
+    table is then resolved and written with a fixed number of set-based
+    statements, so round-trips no longer grow with the number of mentions.
+
     Returns stats dict with counts of actions taken.
     """
     stats = {
@@ -37,8 +55,11 @@ def link_vehicles_for_document(doc_id: str) -> dict:
     try:
         cur = conn.cursor()
 
-        # --- 1. Get unlinked vehicle mentions for this document's chunks ---
-        cur.execute(
+        # --- 1. Stream unlinked vehicle mentions for this document's
+        # chunks through a server-side cursor, _MENTION_ITERSIZE at a time
+        mentions = conn.cursor(name="vehicle_mentions_src")
+        mentions.itersize = _MENTION_ITERSIZE
+        mentions.execute(
             """SELECT vm.id, vm.make, vm.model, vm.year_start, vm.year_end,
                       vm.engine, vm.transmission, vm.related_dtc_codes,
                       vm.source_chunk_id
@@ -47,59 +68,10 @@ def link_vehicles_for_document(doc_id: str) -> dict:
                WHERE dc.document_id = %s AND vm.linked = FALSE""",
             (doc_id,)
         )
-        mentions = cur.fetchall()
-        stats["mentions_processed"] = len(mentions)
-
-        for row in mentions:
-            (mention_id, make, model, year_start, year_end,
-             engine, transmission, dtc_codes, chunk_id) = row
-
-            make_norm = make.strip().title()
-            model_norm = model.strip()
-
-            # Generate year range to link
-            if year_start and year_end:
-                years = range(year_start, year_end + 1)
-            elif year_start:
-                years = [year_start]
-            elif year_end:
-                years = [year_end]
-            else:
-                years = [None]
-
-            for year in years:
-                vehicle_id = _find_or_create_vehicle(
-                    cur, make_norm, model_norm, year, stats
-                )
-                if not vehicle_id:
-                    continue
-
-                # Link DTCs to this vehicle
-                for dtc_code in (dtc_codes or []):
-                    dtc_code = dtc_code.strip().upper()
-                    if not dtc_code:
-                        continue
-                    _link_dtc_to_vehicle(
-                        cur, vehicle_id, dtc_code, chunk_id, stats
-                    )
-
-                # Link engine if mentioned
-                if engine and engine.strip():
-                    _link_engine_to_vehicle(
-                        cur, vehicle_id, engine.strip(), make_norm
-                    )
-
-                # Link transmission if mentioned
-                if transmission and transmission.strip():
-                    _link_transmission_to_vehicle(
-                        cur, vehicle_id, transmission.strip()
-                    )
-
-            # Mark mention as linked
-            cur.execute(
-                "UPDATE refined.vehicle_mentions SET linked = TRUE WHERE id = %s",
-                (mention_id,)
-            )
+        try:
+            _link_mentions(cur, mentions, stats)
+        finally:
+            mentions.close()
 
         # --- 2. Set document category by majority vote ---
         _set_document_category(cur, doc_id, stats)
@@ -115,198 +87,309 @@ def link_vehicles_for_document(doc_id: str) -> dict:
     return stats
 
 
-def _find_or_create_vehicle(cur, make, model, year, stats) -> str:
-    """Find an existing vehicle or create one. Returns vehicle UUID."""
-    if year:
-        cur.execute(
-            """SELECT id FROM vehicle.vehicles
-               WHERE LOWER(make) = LOWER(%s)
-                 AND LOWER(model) = LOWER(%s)
-                 AND year = %s
-               LIMIT 1""",
-            (make, model, year)
-        )
-    else:
-        # No year - match any year for this make/model
-        cur.execute(
-            """SELECT id FROM vehicle.vehicles
-               WHERE LOWER(make) = LOWER(%s)
-                 AND LOWER(model) = LOWER(%s)
-               LIMIT 1""",
-            (make, model)
-        )
+def _link_mentions(cur, mentions, stats):
+    """Resolve vehicles for all mentions and write every link in bulk.
 
-    row = cur.fetchone()
-    if row:
-        stats["vehicles_matched"] += 1
-        return str(row[0])
-
-    # Create new vehicle entry
-    if not year:
-        return None  # Don't create vehicles without a year
+    mentions is iterated once, so rows can be streamed; only their
+    normalized form is kept.
+    """
+    # Normalize each mention once: its case-insensitive (make, model,
+    # year) vehicle keys (year is None when the mention has no year and
+    # may match any model year) plus cleaned DTC codes, engine and
+    # transmission shared by all of those years. spellings keeps the
+    # first spelling of each key for inserts.
+    mention_ids = []
+    entries = []
+    spellings = {}
+    for (mention_id, make, model, year_start, year_end,
+         engine, transmission, dtc_codes, chunk_id) in mentions:
+        mention_ids.append(mention_id)
+        make_norm = make.strip().title()
+        model_norm = model.strip()
+        make_key = make_norm.lower()
+        model_key = model_norm.lower()
+
+        # Generate year range to link
+        if year_start and year_end:
+            years = range(year_start, year_end + 1)
+        elif year_start:
+            years = [year_start]
+        elif year_end:
+            years = [year_end]
+        else:
+            years = [None]
 
-    try:
-        cur.execute(
-            """INSERT INTO vehicle.vehicles (make, model, year)
-               VALUES (%s, %s, %s)
-               ON CONFLICT (year, make, model, COALESCE(generation, ''),
-                           COALESCE(trim, ''))
-               DO UPDATE SET updated_at = NOW()
-               RETURNING id""",
-            (make, model, year)
-        )
-        row = cur.fetchone()
-        if row:
-            stats["vehicles_created"] += 1
-            return str(row[0])
-    except Exception as e:
-        logger.warning(f"Failed to create vehicle {year} {make} {model}: {e}")
+        keys = [(make_key, model_key, year) for year in years]
+        for key in keys:
+            spellings.setdefault(key, (make_norm, model_norm))
 
-    return None
+        codes = [c for c in (code.strip().upper()
+                             for code in dtc_codes or ()) if c]
+        entries.append((keys, make_norm, (engine or "").strip(),
+                        (transmission or "").strip(), codes, chunk_id))
 
+    stats["mentions_processed"] = len(mention_ids)
+    if not mention_ids:
+        return
 
-def _link_dtc_to_vehicle(cur, vehicle_id, dtc_code, chunk_id, stats):
-    """Link a DTC code to a vehicle via vehicle.vehicle_dtc_codes."""
-    # Look up the DTC id
+    vehicle_ids, created = _resolve_vehicles(cur, spellings)
+
+    resolved = 0
+    dtc_links = {}
+    engine_links = {}
+    trans_links = set()
+    for keys, make, engine, transmission, codes, chunk_id in entries:
+        for key in keys:
+            vehicle_id = vehicle_ids.get(key)
+            if not vehicle_id:
+                continue
+            resolved += 1
+
+            # First mention of a (vehicle, DTC) pair supplies the chunk
+            for code in codes:
+                dtc_links.setdefault((vehicle_id, code), chunk_id)
+            if engine:
+                engine_links.setdefault((vehicle_id, engine), make)
+            if transmission:
+                trans_links.add((vehicle_id, transmission))
+
+    stats["vehicles_matched"] = resolved - created
+    stats["vehicles_created"] = created
+
+    if dtc_links:
+        stats["dtc_links_created"] = _link_dtcs(cur, dtc_links)
+    if engine_links:
+        _link_engines(cur, engine_links)
+    if trans_links:
+        _link_transmissions(cur, trans_links)
+
+    # Mark mentions as linked
     cur.execute(
-        "SELECT id FROM refined.dtc_codes WHERE code = %s",
-        (dtc_code,)
+        "UPDATE refined.vehicle_mentions SET linked = TRUE "
+        "WHERE id = ANY(%s::uuid[])",
+        (mention_ids,)
     )
-    dtc_row = cur.fetchone()
-    if not dtc_row:
-        return
 
-    dtc_id = str(dtc_row[0])
 
-    try:
-        cur.execute(
-            """INSERT INTO vehicle.vehicle_dtc_codes
-               (vehicle_id, dtc_id, source_chunk_id, confidence_score)
-               VALUES (%s, %s, %s, 0.5)
-               ON CONFLICT (vehicle_id, dtc_id) DO NOTHING""",
-            (vehicle_id, dtc_id, chunk_id)
-        )
-        if cur.rowcount > 0:
-            stats["dtc_links_created"] += 1
-    except Exception as e:
-        logger.debug(f"DTC link failed {vehicle_id}->{dtc_code}: {e}")
+def _resolve_vehicles(cur, spellings):
+    """Find or create vehicles for every (make, model, year) key.
 
+    spellings maps lowercased (make, model, year) keys to the (make,
+    model) spelling used when a vehicle has to be created. Vehicles are
+    only created for keys that carry a year; year-less keys are resolved
+    last so they can match vehicles created here.
 
-def _link_engine_to_vehicle(cur, vehicle_id, engine_desc, make):
-    """Find or create an engine and link to vehicle."""
-    # Try to find existing engine by code
-    cur.execute(
-        """SELECT id FROM vehicle.engines
-           WHERE LOWER(engine_code) = LOWER(%s)
-           LIMIT 1""",
-        (engine_desc,)
-    )
-    row = cur.fetchone()
+    Returns (key -> vehicle UUID, number of vehicles created).
+    """
+    dated = [k for k in spellings if k[2] is not None]
+    undated = [k for k in spellings if k[2] is None]
+    vehicle_ids = {}
+    created = 0
+
+    if dated:
+        rows = execute_values(cur, """
+            SELECT DISTINCT ON (k.make, k.model, k.year)
+                   k.make, k.model, k.year, v.id
+            FROM (VALUES %s) AS k (make, model, year)
+            JOIN vehicle.vehicles v
+              ON LOWER(v.make) = k.make
+             AND LOWER(v.model) = k.model
+             AND v.year = k.year
+        """, dated, template="(%s, %s, %s::int)", page_size=1000,
+            fetch=True)
+        vehicle_ids.update(((mk, md, yr), str(vid)) for mk, md, yr, vid in rows)
+
+        # Create new vehicle entries
+        missing = [spellings[k] + (k[2],) for k in dated
+                   if k not in vehicle_ids]
+        if missing:
+            rows = execute_values(cur, """
+                INSERT INTO vehicle.vehicles (make, model, year)
+                VALUES %s
+                ON CONFLICT (year, make, model, COALESCE(generation, ''),
+                            COALESCE(trim, ''))
+                DO UPDATE SET updated_at = NOW()
+                RETURNING make, model, year, id
+            """, missing, page_size=1000, fetch=True)
+            for mk, md, yr, vid in rows:
+                vehicle_ids[(mk.lower(), md.lower(), yr)] = str(vid)
+            created = len(rows)
+
+    if undated:
+        # No year - match any year for this make/model
+        rows = execute_values(cur, """
+            SELECT DISTINCT ON (k.make, k.model) k.make, k.model, v.id
+            FROM (VALUES %s) AS k (make, model)
+            JOIN vehicle.vehicles v
+              ON LOWER(v.make) = k.make
+             AND LOWER(v.model) = k.model
+        """, [k[:2] for k in undated], page_size=1000, fetch=True)
+        vehicle_ids.update(((mk, md, None), str(vid)) for mk, md, vid in rows)
 
-    if not row:
-        # Create a new engine entry
-        try:
-            cur.execute(
-                """INSERT INTO vehicle.engines (engine_code, manufacturer)
-                   VALUES (%s, %s)
-                   ON CONFLICT (engine_code) DO UPDATE
-                   SET updated_at = NOW()
-                   RETURNING id""",
-                (engine_desc, make)
-            )
-            row = cur.fetchone()
-        except Exception as e:
-            logger.debug(f"Engine create failed: {e}")
-            return
-
-    if not row:
-        return
+    return vehicle_ids, created
 
-    engine_id = str(row[0])
-    try:
-        cur.execute(
-            """INSERT INTO vehicle.vehicle_engines (vehicle_id, engine_id)
-               VALUES (%s, %s)
-               ON CONFLICT (vehicle_id, engine_id) DO NOTHING""",
-            (vehicle_id, engine_id)
-        )
-    except Exception as e:
-        logger.debug(f"Engine link failed: {e}")
 
+def _link_dtcs(cur, dtc_links) -> int:
+    """Link DTC codes to vehicles via vehicle.vehicle_dtc_codes.
 
-def _link_transmission_to_vehicle(cur, vehicle_id, trans_desc):
-    """Find or create a transmission and link to vehicle."""
+    Returns the number of links created.
+    """
+    # Look up every DTC id at once
     cur.execute(
-        """SELECT id FROM vehicle.transmissions
-           WHERE LOWER(transmission_code) = LOWER(%s)
-           LIMIT 1""",
-        (trans_desc,)
+        """SELECT DISTINCT ON (code) code, id FROM refined.dtc_codes
+           WHERE code = ANY(%s)""",
+        (list({code for _, code in dtc_links}),)
     )
-    row = cur.fetchone()
-
-    if not row:
-        # Infer type from description
-        desc_lower = trans_desc.lower()
-        if "manual" in desc_lower:
-            trans_type = "manual"
-        elif any(w in desc_lower for w in ["auto", "cvt", "dct", "dsg"]):
-            trans_type = "automatic"
-        else:
-            trans_type = "unknown"
+    dtc_ids = {code: str(dtc_id) for code, dtc_id in cur.fetchall()}
 
-        try:
-            cur.execute(
-                """INSERT INTO vehicle.transmissions
-                   (transmission_code, transmission_type)
-                   VALUES (%s, %s)
-                   ON CONFLICT (transmission_code) DO UPDATE
-                   SET updated_at = NOW()
-                   RETURNING id""",
-                (trans_desc, trans_type)
-            )
-            row = cur.fetchone()
-        except Exception as e:
-            logger.debug(f"Transmission create failed: {e}")
-            return
-
-    if not row:
-        return
+    rows = [
+        (vehicle_id, dtc_ids[code], chunk_id)
+        for (vehicle_id, code), chunk_id in dtc_links.items()
+        if code in dtc_ids
+    ]
+    if not rows:
+        return 0
 
-    trans_id = str(row[0])
-    try:
-        cur.execute(
-            """INSERT INTO vehicle.vehicle_transmissions
-               (vehicle_id, transmission_id)
-               VALUES (%s, %s)
-               ON CONFLICT (vehicle_id, transmission_id) DO NOTHING""",
-            (vehicle_id, trans_id)
-        )
-    except Exception as e:
-        logger.debug(f"Transmission link failed: {e}")
+    # confidence_score is left to its 0.5 column default
+    return _insert_links(cur, "vehicle_dtc_codes",
+                         ("vehicle_id", "dtc_id", "source_chunk_id"), rows)
 
 
-def _set_document_category(cur, doc_id, stats):
-    """Set document category by majority vote from chunk-level categories."""
+def _link_engines(cur, engine_links):
+    """Find or create engines and link them to vehicles."""
+    # Case-insensitive engine codes, keeping the first spelling and make
+    engines = {}
+    for (_, engine_desc), make in engine_links.items():
+        engines.setdefault(engine_desc.lower(), (engine_desc, make))
+
+    # Find existing engines by code
     cur.execute(
-        """SELECT dc.category, COUNT(*) as cnt
-           FROM refined.document_categories dc
-           JOIN research.document_chunks ch ON dc.source_chunk_id = ch.id
-           WHERE ch.document_id = %s
-           GROUP BY dc.category
-           ORDER BY cnt DESC
-           LIMIT 1""",
-        (doc_id,)
+        """SELECT DISTINCT ON (LOWER(engine_code)) LOWER(engine_code), id
+           FROM vehicle.engines
+           WHERE LOWER(engine_code) = ANY(%s)""",
+        (list(engines),)
     )
-    row = cur.fetchone()
-    if not row:
-        return
+    engine_ids = {code: str(eid) for code, eid in cur.fetchall()}
+
+    # Create new engine entries
+    missing = [engines[k] for k in engines if k not in engine_ids]
+    if missing:
+        rows = execute_values(cur, """
+            INSERT INTO vehicle.engines (engine_code, manufacturer)
+            VALUES %s
+            ON CONFLICT (engine_code) DO UPDATE
+            SET updated_at = NOW()
+            RETURNING engine_code, id
+        """, missing, page_size=1000, fetch=True)
+        engine_ids.update((code.lower(), str(eid)) for code, eid in rows)
+
+    _insert_links(cur, "vehicle_engines", ("vehicle_id", "engine_id"), list({
+        (vehicle_id, engine_ids[desc.lower()])
+        for vehicle_id, desc in engine_links
+    }))
+
+
+def _infer_transmission_type(trans_desc: str) -> str:
+    """Infer a transmission type from its free-text description."""
+    desc_lower = trans_desc.lower()
+    if "manual" in desc_lower:
+        return "manual"
+    if _AUTOMATIC_RE.search(desc_lower):
+        return "automatic"
+    return "unknown"
+
+
+def _link_transmissions(cur, trans_links):
+    """Find or create transmissions and link them to vehicles."""
+    transmissions = {}
+    for _, trans_desc in trans_links:
+        transmissions.setdefault(trans_desc.lower(), trans_desc)
+
+    cur.execute(
+        """SELECT DISTINCT ON (LOWER(transmission_code))
+                  LOWER(transmission_code), id
+           FROM vehicle.transmissions
+           WHERE LOWER(transmission_code) = ANY(%s)""",
+        (list(transmissions),)
+    )
+    trans_ids = {code: str(tid) for code, tid in cur.fetchall()}
+
+    missing = [
+        (desc, _infer_transmission_type(desc))
+        for k, desc in transmissions.items() if k not in trans_ids
+    ]
+    if missing:
+        rows = execute_values(cur, """
+            INSERT INTO vehicle.transmissions
+                (transmission_code, transmission_type)
+            VALUES %s
+            ON CONFLICT (transmission_code) DO UPDATE
+            SET updated_at = NOW()
+            RETURNING transmission_code, id
+        """, missing, page_size=1000, fetch=True)
+        trans_ids.update((code.lower(), str(tid)) for code, tid in rows)
+
+    _insert_links(cur, "vehicle_transmissions",
+                  ("vehicle_id", "transmission_id"), list({
+                      (vehicle_id, trans_ids[desc.lower()])
+                      for vehicle_id, desc in trans_links
+                  }))
+
+
+def _insert_links(cur, table, columns, rows) -> int:
+    """Insert UUID link rows into vehicle.<table>, skipping existing links.
+
+    Batches above _COPY_THRESHOLD rows are COPYed into a temp staging
+    table and inserted from there in one statement; smaller ones use
+    execute_values. Returns the number of links inserted.
+    """
+    cols = ", ".join(columns)
+    if len(rows) > _COPY_THRESHOLD:
+        stage = f"tmp_{table}_stage"
+        cur.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS {stage} (
+                {", ".join(c + " UUID" for c in columns)}
+            ) ON COMMIT DROP;
+            TRUNCATE {stage};
+        """)
+        buf = io.StringIO()
+        for row in rows:
+            buf.write("\t".join("\\N" if v is None else str(v) for v in row))
+            buf.write("\n")
+        buf.seek(0)
+        cur.copy_expert(f"COPY {stage} FROM STDIN", buf)
+        cur.execute(f"""
+            INSERT INTO vehicle.{table} ({cols})
+            SELECT {cols} FROM {stage}
+            ON CONFLICT DO NOTHING
+        """)
+        return cur.rowcount
+
+    inserted = execute_values(cur, f"""
+        INSERT INTO vehicle.{table} ({cols})
+        VALUES %s
+        ON CONFLICT DO NOTHING
+        RETURNING 1
+    """, rows, template="(" + ", ".join(["%s::uuid"] * len(columns)) + ")",
+        page_size=1000, fetch=True)
+    return len(inserted)
 
-    category = row[0]
 
+def _set_document_category(cur, doc_id, stats):
+    """Set document category by majority vote from chunk-level categories."""
     cur.execute(
-        """UPDATE research.documents
-           SET document_category = %s
-           WHERE id = %s""",
-        (category, doc_id)
+        """UPDATE research.documents d
+           SET document_category = top.category
+           FROM (
+               SELECT dc.category
+               FROM refined.document_categories dc
+               JOIN research.document_chunks ch ON dc.source_chunk_id = ch.id
+               WHERE ch.document_id = %s
+               GROUP BY dc.category
+               ORDER BY COUNT(*) DESC
+               LIMIT 1
+           ) top
+           WHERE d.id = %s""",
+        (doc_id, doc_id)
     )
-    stats["doc_category_set"] = True
+    stats["doc_category_set"] = cur.rowcount > 0
@@ -1,10 +1,11 @@
 """Conflict Resolution / Reasoning Agent Worker.
 
 After extraction completes for a document, this worker:
-1. Recalculates confidence_score for all DTC codes using
+1. Recalculates confidence_score for the document's DTC codes using
    source_count and average trust_score from linked source chunks.
-2. Deduplicates causes (same DTC + same description).
-3. Deduplicates diagnostic steps (same DTC + same description).
+2. Deduplicates the document's causes (same DTC + same description).
+3. Deduplicates the document's diagnostic steps (same DTC + same
+   description).
 4. Runs knowledge graph upserter: scores, merges, deduplicates,
    and upserts into normalized knowledge.* tables.
 5. Marks the document as 'complete' (terminal stage).
@@ -16,7 +17,9 @@ Next: (none -- terminal)
 import sys
 import time
 import logging
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, "/app")
 
@@ -33,87 +36,123 @@ from shared.pipeline import (
     update_document_stage, log_processing
 )
 
+# Confidence recalculation touches DTCs shared between documents and the
+# knowledge graph upsert rewrites rows across whole tables, so concurrent
+# jobs take turns on each of them instead of contending for row locks.
+_resolve_lock = threading.Lock()
+_upsert_lock = threading.Lock()
 
-def recalculate_dtc_confidence():
-    """Recalculate confidence_score for all DTC codes.
+
+def recalculate_dtc_confidence(cur, doc_id):
+    """Recalculate confidence_score for the DTC codes doc_id cites.
 
     Formula: confidence = min(1.0, 0.3 * source_factor + 0.7 * avg_trust)
     where source_factor = min(1.0, source_count / 5.0)
 
     A DTC with 5+ sources and trust_score=1.0 reaches confidence=1.0.
     A DTC with 1 source and trust_score=0.5 gets confidence=0.41.
+
+    Only DTCs with a source chunk in doc_id can have new sources or
+    evaluations, so no other row is touched; rows whose score did not
+    change are skipped too. Returns the number of scores changed.
     """
-    conn = get_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE refined.dtc_codes d
-            SET confidence_score = LEAST(1.0,
-                0.3 * LEAST(1.0, d.source_count::float / 5.0) +
+    cur.execute("""
+        UPDATE refined.dtc_codes d
+        SET confidence_score = n.score,
+            updated_at = NOW()
+        FROM (
+            SELECT d2.id, LEAST(1.0,
+                0.3 * LEAST(1.0, d2.source_count::float / 5.0) +
                 0.7 * COALESCE(
                     (SELECT AVG(ce.trust_score)
                      FROM refined.dtc_sources ds
                      JOIN research.chunk_evaluations ce
                          ON ds.chunk_id = ce.chunk_id
-                     WHERE ds.dtc_id = d.id),
+                     WHERE ds.dtc_id = d2.id),
                     0.5
                 )
-            ),
-            updated_at = NOW()
-        """)
-        updated = cur.rowcount
-        conn.commit()
-        return updated
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        return_connection(conn)
-
-
-def deduplicate_causes():
+            ) AS score
+            FROM refined.dtc_codes d2
+            WHERE d2.id IN (
+                SELECT ds.dtc_id
+                FROM refined.dtc_sources ds
+                JOIN research.document_chunks dc ON ds.chunk_id = dc.id
+                WHERE dc.document_id = %s
+            )
+        ) n
+        WHERE d.id = n.id
+          AND d.confidence_score IS DISTINCT FROM n.score
+    """, (doc_id,))
+    return cur.rowcount
+
+
+def deduplicate_causes(cur, doc_id):
     """Remove duplicate causes sharing the same DTC and description text.
 
+    Only DTCs that doc_id contributed causes to are checked; rows from
+    earlier documents were already deduplicated when those completed.
     Keeps the row with the lower id (earlier insertion).
     """
-    conn = get_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            DELETE FROM refined.causes a
-            USING refined.causes b
-            WHERE a.dtc_id = b.dtc_id
-              AND LOWER(TRIM(a.description)) = LOWER(TRIM(b.description))
-              AND a.id > b.id
-        """)
-        deleted = cur.rowcount
-        conn.commit()
-        return deleted
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        return_connection(conn)
-
-
-def deduplicate_diagnostic_steps():
+    cur.execute("""
+        DELETE FROM refined.causes a
+        USING refined.causes b
+        WHERE a.dtc_id IN (
+                SELECT x.dtc_id
+                FROM refined.causes x
+                JOIN research.document_chunks dc ON x.source_chunk_id = dc.id
+                WHERE dc.document_id = %s
+              )
+          AND a.dtc_id = b.dtc_id
+          AND LOWER(TRIM(a.description)) = LOWER(TRIM(b.description))
+          AND a.id > b.id
+    """, (doc_id,))
+    return cur.rowcount
+
+
+def deduplicate_diagnostic_steps(cur, doc_id):
     """Remove duplicate diagnostic steps sharing the same DTC and description.
 
+    Scoped to DTCs doc_id contributed steps to, like deduplicate_causes.
     Keeps the row with the lower id.
     """
+    cur.execute("""
+        DELETE FROM refined.diagnostic_steps a
+        USING refined.diagnostic_steps b
+        WHERE a.dtc_id IN (
+                SELECT x.dtc_id
+                FROM refined.diagnostic_steps x
+                JOIN research.document_chunks dc ON x.source_chunk_id = dc.id
+                WHERE dc.document_id = %s
+              )
+          AND a.dtc_id = b.dtc_id
+          AND LOWER(TRIM(a.description)) = LOWER(TRIM(b.description))
+          AND a.id > b.id
+    """, (doc_id,))
+    return cur.rowcount
+
+
+def resolve_refined_conflicts(doc_id):
+    """Recalculate DTC confidence and deduplicate causes and steps.
+
+    All three statements run in one transaction on one pooled
+    connection, so the unit of work pays a single checkout and commit.
+    The commit does not wait for the WAL flush: everything here is
+    re-derived from refined/research data on the next run, so losing
+    it in a crash is harmless.
+
+    Returns (dtc_updated, causes_deduped, steps_deduped).
+    """
     conn = get_connection()
     try:
         cur = conn.cursor()
-        cur.execute("""
-            DELETE FROM refined.diagnostic_steps a
-            USING refined.diagnostic_steps b
-            WHERE a.dtc_id = b.dtc_id
-              AND LOWER(TRIM(a.description)) = LOWER(TRIM(b.description))
-              AND a.id > b.id
-        """)
-        deleted = cur.rowcount
+        cur.execute("SET LOCAL synchronous_commit = off")
+        counts = (
+            recalculate_dtc_confidence(cur, doc_id),
+            deduplicate_causes(cur, doc_id),
+            deduplicate_diagnostic_steps(cur, doc_id),
+        )
         conn.commit()
-        return deleted
+        return counts
     except Exception:
         conn.rollback()
         raise
@@ -153,13 +192,14 @@ def process_document(doc_id):
     update_document_stage(doc_id, "resolving")
     log_processing(doc_id, "resolving", "started")
 
-    # Recalculate refined.dtc_codes confidence
-    dtc_updated = recalculate_dtc_confidence()
-    causes_deduped = deduplicate_causes()
-    steps_deduped = deduplicate_diagnostic_steps()
+    # Recalculate refined.dtc_codes confidence and dedupe causes/steps
+    with _resolve_lock:
+        dtc_updated, causes_deduped, steps_deduped = (
+            resolve_refined_conflicts(doc_id))
 
     # Knowledge graph upsert with scoring + merging
-    kg_stats = run_knowledge_graph_upsert()
+    with _upsert_lock:
+        kg_stats = run_knowledge_graph_upsert()
 
     # Vehicle linking: match mentions to catalog, build relationships
     vl_stats = run_vehicle_linking(doc_id)
@@ -197,32 +237,51 @@ def process_document(doc_id):
     logger.info(f"doc={doc_id} {message} ms={duration_ms}")
 
 
+def run_job(job):
+    """Process one popped job, recording a failure on the document."""
+    try:
+        process_document(job)
+    except Exception as e:
+        print(f"[conflict] ERROR: {e}")
+        traceback.print_exc()
+        try:
+            update_document_stage(job, "error", str(e)[:500])
+            log_processing(job, "resolving", "failed", str(e)[:500])
+        except Exception:
+            pass
+
+
 def main():
     from shared.graceful import GracefulShutdown, wait_for_db, wait_for_redis
 
     shutdown = GracefulShutdown()
 
-    print(f"[conflict] Worker started. Queue={Config.WORKER_QUEUE}")
+    print(f"[conflict] Worker started. Queue={Config.WORKER_QUEUE} "
+          f"concurrency={Config.WORKER_CONCURRENCY}")
 
     wait_for_db()
     wait_for_redis()
 
-    while shutdown.is_running():
-        try:
-            job = pop_job(Config.WORKER_QUEUE, timeout=Config.POLL_TIMEOUT)
-            if job:
-                process_document(job.strip())
-        except Exception as e:
-            print(f"[conflict] ERROR: {e}")
-            traceback.print_exc()
+    # Documents are mostly DB wait, so up to WORKER_CONCURRENCY of them
+    # run at once. A slot is taken before popping so jobs are never
+    # pulled off the queue faster than they can start.
+    slots = threading.BoundedSemaphore(Config.WORKER_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=Config.WORKER_CONCURRENCY) as pool:
+        while shutdown.is_running():
+            if not slots.acquire(timeout=Config.POLL_TIMEOUT):
+                continue
+            job = None
             try:
-                if job:
-                    update_document_stage(job.strip(), "error", str(e)[:500])
-                    log_processing(job.strip(), "resolving", "failed",
-                                   str(e)[:500])
-            except Exception:
-                pass
-        time.sleep(0.1)
+                job = pop_job(Config.WORKER_QUEUE, timeout=Config.POLL_TIMEOUT)
+            except Exception as e:
+                print(f"[conflict] ERROR: {e}")
+                traceback.print_exc()
+            if job:
+                future = pool.submit(run_job, job.strip())
+                future.add_done_callback(lambda _: slots.release())
+            else:
+                slots.release()
+            time.sleep(0.1)
 
     shutdown.cleanup()
 
@@ -13,45 +13,168 @@ import sys
 import time
 import traceback
 import hashlib
+import tempfile
+import threading
 import uuid as uuid_mod
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 
 sys.path.insert(0, "/app")
 
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
 from shared.config import Config
 from shared.redis_client import pop_job, push_job
-from shared.db import get_connection, return_connection, execute_query
-from shared.minio_client import store_content, store_bytes
-from shared.pipeline import log_processing
+from shared.db import get_thread_connection, drop_thread_connection
+from shared.minio_client import store_stream, store_bytes
+
+# Shared across jobs and fetch threads so connections (and TLS sessions)
+# to the same host are kept alive and reused.
+_session = requests.Session()
+_session.headers["User-Agent"] = (
+    "AIResearchRefinery/2.0 (Automotive Knowledge Engine)"
+)
+_adapter = HTTPAdapter(pool_connections=64, pool_maxsize=64)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+_FETCH_CHUNK_BYTES = 64 * 1024
+
+# Content-Type substrings the PDF/HTML extractors can handle; responses
+# without a Content-Type are still tried as HTML.
+_FETCH_TYPES = ("html", "pdf", "text/", "xml")
+
+# Extracted text up to this size stays in memory; larger documents spill
+# to a temporary file while they are hashed and uploaded.
+_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+class TextSpool:
+    """Accumulates extracted text in a spooled temp file.
+
+    The SHA-256, character count and stripped length are updated as
+    pieces are written, so the full text never has to be held as one
+    string. The hash matches hashing the concatenated text.
+    """
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES)
+        self.sha256 = hashlib.sha256()
+        self.chars = 0
+        self.size = 0
+        self._leading_ws = 0
+        self._trailing_ws = 0
+        self._seen_text = False
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self.file.write(data)
+        self.sha256.update(data)
+        self.chars += len(text)
+        self.size += len(data)
+
+        # Track leading/trailing whitespace so stripped_len() equals
+        # len(full_text.strip()) without building full_text.
+        if not text.strip():
+            if self._seen_text:
+                self._trailing_ws += len(text)
+            else:
+                self._leading_ws += len(text)
+            return
+        if not self._seen_text:
+            self._leading_ws += len(text) - len(text.lstrip())
+            self._seen_text = True
+        self._trailing_ws = len(text) - len(text.rstrip())
+
+    def stripped_len(self):
+        if not self._seen_text:
+            return 0
+        return self.chars - self._leading_ws - self._trailing_ws
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+    def rewind(self):
+        self.file.seek(0)
+        return self.file
+
+    def close(self):
+        self.file.close()
+
+
+def _check_response(response):
+    """Reject a response from its headers, before the body is read.
+
+    Raises ValueError for content types the extractors cannot handle or
+    a declared Content-Length above Config.MAX_DOC_BYTES.
+    """
+    content_type = response.headers.get("Content-Type", "").lower()
+    if content_type and not any(t in content_type for t in _FETCH_TYPES):
+        raise ValueError(f"Unsupported content type: {content_type}")
+    length = response.headers.get("Content-Length", "")
+    if length.isdigit() and int(length) > Config.MAX_DOC_BYTES:
+        raise ValueError(
+            f"Document too large ({length} bytes > {Config.MAX_DOC_BYTES})"
+        )
 
 
 def fetch_url(url, timeout=30):
-    """HTTP GET a URL.
+    """HTTP GET a URL, hashing the body as it streams in.
+
+    Headers are checked before any of the body is downloaded, and the
+    download is abandoned once it exceeds Config.MAX_DOC_BYTES.
 
     Returns:
-        tuple: (content_bytes, content_type_header, status_code)
+        tuple: (content_bytes, content_type_header, status_code,
+                sha256_hex_of_content_bytes)
     """
-    headers = {
-        "User-Agent": "AIResearchRefinery/2.0 (Automotive Knowledge Engine)"
-    }
-    response = requests.get(url, headers=headers, timeout=timeout,
-                            allow_redirects=True)
-    response.raise_for_status()
-    content_type = response.headers.get("Content-Type", "").lower()
-    return response.content, content_type, response.status_code
+    with _session.get(url, timeout=timeout, allow_redirects=True,
+                      stream=True) as response:
+        response.raise_for_status()
+        _check_response(response)
+        content_type = response.headers.get("Content-Type", "").lower()
+        body = bytearray()
+        sha256 = hashlib.sha256()
+        for chunk in response.iter_content(chunk_size=_FETCH_CHUNK_BYTES):
+            sha256.update(chunk)
+            body += chunk
+            if len(body) > Config.MAX_DOC_BYTES:
+                raise ValueError(
+                    f"Document too large (> {Config.MAX_DOC_BYTES} bytes)"
+                )
+        return (bytes(body), content_type, response.status_code,
+                sha256.hexdigest())
+
+
+_SKIP_TAGS = ["script", "style", "nav", "footer", "header"]
 
 
 def extract_text_from_html(html_bytes):
     """Extract readable text and title from HTML.
 
+    Uses the lexbor parser from selectolax when it is installed, falling
+    back to BeautifulSoup if it is missing or fails on the document.
+    Both produce the same text: stripped, non-empty text nodes joined
+    by newlines.
+
     Returns:
         tuple: (text_string, title_string)
     """
+    if LexborHTMLParser is not None:
+        try:
+            return _extract_text_lexbor(html_bytes)
+        except Exception as e:
+            print(f"[crawler] lexbor parse failed, using BeautifulSoup: {e}")
+
     soup = BeautifulSoup(html_bytes, "lxml")
-    for tag in soup(["script", "style", "nav", "footer", "header"]):
+    for tag in soup(_SKIP_TAGS):
         tag.decompose()
     text = soup.get_text(separator="\n", strip=True)
     title = ""
@@ -60,40 +183,71 @@ def extract_text_from_html(html_bytes):
     return text, title
 
 
-def extract_text_from_pdf(pdf_bytes):
-    """Extract text and title from a PDF.
+def _extract_text_lexbor(html_bytes):
+    tree = LexborHTMLParser(html_bytes)
+    for node in tree.css(", ".join(_SKIP_TAGS)):
+        node.decompose()
+    parts = []
+    for node in tree.root.traverse(include_text=True):
+        if node.tag == "-text":
+            part = node.text_content.strip()
+            if part:
+                parts.append(part)
+    title = ""
+    title_node = tree.css_first("title")
+    if title_node is not None:
+        title = title_node.text().strip()
+    return "\n".join(parts), title
+
+
+def extract_text_from_pdf(pdf_bytes, spool):
+    """Extract text from a PDF page by page into spool.
+
+    Pages are separated by a blank line, as if joined with "\n\n".
 
     Returns:
-        tuple: (text_string, title_string)
+        str: The document title, or "" if it has none.
     """
     from pypdf import PdfReader
     reader = PdfReader(BytesIO(pdf_bytes))
-    pages = []
+    first = True
     for page in reader.pages:
         page_text = page.extract_text()
         if page_text:
-            pages.append(page_text)
-    text = "\n\n".join(pages)
+            if not first:
+                spool.write("\n\n")
+            spool.write(page_text)
+            first = False
     title = ""
     if reader.metadata and reader.metadata.title:
         title = reader.metadata.title
-    return text, title
+    return title
 
 
 def process_crawl_job(crawl_id):
-    """Fetch a URL, extract text, store in MinIO, create document record."""
+    """Fetch a URL, extract text, store in MinIO, create document record.
+
+    Runs on the calling thread's held connection (see
+    shared.db.get_thread_connection). The 'crawling' status is committed
+    before the fetch so no transaction stays open across network I/O;
+    the duplicate check, document insert, completion update and
+    processing log entry then commit together. Every path ends its
+    transaction, so the connection never sits idle in one between jobs.
+    """
     start_time = time.time()
 
-    # Read the crawl queue entry
-    conn = get_connection()
+    conn = get_thread_connection()
     try:
         cur = conn.cursor()
+
+        # Read the crawl queue entry
         cur.execute(
             "SELECT url, depth, max_depth FROM research.crawl_queue WHERE id = %s",
             (crawl_id,)
         )
         row = cur.fetchone()
         if not row:
+            conn.rollback()
             print(f"[crawler] Crawl job {crawl_id} not found in crawl_queue")
             return
         url, depth, max_depth = row
@@ -103,105 +257,149 @@ def process_crawl_job(crawl_id):
             (crawl_id,)
         )
         conn.commit()
-    finally:
-        return_connection(conn)
-
-    try:
-        content_bytes, content_type, status_code = fetch_url(url)
-
-        if "pdf" in content_type:
-            text, title = extract_text_from_pdf(content_bytes)
-            mime_type = "application/pdf"
-        else:
-            text, title = extract_text_from_html(content_bytes)
-            mime_type = "text/html"
-
-        if not text or len(text.strip()) < 50:
-            raise ValueError(
-                f"Extracted text too short ({len(text.strip())} chars)"
-            )
 
-        if not title:
-            title = url.split("/")[-1][:100] or "Untitled"
-
-        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
-
-        # Check for duplicate content already in the system
-        conn = get_connection()
+        spool = TextSpool()
         try:
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT id FROM research.documents WHERE content_hash = %s",
-                (content_hash,)
-            )
-            existing = cur.fetchone()
+            doc_id = _crawl(cur, crawl_id, url, spool)
+            if doc_id:
+                duration_ms = int((time.time() - start_time) * 1000)
+                cur.execute(
+                    """INSERT INTO research.processing_log
+                       (document_id, stage, status, message, duration_ms)
+                       VALUES (%s, 'crawling', 'completed', %s, %s)""",
+                    (doc_id, f"Fetched {url} ({spool.chars} chars)",
+                     duration_ms)
+                )
+            conn.commit()
+        except Exception as e:
+            # Record the failure on the same connection; if that fails
+            # too, the original error is still the one raised.
+            try:
+                conn.rollback()
+                cur.execute(
+                    """UPDATE research.crawl_queue
+                       SET status = 'failed', error_message = %s
+                       WHERE id = %s""",
+                    (str(e)[:500], crawl_id)
+                )
+                conn.commit()
+            except Exception:
+                traceback.print_exc()
+            raise
         finally:
-            return_connection(conn)
-
-        if existing:
-            print(f"[crawler] Duplicate content for {url}, skipping")
-            execute_query(
-                """UPDATE research.crawl_queue
-                   SET status = 'completed', completed_at = NOW()
-                   WHERE id = %s""",
-                (crawl_id,)
-            )
-            return
+            spool.close()
+    except Exception:
+        try:
+            conn.rollback()
+        except Exception:
+            drop_thread_connection()
+        raise
 
-        # Store text in MinIO
-        doc_id = str(uuid_mod.uuid4())
-        minio_key = f"raw/{doc_id}"
-        store_content(minio_key, text, content_type=mime_type)
+    if not doc_id:
+        return
 
-        # Also store original PDF bytes if applicable
-        if mime_type == "application/pdf":
-            store_bytes(f"original/{doc_id}.pdf", content_bytes,
-                        content_type="application/pdf")
+    # Push new document into the processing pipeline
+    push_job(Config.NEXT_QUEUE, doc_id)
 
-        # Create document record
-        conn = get_connection()
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                """INSERT INTO research.documents
-                   (id, title, source_url, content_hash, mime_type,
-                    minio_bucket, minio_key, processing_stage)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, 'pending')""",
-                (doc_id, title, url, content_hash, mime_type,
-                 Config.MINIO_BUCKET, minio_key)
-            )
-            conn.commit()
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            return_connection(conn)
+    print(f"[crawler] {url} -> doc={doc_id} chars={spool.chars} "
+          f"ms={duration_ms}")
 
-        # Mark crawl as completed
-        execute_query(
-            """UPDATE research.crawl_queue
-               SET status = 'completed', completed_at = NOW()
-               WHERE id = %s""",
-            (crawl_id,)
-        )
 
-        # Push new document into the processing pipeline
-        push_job(Config.NEXT_QUEUE, doc_id)
+def _crawl(cur, crawl_id, url, spool):
+    """Fetch and store url, writing its rows through cur without committing.
 
-        duration_ms = int((time.time() - start_time) * 1000)
-        log_processing(doc_id, "crawling", "completed",
-                       f"Fetched {url} ({len(text)} chars)", duration_ms)
-        print(f"[crawler] {url} -> doc={doc_id} chars={len(text)} "
-              f"ms={duration_ms}")
+    Returns:
+        str: The new document id, or None if the content is a duplicate.
+    """
+    content_bytes, content_type, status_code, raw_hash = fetch_url(url)
+
+    # Identical bytes extract to identical text, so a body seen before is
+    # a duplicate without paying for the PDF/HTML parse.
+    cur.execute(
+        "SELECT 1 FROM research.documents WHERE raw_content_hash = %s LIMIT 1",
+        (raw_hash,)
+    )
+    if cur.fetchone():
+        print(f"[crawler] Duplicate content for {url}, skipping")
+        doc_id = None
+    else:
+        doc_id = _store_document(cur, url, content_bytes, content_type,
+                                 raw_hash, spool)
+
+    # Mark crawl as completed
+    cur.execute(
+        """UPDATE research.crawl_queue
+           SET status = 'completed', completed_at = NOW()
+           WHERE id = %s""",
+        (crawl_id,)
+    )
+    return doc_id
+
+
+def _store_document(cur, url, content_bytes, content_type, raw_hash, spool):
+    """Extract text from a fetched body and create its document record.
 
-    except Exception as e:
-        execute_query(
-            """UPDATE research.crawl_queue
-               SET status = 'failed', error_message = %s
-               WHERE id = %s""",
-            (str(e)[:500], crawl_id)
+    Returns:
+        str: The new document id, or None if the text is a duplicate.
+    """
+    if "pdf" in content_type:
+        title = extract_text_from_pdf(content_bytes, spool)
+        mime_type = "application/pdf"
+    else:
+        text, title = extract_text_from_html(content_bytes)
+        spool.write(text)
+        del text
+        mime_type = "text/html"
+
+    if spool.stripped_len() < 50:
+        raise ValueError(
+            f"Extracted text too short ({spool.stripped_len()} chars)"
         )
-        raise
+
+    if not title:
+        title = url.split("/")[-1][:100] or "Untitled"
+
+    content_hash = spool.hexdigest()
+
+    # Check for duplicate content already in the system
+    cur.execute(
+        "SELECT id FROM research.documents WHERE content_hash = %s",
+        (content_hash,)
+    )
+    if cur.fetchone():
+        print(f"[crawler] Duplicate content for {url}, skipping")
+        return None
+
+    # Store text in MinIO straight from the spool
+    doc_id = str(uuid_mod.uuid4())
+    minio_key = f"raw/{doc_id}"
+    store_stream(minio_key, spool.rewind(), spool.size,
+                 content_type=mime_type)
+
+    # Also store original PDF bytes if applicable
+    if mime_type == "application/pdf":
+        store_bytes(f"original/{doc_id}.pdf", content_bytes,
+                    content_type="application/pdf")
+
+    # Create document record
+    cur.execute(
+        """INSERT INTO research.documents
+           (id, title, source_url, content_hash, raw_content_hash,
+            mime_type, minio_bucket, minio_key, processing_stage)
+           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'pending')""",
+        (doc_id, title, url, content_hash, raw_hash, mime_type,
+         Config.MINIO_BUCKET, minio_key)
+    )
+    return doc_id
+
+
+def run_job(job):
+    """Process one popped crawl job, logging any failure."""
+    try:
+        process_crawl_job(job)
+    except Exception as e:
+        print(f"[crawler] ERROR: {e}")
+        traceback.print_exc()
 
 
 def main():
@@ -210,20 +408,32 @@ def main():
     shutdown = GracefulShutdown()
 
     print(f"[crawler] Worker started. Queue={Config.WORKER_QUEUE} "
-          f"Next={Config.NEXT_QUEUE}")
+          f"Next={Config.NEXT_QUEUE} "
+          f"concurrency={Config.WORKER_CONCURRENCY}")
 
     wait_for_db()
     wait_for_redis()
 
-    while shutdown.is_running():
-        try:
-            job = pop_job(Config.WORKER_QUEUE, timeout=Config.POLL_TIMEOUT)
+    # Fetches are network-bound, so up to WORKER_CONCURRENCY jobs run at
+    # once. A slot is taken before popping so jobs are never pulled off
+    # the queue faster than they can start.
+    slots = threading.BoundedSemaphore(Config.WORKER_CONCURRENCY)
+    with ThreadPoolExecutor(max_workers=Config.WORKER_CONCURRENCY) as pool:
+        while shutdown.is_running():
+            if not slots.acquire(timeout=Config.POLL_TIMEOUT):
+                continue
+            job = None
+            try:
+                job = pop_job(Config.WORKER_QUEUE, timeout=Config.POLL_TIMEOUT)
+            except Exception as e:
+                print(f"[crawler] ERROR: {e}")
+                traceback.print_exc()
             if job:
-                process_crawl_job(job.strip())
-        except Exception as e:
-            print(f"[crawler] ERROR: {e}")
-            traceback.print_exc()
-        time.sleep(0.5)
+                future = pool.submit(run_job, job.strip())
+                future.add_done_callback(lambda _: slots.release())
+            else:
+                slots.release()
+                time.sleep(0.5)
 
     shutdown.cleanup()
 
@@ -3,76 +3,220 @@
 For each document, fetches all its chunks from PostgreSQL,
 calls the Ollama embedding API (llm-embed on GPU 0) to generate
 768-dimension vectors via nomic-embed-text, and stores the vectors
-in the embedding column of research.document_chunks.
+in the embedding column of research.document_chunks. Vectors are
+cached in research.embedding_cache by (model, sha256(content)), so
+text that was already embedded is not sent to Ollama again.
 
 Queue: jobs:embed
 Payload: document UUID string
 Next: jobs:evaluate
 """
+import re
 import sys
 import time
+import hashlib
 import traceback
 
 sys.path.insert(0, "/app")
 
+from psycopg2.extras import execute_values
+
 from shared.config import Config
 from shared.redis_client import pop_job
 from shared.db import get_connection, return_connection
-from shared.ollama_client import generate_embedding, ensure_model_available
+from shared.ollama_client import (
+    generate_embeddings_batch, ensure_model_available
+)
 from shared.pipeline import (
-    update_document_stage, log_processing, advance_to_next_stage
+    update_document_stage, log_processing, advance_to_next_stage,
+    iter_document_chunks
 )
 
+# Chunks read, embedded and stored together
+_CHUNK_BATCH = 256
 
-def process_document(doc_id):
-    """Generate and store embeddings for all chunks of a document."""
-    start_time = time.time()
+# Near-duplicate reuse: chunks whose SimHashes differ in at most this many
+# bits share a vector. Must stay below 4 for the band lookup to be exact.
+_SIMHASH_MAX_DISTANCE = 3
+_SIMHASH_MIN_TOKENS = 50
+_TOKEN_RE = re.compile(r"\w+")
 
-    update_document_stage(doc_id, "embedding")
-    log_processing(doc_id, "embedding", "started")
 
-    # Fetch all chunks for this document
+def _simhash(text):
+    """64-bit SimHash of a text's word bigrams, as a signed BIGINT.
+
+    Returns None for texts too short for the signature to separate
+    genuinely different content.
+    """
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < _SIMHASH_MIN_TOKENS:
+        return None
+    counts = {}
+    for pair in zip(tokens, tokens[1:]):
+        feature = " ".join(pair)
+        counts[feature] = counts.get(feature, 0) + 1
+
+    weights = [0] * 64
+    for feature, count in counts.items():
+        bits = int.from_bytes(
+            hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(),
+            "big"
+        )
+        for i in range(64):
+            if bits >> i & 1:
+                weights[i] += count
+            else:
+                weights[i] -= count
+
+    value = sum(1 << i for i, w in enumerate(weights) if w > 0)
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _find_near_duplicates(cur, simhashes):
+    """Look up cached vectors for near-duplicate texts.
+
+    Args:
+        cur: Database cursor.
+        simhashes: Dict of content hash -> SimHash (or None).
+
+    Returns:
+        dict: Content hash -> embedding text of the closest cached entry
+        within _SIMHASH_MAX_DISTANCE bits.
+    """
+    keys = [h for h, sh in simhashes.items() if sh is not None]
+    if not keys:
+        return {}
+
+    # Any match within 3 bits agrees on at least one 16-bit band, so the
+    # band equalities let each probe use the per-band indexes
+    cur.execute("""
+        SELECT q.idx, m.embedding
+        FROM unnest(%s::bigint[]) WITH ORDINALITY AS q (sh, idx)
+        CROSS JOIN LATERAL (
+            SELECT c.embedding::text AS embedding
+            FROM research.embedding_cache c
+            WHERE c.model = %s
+              AND c.simhash IS NOT NULL
+              AND (((c.simhash >> 48) & 65535) = ((q.sh >> 48) & 65535)
+                OR ((c.simhash >> 32) & 65535) = ((q.sh >> 32) & 65535)
+                OR ((c.simhash >> 16) & 65535) = ((q.sh >> 16) & 65535)
+                OR (c.simhash & 65535) = (q.sh & 65535))
+              AND bit_count((c.simhash # q.sh)::bit(64)) <= %s
+            ORDER BY bit_count((c.simhash # q.sh)::bit(64))
+            LIMIT 1
+        ) m
+    """, ([simhashes[h] for h in keys], Config.EMBEDDING_MODEL,
+          _SIMHASH_MAX_DISTANCE))
+    return {keys[idx - 1]: embedding for idx, embedding in cur.fetchall()}
+
+
+def embed_chunks(chunks):
+    """Generate and store embeddings for a batch of chunks.
+
+    Args:
+        chunks: List of (chunk_id, content) tuples.
+
+    Returns:
+        int: Number of chunks served from the embedding cache.
+    """
+    hashes = [hashlib.sha256(content.encode("utf-8")).digest()
+              for _, content in chunks]
+
+    # Look up vectors already cached for identical text under the
+    # current model
     conn = get_connection()
     try:
         cur = conn.cursor()
         cur.execute(
-            """SELECT id, content FROM research.document_chunks
-               WHERE document_id = %s ORDER BY chunk_index""",
-            (doc_id,)
+            """SELECT content_hash, embedding::text
+               FROM research.embedding_cache
+               WHERE model = %s AND content_hash = ANY(%s)""",
+            (Config.EMBEDDING_MODEL, hashes)
         )
-        chunks = cur.fetchall()
+        cached = {bytes(h): emb for h, emb in cur.fetchall()}
+
+        # Distinct uncached texts; near-duplicates of cached text reuse
+        # that vector instead of being embedded again
+        misses = {}
+        for (_, content), h in zip(chunks, hashes):
+            if h not in cached:
+                misses.setdefault(h, content)
+        simhashes = {h: _simhash(content) for h, content in misses.items()}
+        near = {}
+        if Config.EMBED_FUZZY_CACHE:
+            near = _find_near_duplicates(cur, simhashes)
     finally:
         return_connection(conn)
 
-    if not chunks:
-        raise ValueError(f"No chunks found for document {doc_id}")
+    # Embed the rest in batched requests. Vectors are kept in pgvector's
+    # "[x, y, ...]" text form throughout.
+    to_embed = [h for h in misses if h not in near]
+    fresh = []
+    if to_embed:
+        embeddings = generate_embeddings_batch([misses[h] for h in to_embed])
+        fresh = [(h, str(embedding))
+                 for h, embedding in zip(to_embed, embeddings)]
+    cached.update(near)
+    cached.update(fresh)
+
+    # Store every vector with one UPDATE ... FROM (VALUES ...) and one
+    # commit. Only vectors computed for their own text go into the cache:
+    # a borrowed near-duplicate vector must never become a reference row,
+    # or approximations would chain past _SIMHASH_MAX_DISTANCE.
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        if fresh:
+            execute_values(cur, """
+                INSERT INTO research.embedding_cache
+                    (model, content_hash, embedding, simhash)
+                VALUES %s
+                ON CONFLICT (model, content_hash) DO NOTHING
+            """, [(Config.EMBEDDING_MODEL, h, emb, simhashes[h])
+                  for h, emb in fresh],
+                template="(%s, %s, %s::vector, %s)", page_size=200)
+        execute_values(cur, """
+            UPDATE research.document_chunks dc
+            SET embedding = v.embedding::vector
+            FROM (VALUES %s) AS v (id, embedding)
+            WHERE dc.id = v.id::uuid
+        """, [(chunk_id, cached[h])
+              for (chunk_id, _), h in zip(chunks, hashes)],
+            page_size=200)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        return_connection(conn)
+    return len(chunks) - len(to_embed)
+
 
-    # Generate embedding for each chunk and store it
+def process_document(doc_id):
+    """Generate and store embeddings for all chunks of a document."""
+    start_time = time.time()
+
+    update_document_stage(doc_id, "embedding")
+    log_processing(doc_id, "embedding", "started")
+
+    # Work through the document a batch at a time so memory does not
+    # grow with document size
     embedded_count = 0
-    for chunk_id, content in chunks:
-        embedding = generate_embedding(content)
+    cache_hits = 0
+    for chunks in iter_document_chunks(doc_id, _CHUNK_BATCH):
+        cache_hits += embed_chunks(chunks)
+        embedded_count += len(chunks)
 
-        conn = get_connection()
-        try:
-            cur = conn.cursor()
-            # pgvector accepts Python list cast to string for VECTOR type
-            cur.execute(
-                "UPDATE research.document_chunks SET embedding = %s WHERE id = %s",
-                (str(embedding), chunk_id)
-            )
-            conn.commit()
-            embedded_count += 1
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            return_connection(conn)
+    if not embedded_count:
+        raise ValueError(f"No chunks found for document {doc_id}")
 
     duration_ms = int((time.time() - start_time) * 1000)
     log_processing(doc_id, "embedding", "completed",
-                   f"Embedded {embedded_count} chunks", duration_ms)
+                   f"Embedded {embedded_count} chunks "
+                   f"({cache_hits} from cache)", duration_ms)
     advance_to_next_stage(doc_id, "embedded", "evaluating")
-    print(f"[embedding] doc={doc_id} embedded={embedded_count} ms={duration_ms}")
+    print(f"[embedding] doc={doc_id} embedded={embedded_count} "
+          f"cached={cache_hits} ms={duration_ms}")
 
 
 def main():
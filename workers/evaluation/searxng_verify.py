@@ -7,8 +7,10 @@ referencing chunk content against web search results.
 import os
 import re
 import logging
-import requests
-from typing import Optional, List, Dict
+import functools
+from typing import Optional, List, Dict, Tuple
+
+from shared.http_client import get_session
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +18,28 @@ SEARXNG_URL = os.environ.get("SEARXNG_URL", "http://searxng:8080")
 SEARXNG_TIMEOUT = int(os.environ.get("SEARXNG_TIMEOUT", 10))
 SEARCH_ENABLED = os.environ.get("EVAL_SEARCH_ENABLED", "true").lower() == "true"
 
+# Every term pattern in one alternation so a chunk is scanned once.
+# DTC codes (P0xxx, B0xxx, C0xxx, U0xxx) keep a case-sensitive system
+# letter; sensor names and automotive phrases match in any case.
+_TERM_RE = re.compile(
+    r'(?P<dtc>\b[PBCU][0-9A-Fa-f]{4}\b)'
+    r'|(?i:\b(?P<sensor>O2|oxygen|MAP|MAF|TPS|IAT|ECT|CKP|CMP)\s*sensor\b)'
+    r'|(?i:\b(?P<sensor_kind>knock|speed|pressure|temperature|position)'
+    r'\s*sensor\b)'
+    r'|(?i:\b(?P<auto>misfire|catalytic|evap|egr|injector|ignition|'
+    r'fuel pump|camshaft|crankshaft|throttle|transmission|solenoid)\b)'
+)
+# Broader vocabulary for has_automotive_signal(); generous on purpose,
+# since a false positive only costs one LLM evaluation
+_SIGNAL_RE = re.compile(
+    r'\b(?:obd|dtc|ecu|pcm|ecm|tcm|engine|motor|vehicle|car|truck|suv|'
+    r'brake|clutch|gear|axle|wheel|tire|tyre|steering|suspension|exhaust|'
+    r'fuel|oil|coolant|radiator|battery|alternator|starter|spark|'
+    r'cylinder|piston|valve|turbo|intake|sensor|wiring|fuse|relay|'
+    r'diagnos\w*|repair|mileage|rpm|torque|horsepower|hp|mpg|vin)s?\b',
+    re.IGNORECASE
+)
+
 
 def extract_search_terms(content: str) -> Optional[str]:
     """Extract automotive-relevant search terms from chunk content.
@@ -23,33 +47,20 @@ def extract_search_terms(content: str) -> Optional[str]:
     Looks for DTC codes, part numbers, sensor names, and key phrases.
     Returns a search query string or None if nothing relevant found.
     """
-    terms = []
-
-    # Extract DTC codes (P0xxx, B0xxx, C0xxx, U0xxx patterns)
-    dtc_codes = re.findall(r'\b[PBCU][0-9A-Fa-f]{4}\b', content)
-    if dtc_codes:
-        terms.extend(dtc_codes[:2])  # max 2 DTC codes
-
-    # Extract sensor names
-    sensor_patterns = [
-        r'\b(O2|oxygen|MAP|MAF|TPS|IAT|ECT|CKP|CMP)\s*sensor\b',
-        r'\b(knock|speed|pressure|temperature|position)\s*sensor\b',
-    ]
-    for pattern in sensor_patterns:
-        matches = re.findall(pattern, content, re.IGNORECASE)
-        if matches:
-            terms.append(f"{matches[0]} sensor")
-            break
-
-    # Extract key automotive phrases
+    found = {"dtc": [], "sensor": [], "sensor_kind": [], "auto": []}
+    for match in _TERM_RE.finditer(content):
+        found[match.lastgroup].append(match.group(match.lastgroup))
+
+    terms = found["dtc"][:2]  # max 2 DTC codes
+
+    # Named sensors take precedence over generic sensor kinds
+    sensors = found["sensor"] or found["sensor_kind"]
+    if sensors:
+        terms.append(f"{sensors[0]} sensor")
+
+    # Fall back to key automotive phrases
     if not terms:
-        auto_terms = re.findall(
-            r'\b(misfire|catalytic|evap|egr|injector|ignition|fuel pump|'
-            r'camshaft|crankshaft|throttle|transmission|solenoid)\b',
-            content, re.IGNORECASE
-        )
-        if auto_terms:
-            terms.extend(auto_terms[:2])
+        terms.extend(found["auto"][:2])
 
     if not terms:
         return None
@@ -57,41 +68,61 @@ def extract_search_terms(content: str) -> Optional[str]:
     return " ".join(terms) + " automotive diagnostic"
 
 
+def has_automotive_signal(content: str) -> bool:
+    """Return True if the text mentions anything automotive at all.
+
+    Cheap pre-check used to skip the LLM for obviously off-topic chunks.
+    """
+    return bool(_TERM_RE.search(content) or _SIGNAL_RE.search(content))
+
+
+@functools.lru_cache(maxsize=1024)
+def _cached_search(query: str,
+                   max_results: int) -> Tuple[Tuple[str, str, str], ...]:
+    """Query SearxNG, memoizing results per normalized query.
+
+    Raises on failure so that errors are not cached.
+    """
+    resp = get_session().get(
+        f"{SEARXNG_URL}/search",
+        params={
+            "q": query,
+            "format": "json",
+            "categories": "general",
+            "language": "en",
+        },
+        timeout=SEARXNG_TIMEOUT,
+    )
+    resp.raise_for_status()
+    data = resp.json()
+
+    return tuple(
+        (r.get("title", ""), r.get("url", ""), r.get("content", "")[:300])
+        for r in data.get("results", [])[:max_results]
+    )
+
+
 def search_context(query: str, max_results: int = 3) -> List[Dict]:
     """Search SearxNG for contextual information.
 
+    Chunks of one document tend to produce the same query, so results
+    are cached in-process (see _cached_search).
+
     Returns list of dicts with title, url, snippet.
     """
     if not SEARCH_ENABLED:
         return []
 
     try:
-        resp = requests.get(
-            f"{SEARXNG_URL}/search",
-            params={
-                "q": query,
-                "format": "json",
-                "categories": "general",
-                "language": "en",
-            },
-            timeout=SEARXNG_TIMEOUT,
-        )
-        resp.raise_for_status()
-        data = resp.json()
-
-        results = []
-        for r in data.get("results", [])[:max_results]:
-            results.append({
-                "title": r.get("title", ""),
-                "url": r.get("url", ""),
-                "snippet": r.get("content", "")[:300],
-            })
-        return results
-
+        results = _cached_search(" ".join(query.lower().split()),
+                                 max_results)
     except Exception as e:
         logger.debug(f"SearxNG search failed for '{query}': {e}")
         return []
 
+    return [{"title": title, "url": url, "snippet": snippet}
+            for title, url, snippet in results]
+
 
 def build_search_context_prompt(results: List[Dict]) -> str:
     """Build additional context from search results for the LLM prompt."""
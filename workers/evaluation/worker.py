@@ -13,17 +13,38 @@ import sys
 import json
 import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.insert(0, "/app")
 
+try:
+    # orjson's parser is several times faster on LLM-sized responses and
+    # raises a json.JSONDecodeError subclass, so the fallbacks still apply
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from psycopg2.extras import execute_values
+
 from shared.config import Config
 from shared.redis_client import pop_job
 from shared.db import get_connection, return_connection
 from shared.ollama_client import generate_completion, ensure_model_available
 from shared.pipeline import (
-    update_document_stage, log_processing, advance_to_next_stage
+    update_document_stage, log_processing, advance_to_next_stage,
+    iter_document_chunks
 )
 
+# Chunks read, evaluated and stored together
+_CHUNK_BATCH = 256
+# Only chunks shorter than this are eligible for the keyword prefilter.
+# It equals the chunking worker's CHUNK_SIZE, so full-size chunks always
+# reach the LLM; only short documents and a document's tail chunk can
+# be prefiltered.
+_PREFILTER_MAX_CHARS = 500
+# Concurrent SearxNG lookups (network-bound, independent of LLM slots)
+_SEARCH_CONCURRENCY = 8
+
 SYSTEM_PROMPT = """You are an automotive technical content evaluator.
 You will be given a text chunk from a technical document, optionally with
 web search context for cross-referencing.
@@ -57,6 +78,14 @@ Scoring guidelines (use the full 0.0-1.0 range, not just fixed tiers):
 If web search context is provided, use it to validate claims and adjust
 scores accordingly. Corroborated information should score higher."""
 
+BATCH_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+
+You may be given several numbered chunks at once. Evaluate each chunk
+on its own and respond with ONLY a JSON object of this form, holding one
+evaluation object (fields as above) per chunk, in chunk order:
+
+{"evaluations": [{...chunk 1...}, {...chunk 2...}]}"""
+
 VALID_DOMAINS = frozenset([
     "obd", "electrical", "engine", "transmission", "brakes",
     "suspension", "hvac", "body", "general", "unknown"
@@ -69,7 +98,7 @@ def parse_evaluation(response_text):
 
     # Strategy 1: direct JSON parse
     try:
-        return json.loads(text)
+        return json_loads(text)
     except json.JSONDecodeError:
         pass
 
@@ -78,7 +107,7 @@ def parse_evaluation(response_text):
         try:
             start = text.index("```json") + 7
             end = text.index("```", start)
-            return json.loads(text[start:end].strip())
+            return json_loads(text[start:end].strip())
         except (json.JSONDecodeError, ValueError):
             pass
 
@@ -87,7 +116,7 @@ def parse_evaluation(response_text):
     last = text.rfind("}")
     if first != -1 and last > first:
         try:
-            return json.loads(text[first:last + 1])
+            return json_loads(text[first:last + 1])
         except json.JSONDecodeError:
             pass
 
@@ -108,98 +137,197 @@ def clamp(value, lo=0.0, hi=1.0):
         return 0.5
 
 
-def process_document(doc_id):
-    """Evaluate all chunks of a document."""
-    start_time = time.time()
-
-    update_document_stage(doc_id, "evaluating")
-    log_processing(doc_id, "evaluating", "started")
-
-    # Fetch chunks
+def _search_text(search_future):
+    """Resolve a search-context future, treating failures as no context."""
+    if search_future is None:
+        return ""
+    try:
+        return search_future.result()
+    except Exception:
+        return ""  # search is best-effort
+
+
+def _evaluation_row(chunk_id, result):
+    """Validate a parsed evaluation into a research.chunk_evaluations row."""
+    trust = clamp(result.get("trust_score", 0.5))
+    relevance = clamp(result.get("relevance_score", 0.5))
+    domain = result.get("automotive_domain", "unknown")
+    if domain not in VALID_DOMAINS:
+        domain = "unknown"
+    reasoning = str(result.get("reasoning", ""))[:1000]
+
+    return (chunk_id, trust, relevance, domain, reasoning,
+            Config.REASONING_MODEL)
+
+
+def evaluate_chunk(chunk_id, content, search_future=None):
+    """Score one chunk with the reasoning LLM.
+
+    Args:
+        chunk_id: Chunk UUID.
+        content: Chunk text.
+        search_future: Optional future resolving to web search context
+            text, started before this call so the lookup overlaps other
+            chunks' LLM calls.
+
+    Returns:
+        tuple: Row for research.chunk_evaluations.
+    """
+    prompt = (
+        f"Evaluate this automotive technical content chunk:\n\n"
+        f"---\n{content}\n---"
+        f"{_search_text(search_future)}"
+    )
+    response_text = generate_completion(
+        prompt=prompt,
+        system_prompt=SYSTEM_PROMPT,
+        format_json=True,
+        temperature=0.1
+    )
+
+    return _evaluation_row(chunk_id, parse_evaluation(response_text))
+
+
+def evaluate_chunk_group(group):
+    """Score several chunks with a single LLM call.
+
+    The chunks are numbered in one prompt and the model returns one
+    evaluation per chunk. If the response does not contain exactly one
+    evaluation object per chunk, the group is re-evaluated one chunk at
+    a time.
+
+    Args:
+        group: List of (chunk_id, content, search_future) tuples.
+
+    Returns:
+        list[tuple]: Rows for research.chunk_evaluations, in group order.
+    """
+    if len(group) == 1:
+        return [evaluate_chunk(*group[0])]
+
+    parts = [f"Evaluate each of these {len(group)} automotive technical "
+             f"content chunks independently:"]
+    for i, (_, content, search_future) in enumerate(group, 1):
+        parts.append(f"[Chunk {i}]\n---\n{content}\n---"
+                     f"{_search_text(search_future)}")
+    response_text = generate_completion(
+        prompt="\n\n".join(parts),
+        system_prompt=BATCH_SYSTEM_PROMPT,
+        format_json=True,
+        temperature=0.1
+    )
+
+    result = parse_evaluation(response_text)
+    evaluations = (result.get("evaluations") if isinstance(result, dict)
+                   else result)
+    if (not isinstance(evaluations, list)
+            or len(evaluations) != len(group)
+            or not all(isinstance(e, dict) for e in evaluations)):
+        return [evaluate_chunk(*chunk) for chunk in group]
+
+    return [_evaluation_row(chunk_id, evaluation)
+            for (chunk_id, _, _), evaluation in zip(group, evaluations)]
+
+
+def _prefiltered_row(chunk_id):
+    """Evaluation row for a chunk rejected without calling the LLM."""
+    return (chunk_id, 0.2, 0.1, "unknown",
+            "No automotive terms in a short chunk; LLM evaluation skipped",
+            "prefilter")
+
+
+def store_evaluations(rows):
+    """Upsert chunk evaluation rows in one statement and transaction."""
     conn = get_connection()
     try:
         cur = conn.cursor()
-        cur.execute(
-            """SELECT id, content FROM research.document_chunks
-               WHERE document_id = %s ORDER BY chunk_index""",
-            (doc_id,)
+        execute_values(
+            cur,
+            """INSERT INTO research.chunk_evaluations
+               (chunk_id, trust_score, relevance_score, automotive_domain,
+                reasoning, model_used)
+               VALUES %s
+               ON CONFLICT (chunk_id) DO UPDATE
+               SET trust_score = EXCLUDED.trust_score,
+                   relevance_score = EXCLUDED.relevance_score,
+                   automotive_domain = EXCLUDED.automotive_domain,
+                   reasoning = EXCLUDED.reasoning,
+                   model_used = EXCLUDED.model_used,
+                   evaluated_at = NOW()""",
+            rows
         )
-        chunks = cur.fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
     finally:
         return_connection(conn)
 
-    if not chunks:
-        raise ValueError(f"No chunks found for document {doc_id}")
+
+def process_document(doc_id):
+    """Evaluate all chunks of a document."""
+    start_time = time.time()
+
+    update_document_stage(doc_id, "evaluating")
+    log_processing(doc_id, "evaluating", "started")
 
     # Import SearxNG search integration
     try:
-        from searxng_verify import get_search_context_for_chunk
-        search_available = True
+        from searxng_verify import (
+            get_search_context_for_chunk, has_automotive_signal
+        )
     except ImportError:
-        search_available = False
-
+        get_search_context_for_chunk = None
+        has_automotive_signal = None
+
+    # Chunks are independent. Each batch's SearxNG lookups are all
+    # started up front on their own pool, so LLM slots (EVAL_CONCURRENCY
+    # of them) only wait on search for the first chunks. Chunks are read
+    # and their scores stored a batch at a time, so memory does not grow
+    # with document size.
     evaluated_count = 0
-    for chunk_id, content in chunks:
-        # Build search context if available
-        search_context = ""
-        if search_available:
-            try:
-                search_context = get_search_context_for_chunk(content)
-            except Exception:
-                pass  # search is best-effort
-
-        prompt = (
-            f"Evaluate this automotive technical content chunk:\n\n"
-            f"---\n{content}\n---"
-            f"{search_context}"
-        )
-        response_text = generate_completion(
-            prompt=prompt,
-            system_prompt=SYSTEM_PROMPT,
-            format_json=True,
-            temperature=0.1
-        )
-
-        result = parse_evaluation(response_text)
-
-        trust = clamp(result.get("trust_score", 0.5))
-        relevance = clamp(result.get("relevance_score", 0.5))
-        domain = result.get("automotive_domain", "unknown")
-        if domain not in VALID_DOMAINS:
-            domain = "unknown"
-        reasoning = str(result.get("reasoning", ""))[:1000]
-
-        conn = get_connection()
-        try:
-            cur = conn.cursor()
-            cur.execute(
-                """INSERT INTO research.chunk_evaluations
-                   (chunk_id, trust_score, relevance_score, automotive_domain,
-                    reasoning, model_used)
-                   VALUES (%s, %s, %s, %s, %s, %s)
-                   ON CONFLICT (chunk_id) DO UPDATE
-                   SET trust_score = EXCLUDED.trust_score,
-                       relevance_score = EXCLUDED.relevance_score,
-                       automotive_domain = EXCLUDED.automotive_domain,
-                       reasoning = EXCLUDED.reasoning,
-                       model_used = EXCLUDED.model_used,
-                       evaluated_at = NOW()""",
-                (chunk_id, trust, relevance, domain, reasoning,
-                 Config.REASONING_MODEL)
-            )
-            conn.commit()
-            evaluated_count += 1
-        except Exception:
-            conn.rollback()
-            raise
-        finally:
-            return_connection(conn)
+    skipped_count = 0
+    with ThreadPoolExecutor(max_workers=Config.EVAL_CONCURRENCY) as pool, \
+            ThreadPoolExecutor(max_workers=_SEARCH_CONCURRENCY) as searches:
+        for chunks in iter_document_chunks(doc_id, _CHUNK_BATCH):
+            # Short chunks with no automotive vocabulary at all (menus,
+            # footers, cookie banners) get fixed low scores without an
+            # LLM call
+            rows = []
+            to_evaluate = []
+            for chunk_id, content in chunks:
+                if (has_automotive_signal is not None
+                        and len(content) < _PREFILTER_MAX_CHARS
+                        and not has_automotive_signal(content)):
+                    rows.append(_prefiltered_row(chunk_id))
+                    skipped_count += 1
+                else:
+                    to_evaluate.append((chunk_id, content))
+            # EVAL_BATCH_SIZE chunks share each LLM call
+            pending = [
+                (chunk_id, content,
+                 searches.submit(get_search_context_for_chunk, content)
+                 if get_search_context_for_chunk is not None else None)
+                for chunk_id, content in to_evaluate
+            ]
+            size = max(1, Config.EVAL_BATCH_SIZE)
+            groups = [pending[i:i + size]
+                      for i in range(0, len(pending), size)]
+            for group_rows in pool.map(evaluate_chunk_group, groups):
+                rows.extend(group_rows)
+            store_evaluations(rows)
+            evaluated_count += len(rows)
+
+    if not evaluated_count:
+        raise ValueError(f"No chunks found for document {doc_id}")
 
     duration_ms = int((time.time() - start_time) * 1000)
     log_processing(doc_id, "evaluating", "completed",
-                   f"Evaluated {evaluated_count} chunks", duration_ms)
+                   f"Evaluated {evaluated_count} chunks "
+                   f"({skipped_count} prefiltered)", duration_ms)
     advance_to_next_stage(doc_id, "evaluated", "extracting")
-    print(f"[evaluation] doc={doc_id} evaluated={evaluated_count} ms={duration_ms}")
+    print(f"[evaluation] doc={doc_id} evaluated={evaluated_count} "
+          f"prefiltered={skipped_count} ms={duration_ms}")
 
 
 def main():
@@ -9,23 +9,39 @@ Queue: jobs:extract
 Payload: document UUID string
 Next: jobs:resolve
 """
+import io
 import sys
 import re
 import json
 import time
 import traceback
 import uuid as uuid_mod
+from concurrent.futures import ThreadPoolExecutor
 
 DTC_PATTERN = re.compile(r'^[PBCU][0-9A-Fa-f]{4}$')
+# Completions requested ahead of the chunk currently being parsed
+_PREFETCH_DEPTH = 1
+# Chunks read from the database per query
+_CHUNK_BATCH = 256
 
 sys.path.insert(0, "/app")
 
+try:
+    # orjson's parser is several times faster on LLM-sized responses and
+    # raises a json.JSONDecodeError subclass, so the fallbacks still apply
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+from psycopg2.extras import execute_values
+
 from shared.config import Config
 from shared.redis_client import pop_job
 from shared.db import get_connection, return_connection
 from shared.ollama_client import generate_completion, ensure_model_available
 from shared.pipeline import (
-    update_document_stage, log_processing, advance_to_next_stage
+    update_document_stage, log_processing, advance_to_next_stage,
+    iter_document_chunks
 )
 
 SYSTEM_PROMPT = """You are an automotive technical data extractor.
@@ -105,7 +121,7 @@ def parse_extraction(response_text):
     text = response_text.strip()
 
     try:
-        return json.loads(text)
+        return json_loads(text)
     except json.JSONDecodeError:
         pass
 
@@ -113,7 +129,7 @@ def parse_extraction(response_text):
         try:
             start = text.index("```json") + 7
             end = text.index("```", start)
-            return json.loads(text[start:end].strip())
+            return json_loads(text[start:end].strip())
         except (json.JSONDecodeError, ValueError):
             pass
 
@@ -121,7 +137,7 @@ def parse_extraction(response_text):
     last = text.rfind("}")
     if first != -1 and last > first:
         try:
-            return json.loads(text[first:last + 1])
+            return json_loads(text[first:last + 1])
         except json.JSONDecodeError:
             pass
 
@@ -148,58 +164,112 @@ def _safe_str(val, default=""):
     return str(val) if val else default
 
 
-def store_extraction(chunk_id, data):
-    """Insert extracted data into the refined schema tables.
+def _copy_text(value):
+    """Format a value for COPY text format."""
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
 
-    Uses upserts (ON CONFLICT) to handle duplicates gracefully.
-    DTC codes are unique on 'code'; when a duplicate is found,
-    the source_count is incremented and description/category/severity
-    are filled in if previously empty.
-    """
-    conn = get_connection()
+
+def _copy_rows(cur, table, columns, rows):
+    """Append rows to table with a single COPY FROM STDIN."""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_text(v) for v in row))
+        buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+
+
+def _year(val):
+    """Parse a model year, returning None for missing or invalid values."""
     try:
-        cur = conn.cursor()
+        return int(val) if val else None
+    except (ValueError, TypeError):
+        return None
 
-        # --- DTC CODES ---
+
+def store_extractions(cur, extractions):
+    """Insert extracted data into the refined schema tables.
+
+    Rows from every chunk are collected per table and written with one
+    execute_values statement each. Upserts (ON CONFLICT) handle
+    duplicates: DTC codes are unique on 'code', and each mention adds
+    one to source_count while description/category/severity are filled
+    in from the latest non-empty value. Sensors and TSB references keep
+    their first insert and only fill in empty detail columns. The caller
+    owns the transaction.
+
+    Args:
+        cur: Database cursor.
+        extractions: List of (chunk_id, data) pairs from parse_extraction.
+    """
+    # --- DTC CODES ---
+    # Fold repeated codes into one row per code: ON CONFLICT DO UPDATE
+    # cannot touch the same row twice in a single statement
+    dtcs = {}
+    for _, data in extractions:
         for dtc in data.get("dtc_codes", []):
             code = (dtc.get("code") or "").strip().upper()
             if not code or not DTC_PATTERN.match(code):
                 continue
-
-            cur.execute(
-                """INSERT INTO refined.dtc_codes
-                   (code, description, category, severity,
-                    confidence_score, source_count)
-                   VALUES (%s, %s, %s, %s, 0.5, 1)
-                   ON CONFLICT (code) DO UPDATE
-                   SET description = COALESCE(
-                       NULLIF(EXCLUDED.description, ''),
-                       refined.dtc_codes.description),
-                   category = COALESCE(
-                       NULLIF(EXCLUDED.category, ''),
-                       refined.dtc_codes.category),
-                   severity = COALESCE(
-                       NULLIF(EXCLUDED.severity, ''),
-                       refined.dtc_codes.severity),
-                   source_count = refined.dtc_codes.source_count + 1,
-                   updated_at = NOW()
-                   RETURNING id""",
-                (code, _safe_str(dtc.get("description", "")),
-                 _safe_str(dtc.get("category", "")),
-                 _safe_str(dtc.get("severity", "")))
-            )
-            dtc_row = cur.fetchone()
-            if not dtc_row:
+            entry = dtcs.setdefault(code, ["", "", "", 0])
+            for i, key in enumerate(("description", "category", "severity")):
+                value = _safe_str(dtc.get(key, ""))
+                if value:
+                    entry[i] = value
+            entry[3] += 1
+
+    dtc_ids = {}
+    if dtcs:
+        # Sorted so concurrent workers lock dtc_codes rows in one order
+        dtc_ids = dict(execute_values(
+            cur,
+            """INSERT INTO refined.dtc_codes
+               (code, description, category, severity,
+                confidence_score, source_count)
+               VALUES %s
+               ON CONFLICT (code) DO UPDATE
+               SET description = COALESCE(
+                   NULLIF(EXCLUDED.description, ''),
+                   refined.dtc_codes.description),
+               category = COALESCE(
+                   NULLIF(EXCLUDED.category, ''),
+                   refined.dtc_codes.category),
+               severity = COALESCE(
+                   NULLIF(EXCLUDED.severity, ''),
+                   refined.dtc_codes.severity),
+               source_count = refined.dtc_codes.source_count
+                   + EXCLUDED.source_count,
+               updated_at = NOW()
+               RETURNING code, id""",
+            [(code, *entry) for code, entry in sorted(dtcs.items())],
+            template="(%s, %s, %s, %s, 0.5, %s)",
+            fetch=True
+        ))
+
+    sources = set()
+    causes = []
+    steps = []
+    sensors = {}
+    tsbs = {}
+    vehicles = []
+    categories = []
+    for chunk_id, data in extractions:
+        # Each code once per chunk, so a repeated code does not repeat
+        # its causes and steps
+        codes = dict.fromkeys(
+            (dtc.get("code") or "").strip().upper()
+            for dtc in data.get("dtc_codes", [])
+        )
+        for code in codes:
+            dtc_id = dtc_ids.get(code)
+            if not dtc_id:
                 continue
-            dtc_id = dtc_row[0]
 
             # Link DTC to source chunk
-            cur.execute(
-                """INSERT INTO refined.dtc_sources (dtc_id, chunk_id)
-                   VALUES (%s, %s)
-                   ON CONFLICT (dtc_id, chunk_id) DO NOTHING""",
-                (dtc_id, chunk_id)
-            )
+            sources.add((dtc_id, chunk_id))
 
             # --- CAUSES for this DTC ---
             for cause in data.get("causes", []):
@@ -208,15 +278,9 @@ def store_extraction(chunk_id, data):
                 desc = (cause.get("description") or "").strip()
                 if not desc:
                     continue
-                cur.execute(
-                    """INSERT INTO refined.causes
-                       (dtc_id, description, likelihood,
-                        source_chunk_id, confidence_score)
-                       VALUES (%s, %s, %s, %s, 0.5)""",
-                    (dtc_id, desc,
-                     _safe_str(cause.get("likelihood", "medium")),
-                     chunk_id)
-                )
+                causes.append((dtc_id, desc,
+                               _safe_str(cause.get("likelihood", "medium")),
+                               chunk_id))
 
             # --- DIAGNOSTIC STEPS for this DTC ---
             for step in data.get("diagnostic_steps", []):
@@ -230,16 +294,10 @@ def store_extraction(chunk_id, data):
                     step_order = int(raw_order) if raw_order else 0
                 except (ValueError, TypeError):
                     step_order = 0
-                cur.execute(
-                    """INSERT INTO refined.diagnostic_steps
-                       (dtc_id, step_order, description, tools_required,
-                        expected_values, source_chunk_id, confidence_score)
-                       VALUES (%s, %s, %s, %s, %s, %s, 0.5)""",
-                    (dtc_id, step_order, desc,
-                     _safe_str(step.get("tools_required", "")),
-                     _safe_str(step.get("expected_values", "")),
-                     chunk_id)
-                )
+                steps.append((dtc_id, step_order, desc,
+                              _safe_str(step.get("tools_required", "")),
+                              _safe_str(step.get("expected_values", "")),
+                              chunk_id))
 
         # --- SENSORS (not DTC-specific) ---
         for sensor in data.get("sensors", []):
@@ -247,47 +305,37 @@ def store_extraction(chunk_id, data):
             if not name:
                 continue
             sensor_type = (sensor.get("sensor_type") or "").strip()
-            cur.execute(
-                """INSERT INTO refined.sensors
-                   (name, sensor_type, typical_range, unit,
-                    related_dtc_codes, source_chunk_id, confidence_score)
-                   VALUES (%s, %s, %s, %s, %s, %s, 0.5)
-                   ON CONFLICT (name, sensor_type) DO UPDATE
-                   SET typical_range = COALESCE(
-                       NULLIF(EXCLUDED.typical_range, ''),
-                       refined.sensors.typical_range),
-                   unit = COALESCE(
-                       NULLIF(EXCLUDED.unit, ''),
-                       refined.sensors.unit)""",
-                (name, sensor_type,
-                 _safe_str(sensor.get("typical_range", "")),
-                 _safe_str(sensor.get("unit", "")),
-                 _to_str_list(sensor.get("related_dtc_codes", [])),
-                 chunk_id)
-            )
+            typical_range = _safe_str(sensor.get("typical_range", ""))
+            unit = _safe_str(sensor.get("unit", ""))
+            row = sensors.get((name, sensor_type))
+            if row is None:
+                sensors[(name, sensor_type)] = [
+                    name, sensor_type, typical_range, unit,
+                    _to_str_list(sensor.get("related_dtc_codes", [])),
+                    chunk_id
+                ]
+            else:
+                row[2] = typical_range or row[2]
+                row[3] = unit or row[3]
 
         # --- TSB REFERENCES ---
         for tsb in data.get("tsb_references", []):
             tsb_num = (tsb.get("tsb_number") or "").strip()
             if not tsb_num:
                 continue
-            cur.execute(
-                """INSERT INTO refined.tsb_references
-                   (tsb_number, title, affected_models, related_dtc_codes,
-                    summary, source_chunk_id, confidence_score)
-                   VALUES (%s, %s, %s, %s, %s, %s, 0.5)
-                   ON CONFLICT (tsb_number) DO UPDATE
-                   SET title = COALESCE(
-                       NULLIF(EXCLUDED.title, ''),
-                       refined.tsb_references.title),
-                   summary = COALESCE(
-                       NULLIF(EXCLUDED.summary, ''),
-                       refined.tsb_references.summary)""",
-                (tsb_num, _safe_str(tsb.get("title", "")),
-                 _safe_str(tsb.get("affected_models", "")),
-                 _to_str_list(tsb.get("related_dtc_codes", [])),
-                 _safe_str(tsb.get("summary", "")), chunk_id)
-            )
+            title = _safe_str(tsb.get("title", ""))
+            summary = _safe_str(tsb.get("summary", ""))
+            row = tsbs.get(tsb_num)
+            if row is None:
+                tsbs[tsb_num] = [
+                    tsb_num, title,
+                    _safe_str(tsb.get("affected_models", "")),
+                    _to_str_list(tsb.get("related_dtc_codes", [])),
+                    summary, chunk_id
+                ]
+            else:
+                row[1] = title or row[1]
+                row[4] = summary or row[4]
 
         # --- VEHICLE MENTIONS ---
         for veh in data.get("vehicles_mentioned", []):
@@ -295,43 +343,92 @@ def store_extraction(chunk_id, data):
             model = (veh.get("model") or "").strip()
             if not make or not model:
                 continue
-            try:
-                year_start = int(veh["year_start"]) if veh.get("year_start") else None
-            except (ValueError, TypeError):
-                year_start = None
-            try:
-                year_end = int(veh["year_end"]) if veh.get("year_end") else None
-            except (ValueError, TypeError):
-                year_end = None
-            cur.execute(
-                """INSERT INTO refined.vehicle_mentions
-                   (source_chunk_id, make, model, year_start, year_end,
-                    engine, transmission, related_dtc_codes)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-                (chunk_id, make, model, year_start, year_end,
-                 _safe_str(veh.get("engine", "")),
-                 _safe_str(veh.get("transmission", "")),
-                 _to_str_list(veh.get("related_dtc_codes", [])))
-            )
+            vehicles.append((
+                chunk_id, make, model,
+                _year(veh.get("year_start")), _year(veh.get("year_end")),
+                _safe_str(veh.get("engine", "")),
+                _safe_str(veh.get("transmission", "")),
+                _to_str_list(veh.get("related_dtc_codes", []))
+            ))
 
         # --- DOCUMENT CATEGORY ---
         doc_category = _safe_str(data.get("document_category", "")).strip()
         if doc_category:
-            cur.execute(
-                """INSERT INTO refined.document_categories
-                   (source_chunk_id, category)
-                   VALUES (%s, %s)
-                   ON CONFLICT (source_chunk_id) DO UPDATE
-                   SET category = EXCLUDED.category""",
-                (chunk_id, doc_category)
-            )
-
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        return_connection(conn)
+            categories.append((chunk_id, doc_category))
+
+    if sources:
+        execute_values(
+            cur,
+            """INSERT INTO refined.dtc_sources (dtc_id, chunk_id)
+               VALUES %s
+               ON CONFLICT (dtc_id, chunk_id) DO NOTHING""",
+            sorted(sources)
+        )
+    # Causes and steps have no conflict key, so they are COPYed straight
+    # into their tables
+    if causes:
+        _copy_rows(cur, "refined.causes",
+                   ("dtc_id", "description", "likelihood",
+                    "source_chunk_id", "confidence_score"),
+                   [row + (0.5,) for row in causes])
+    if steps:
+        _copy_rows(cur, "refined.diagnostic_steps",
+                   ("dtc_id", "step_order", "description", "tools_required",
+                    "expected_values", "source_chunk_id", "confidence_score"),
+                   [row + (0.5,) for row in steps])
+    if sensors:
+        execute_values(
+            cur,
+            """INSERT INTO refined.sensors
+               (name, sensor_type, typical_range, unit,
+                related_dtc_codes, source_chunk_id, confidence_score)
+               VALUES %s
+               ON CONFLICT (name, sensor_type) DO UPDATE
+               SET typical_range = COALESCE(
+                   NULLIF(EXCLUDED.typical_range, ''),
+                   refined.sensors.typical_range),
+               unit = COALESCE(
+                   NULLIF(EXCLUDED.unit, ''),
+                   refined.sensors.unit)""",
+            [sensors[key] for key in sorted(sensors)],
+            template="(%s, %s, %s, %s, %s, %s, 0.5)"
+        )
+    if tsbs:
+        execute_values(
+            cur,
+            """INSERT INTO refined.tsb_references
+               (tsb_number, title, affected_models, related_dtc_codes,
+                summary, source_chunk_id, confidence_score)
+               VALUES %s
+               ON CONFLICT (tsb_number) DO UPDATE
+               SET title = COALESCE(
+                   NULLIF(EXCLUDED.title, ''),
+                   refined.tsb_references.title),
+               summary = COALESCE(
+                   NULLIF(EXCLUDED.summary, ''),
+                   refined.tsb_references.summary)""",
+            [tsbs[key] for key in sorted(tsbs)],
+            template="(%s, %s, %s, %s, %s, %s, 0.5)"
+        )
+    if vehicles:
+        execute_values(
+            cur,
+            """INSERT INTO refined.vehicle_mentions
+               (source_chunk_id, make, model, year_start, year_end,
+                engine, transmission, related_dtc_codes)
+               VALUES %s""",
+            vehicles
+        )
+    if categories:
+        execute_values(
+            cur,
+            """INSERT INTO refined.document_categories
+               (source_chunk_id, category)
+               VALUES %s
+               ON CONFLICT (source_chunk_id) DO UPDATE
+               SET category = EXCLUDED.category""",
+            categories
+        )
 
 
 def count_extracted(data):
@@ -342,6 +439,21 @@ def count_extracted(data):
     ])
 
 
+def extract_chunk(content):
+    """Run the extraction prompt over one chunk and parse the result."""
+    prompt = (
+        f"Extract all automotive technical data from this text:\n\n"
+        f"---\n{content}\n---"
+    )
+    response_text = generate_completion(
+        prompt=prompt,
+        system_prompt=SYSTEM_PROMPT,
+        format_json=True,
+        temperature=0.1
+    )
+    return parse_extraction(response_text)
+
+
 def process_document(doc_id):
     """Extract structured data from all relevant chunks of a document."""
     start_time = time.time()
@@ -349,50 +461,55 @@ def process_document(doc_id):
     update_document_stage(doc_id, "extracting")
     log_processing(doc_id, "extracting", "started")
 
-    # Fetch chunks, filtering by relevance_score >= 0.3 if evaluated
-    conn = get_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            """SELECT dc.id, dc.content
-               FROM research.document_chunks dc
-               LEFT JOIN research.chunk_evaluations ce
-                   ON dc.id = ce.chunk_id
-               WHERE dc.document_id = %s
-                 AND (ce.relevance_score IS NULL
-                      OR ce.relevance_score >= 0.3)
-               ORDER BY dc.chunk_index""",
-            (doc_id,)
-        )
-        chunks = cur.fetchall()
-    finally:
-        return_connection(conn)
-
-    if not chunks:
+    # Run the LLM over every chunk with relevance_score >= 0.3 (or not
+    # yet evaluated) first, so the refined-table writes below happen in
+    # one short transaction rather than being spread (with their row
+    # locks) across minutes of generation. Chunks are read a batch at a
+    # time; the next chunk's request is already queued at Ollama while
+    # the current response is parsed, so the model never waits on this
+    # worker.
+    extractions = []
+    total_items = 0
+    chunk_count = 0
+    with ThreadPoolExecutor(max_workers=1 + _PREFETCH_DEPTH) as pool:
+        for chunks in iter_document_chunks(doc_id, _CHUNK_BATCH,
+                                           min_relevance=0.3):
+            chunk_count += len(chunks)
+            futures = [pool.submit(extract_chunk, content)
+                       for _, content in chunks]
+            for (chunk_id, _), future in zip(chunks, futures):
+                try:
+                    data = future.result()
+                except Exception:
+                    # Any failed chunk fails the document, so that
+                    # requeue_error_documents retries it; drop the
+                    # completions still queued behind it
+                    for f in futures:
+                        f.cancel()
+                    raise
+
+                item_count = count_extracted(data)
+                if item_count > 0:
+                    extractions.append((chunk_id, data))
+                    total_items += item_count
+
+    if not chunk_count:
         log_processing(doc_id, "extracting", "completed",
                        "No relevant chunks to process", 0)
         advance_to_next_stage(doc_id, "extracted", "resolving")
         return
 
-    total_items = 0
-    for chunk_id, content in chunks:
-        prompt = (
-            f"Extract all automotive technical data from this text:\n\n"
-            f"---\n{content}\n---"
-        )
-        response_text = generate_completion(
-            prompt=prompt,
-            system_prompt=SYSTEM_PROMPT,
-            format_json=True,
-            temperature=0.1
-        )
-
-        data = parse_extraction(response_text)
-        item_count = count_extracted(data)
-
-        if item_count > 0:
-            store_extraction(chunk_id, data)
-            total_items += item_count
+    if extractions:
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            store_extractions(cur, extractions)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            return_connection(conn)
 
     duration_ms = int((time.time() - start_time) * 1000)
     log_processing(doc_id, "extracting", "completed",
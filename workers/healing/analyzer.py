@@ -2,12 +2,24 @@
 
 import sys
 import os
+import re
 import json
+import hashlib
 from typing import Dict, Optional
 
 sys.path.insert(0, "/app")
 
+try:
+    # orjson raises a json.JSONDecodeError subclass, so the fallbacks
+    # below still apply
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 from shared.ollama_client import generate_completion
+from shared.redis_client import get_redis
+
+from fingerprint import create_alert_fingerprint
 
 SYSTEM_PROMPT = """You are an expert DevOps and SRE engineer specializing in
 distributed document processing pipelines. You analyze system alerts and propose
@@ -24,7 +36,7 @@ Given an alert, respond with ONLY a JSON object (no other text):
 }
 
 Available actions:
-- restart_worker:<worker_name>         # Restart a specific worker container
+- restart_worker:<worker_name>         # Restart a worker container (comma-separate names to restart several at once)
 - restart_container:<container_name>   # Restart any container
 - requeue_documents:<stage>            # Re-queue stuck documents from a stage
 - clear_stale_locks                    # Clear Redis locks older than 1 hour
@@ -41,6 +53,18 @@ Guidelines:
 - NEVER propose actions that delete data or modify the database schema
 """
 
+# The answer is one small JSON object; stop a rambling model well before
+# it burns seconds of decode time
+_MAX_RESPONSE_TOKENS = 400
+
+# Alert fields rendered in the summary (or useless to the model) and so
+# left out of the additional context
+_SUMMARY_FIELDS = frozenset([
+    'id', 'timestamp', 'type', 'severity', 'component', 'details', 'recommended_action'
+])
+
+_FENCE_RE = re.compile(r"```json\s*(\{.*?\})\s*```", re.DOTALL)
+
 
 def parse_llm_response(response_text: str) -> Optional[Dict]:
     """Parse LLM JSON response with fallback strategies."""
@@ -48,17 +72,16 @@ def parse_llm_response(response_text: str) -> Optional[Dict]:
 
     # Strategy 1: direct JSON parse
     try:
-        return json.loads(text)
+        return json_loads(text)
     except json.JSONDecodeError:
         pass
 
     # Strategy 2: extract from ```json code block
-    if "```json" in text:
+    match = _FENCE_RE.search(text)
+    if match:
         try:
-            start = text.index("```json") + 7
-            end = text.index("```", start)
-            return json.loads(text[start:end].strip())
-        except (json.JSONDecodeError, ValueError):
+            return json_loads(match.group(1))
+        except json.JSONDecodeError:
             pass
 
     # Strategy 3: find outermost braces
@@ -66,29 +89,75 @@ def parse_llm_response(response_text: str) -> Optional[Dict]:
     last = text.rfind("}")
     if first != -1 and last > first:
         try:
-            return json.loads(text[first:last + 1])
+            return json_loads(text[first:last + 1])
         except json.JSONDecodeError:
             pass
 
     return None
 
 
+class ResponseCache:
+    """Redis cache of parsed LLM analyses, keyed by alert fingerprint.
+
+    Repeats of the same alert (a flapping container, an incident storm)
+    reuse the earlier analysis instead of waiting on another LLM call.
+    The key also covers the model and system prompt, so changing either
+    invalidates old entries. Opt-in via LLM_CACHE_ENABLED.
+    """
+
+    def __init__(self, ttl: int = 3600):
+        self.enabled = os.environ.get("LLM_CACHE_ENABLED", "false").lower() == "true"
+        self.ttl = ttl
+
+    def _key(self, alert: Dict, model: str) -> str:
+        digest = hashlib.sha256(
+            f"{model}|{SYSTEM_PROMPT}|{create_alert_fingerprint(alert)}".encode()
+        ).hexdigest()
+        return f"healing:llm_cache:{digest}"
+
+    def get(self, alert: Dict, model: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+        try:
+            cached = get_redis().get(self._key(alert, model))
+            return json_loads(cached) if cached else None
+        except Exception as e:
+            print(f"[analyzer] LLM cache lookup failed: {e}")
+            return None
+
+    def set(self, alert: Dict, model: str, result: Dict):
+        if not self.enabled:
+            return
+        try:
+            get_redis().setex(self._key(alert, model), self.ttl, json.dumps(result))
+        except Exception as e:
+            print(f"[analyzer] LLM cache store failed: {e}")
+
+
+response_cache = ResponseCache()
+
+
 def analyze_alert_with_llm(alert: Dict) -> Optional[Dict]:
     """Use Ollama LLM to analyze an alert and propose a fix strategy."""
+    model = os.environ.get("REASONING_MODEL", "mistral")
+
+    cached = response_cache.get(alert, model)
+    if cached is not None:
+        return cached
 
-    # Format alert as structured prompt
+    # Format alert as structured prompt. Only fields not already listed
+    # are added as context, in compact JSON; the alert ID and timestamp
+    # carry nothing the model can use.
+    extra = {k: v for k, v in alert.items() if k not in _SUMMARY_FIELDS}
+    context = f"\nADDITIONAL CONTEXT: {json.dumps(extra, separators=(',', ':'), default=str)}\n" if extra else ""
     alert_summary = f"""
 ALERT DETAILS:
-- ID: {alert.get('id')}
 - Type: {alert.get('type')}
 - Severity: {alert.get('severity')}
 - Component: {alert.get('component')}
 - Details: {alert.get('details')}
 - Recommended Action (from detector): {alert.get('recommended_action', 'none')}
-
-ADDITIONAL CONTEXT:
-{json.dumps(alert, indent=2)}
-
+{context}
 Analyze this alert and propose the best remediation action.
 """
 
@@ -98,7 +167,8 @@ Analyze this alert and propose the best remediation action.
             system_prompt=SYSTEM_PROMPT,
             format_json=True,
             temperature=0.1,  # Low temperature for deterministic, conservative decisions
-            model=os.environ.get("REASONING_MODEL", "mistral")
+            model=model,
+            max_tokens=_MAX_RESPONSE_TOKENS
         )
 
         result = parse_llm_response(response_text)
@@ -110,6 +180,7 @@ Analyze this alert and propose the best remediation action.
             if 'reasoning' not in result:
                 result['reasoning'] = 'No reasoning provided'
 
+            response_cache.set(alert, model, result)
             return result
         else:
             return None
@@ -1,11 +1,29 @@
-"""Audit logging for all healing actions."""
+"""Audit logging for all healing actions.
+
+Entries are buffered in memory and written by a background thread in
+batches (every second, or sooner once 50 are waiting), so the decision
+loop never waits on an INSERT. stop_audit_log() must run before the DB
+pool is closed.
+"""
 
 import sys
-from datetime import datetime
+import atexit
+import threading
 
 sys.path.insert(0, "/app")
 
-from shared.db import execute_query
+from psycopg2.extras import execute_values
+
+from shared.db import get_connection, return_connection
+
+_FLUSH_INTERVAL = 1.0
+_FLUSH_SIZE = 50
+
+_pending = []
+_pending_lock = threading.Lock()
+_wakeup = threading.Event()
+_stopped = threading.Event()
+_flusher = None
 
 
 def log_healing_action(
@@ -19,17 +37,81 @@ def log_healing_action(
     reason: str = None
 ):
     """Log a healing action to the database for audit trail."""
+    global _flusher
+
+    with _pending_lock:
+        _pending.append(
+            (alert_id, action_type, component, decision, success, result, llm_reasoning, reason)
+        )
+        backlog = len(_pending)
+        if _flusher is None and not _stopped.is_set():
+            _flusher = threading.Thread(target=_flush_loop, name="audit-flusher", daemon=True)
+            _flusher.start()
+            atexit.register(stop_audit_log)
+
+    if _stopped.is_set():
+        # The flusher is gone; write straight through
+        flush_audit_log()
+    elif backlog >= _FLUSH_SIZE:
+        _wakeup.set()
+
+    print(f"[audit] {decision.upper()} - {action_type} on {component}")
+
 
+def flush_audit_log():
+    """Write all buffered entries to research.healing_log in one statement."""
+    with _pending_lock:
+        rows = _pending[:]
+        del _pending[:]
+    if not rows:
+        return
+
+    conn = None
     try:
-        execute_query(
+        conn = get_connection()
+        cur = conn.cursor()
+        execute_values(
+            cur,
             """INSERT INTO research.healing_log
                (alert_id, action_type, component, decision, success, result, llm_reasoning, reason)
-               VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-            (alert_id, action_type, component, decision, success, result, llm_reasoning, reason)
+               VALUES %s""",
+            rows
         )
-
-        print(f"[audit] {decision.upper()} - {action_type} on {component}")
+        conn.commit()
 
     except Exception as e:
         # Log to stderr if DB logging fails (don't fail the healing action)
-        print(f"[audit] ERROR: Failed to log healing action: {e}")
+        print(f"[audit] ERROR: Failed to log {len(rows)} healing action(s): {e}")
+        if conn:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+
+    finally:
+        if conn:
+            return_connection(conn)
+
+
+def stop_audit_log():
+    """Stop the flusher thread, then write out everything still buffered.
+
+    The flusher is joined first, so a batch it has already taken (and may
+    be waiting on a connection for) is written before the final flush.
+    Safe to call more than once.
+    """
+    _stopped.set()
+    _wakeup.set()
+    with _pending_lock:
+        flusher = _flusher
+    if flusher is not None and flusher is not threading.current_thread():
+        flusher.join()
+    flush_audit_log()
+
+
+def _flush_loop():
+    """Background thread: flush the buffer on an interval or when it fills."""
+    while not _stopped.is_set():
+        _wakeup.wait(_FLUSH_INTERVAL)
+        _wakeup.clear()
+        flush_audit_log()
@@ -2,13 +2,27 @@
 
 import sys
 import subprocess
-from typing import Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Tuple, Dict, List
+
+import redis
 
 sys.path.insert(0, "/app")
 
 from shared.redis_client import get_redis
 from shared.db import execute_query
 
+# Processing stage -> queue its worker consumes (read-only)
+_STAGE_TO_QUEUE = MappingProxyType({
+    'chunking': 'jobs:chunk',
+    'embedding': 'jobs:embed',
+    'evaluating': 'jobs:evaluate',
+    'extracting': 'jobs:extract',
+    'resolving': 'jobs:resolve',
+    'crawling': 'jobs:crawl'
+})
+
 
 def execute_healing_action(action: str, alert: Dict, analysis: Dict) -> Tuple[bool, str]:
     """Execute a healing action and return (success, message)."""
@@ -35,15 +49,25 @@ def execute_healing_action(action: str, alert: Dict, analysis: Dict) -> Tuple[bo
         return False, f"Action execution failed: {str(e)}"
 
 
-def restart_worker(worker_name: str, alert: Dict, analysis: Dict) -> Tuple[bool, str]:
-    """Restart a worker container using Docker."""
-    if not worker_name:
-        return False, "Worker name not specified"
+def action_cost(action: str) -> int:
+    """Number of MAX_ACTIONS_PER_HOUR slots an action consumes.
+
+    A comma-separated restart_worker list restarts one container per name,
+    so it is charged one slot per worker.
+    """
+    if (action or '').startswith('restart_worker:'):
+        return max(1, len(_split_worker_names(action.split(':', 1)[1])))
+    return 1
+
+
+def _split_worker_names(worker_name: str) -> List[str]:
+    """Split a restart_worker parameter into worker names."""
+    return [name.strip() for name in (worker_name or '').split(',') if name.strip()]
 
-    container_name = f"refinery_worker_{worker_name}"
 
+def _docker_restart(container_name: str) -> Tuple[bool, str]:
+    """Restart one container with the Docker CLI."""
     try:
-        # Use docker restart command
         result = subprocess.run(
             ['docker', 'restart', container_name],
             capture_output=True,
@@ -62,6 +86,36 @@ def restart_worker(worker_name: str, alert: Dict, analysis: Dict) -> Tuple[bool,
         return False, f"Failed to restart {container_name}: {str(e)}"
 
 
+def restart_workers(worker_names: List[str]) -> Tuple[bool, str]:
+    """Restart several worker containers concurrently.
+
+    Each restart waits on the Docker daemon, so running them side by side
+    takes about as long as the slowest one instead of the sum of all.
+    """
+    container_names = [f"refinery_worker_{name}" for name in worker_names]
+
+    with ThreadPoolExecutor(max_workers=len(container_names)) as pool:
+        results = list(pool.map(_docker_restart, container_names))
+
+    return all(ok for ok, _ in results), "; ".join(message for _, message in results)
+
+
+def restart_worker(worker_name: str, alert: Dict, analysis: Dict) -> Tuple[bool, str]:
+    """Restart a worker container using Docker.
+
+    A comma-separated list (restart_worker:chunking,embedding) restarts
+    those workers concurrently; see action_cost for how it is rate-limited.
+    """
+    worker_names = _split_worker_names(worker_name)
+    if not worker_names:
+        return False, "Worker name not specified"
+
+    if len(worker_names) > 1:
+        return restart_workers(worker_names)
+
+    return _docker_restart(f"refinery_worker_{worker_names[0]}")
+
+
 def restart_container(container_name: str, alert: Dict, analysis: Dict) -> Tuple[bool, str]:
     """Restart any container (more generic than restart_worker)."""
     if not container_name:
@@ -69,21 +123,7 @@ def restart_container(container_name: str, alert: Dict, analysis: Dict) -> Tuple
 
     full_name = f"refinery_{container_name}" if not container_name.startswith('refinery_') else container_name
 
-    try:
-        result = subprocess.run(
-            ['docker', 'restart', full_name],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-
-        if result.returncode == 0:
-            return True, f"Successfully restarted {full_name}"
-        else:
-            return False, f"Docker restart failed: {result.stderr}"
-
-    except Exception as e:
-        return False, f"Failed to restart {full_name}: {str(e)}"
+    return _docker_restart(full_name)
 
 
 def requeue_documents(stage: str, alert: Dict, analysis: Dict) -> Tuple[bool, str]:
@@ -91,17 +131,7 @@ def requeue_documents(stage: str, alert: Dict, analysis: Dict) -> Tuple[bool, st
     if not stage:
         return False, "Stage not specified"
 
-    # Map stage to queue name
-    stage_to_queue = {
-        'chunking': 'jobs:chunk',
-        'embedding': 'jobs:embed',
-        'evaluating': 'jobs:evaluate',
-        'extracting': 'jobs:extract',
-        'resolving': 'jobs:resolve',
-        'crawling': 'jobs:crawl'
-    }
-
-    queue_name = stage_to_queue.get(stage)
+    queue_name = _STAGE_TO_QUEUE.get(stage)
     if not queue_name:
         return False, f"Unknown stage: {stage}"
 
@@ -119,15 +149,11 @@ def requeue_documents(stage: str, alert: Dict, analysis: Dict) -> Tuple[bool, st
         if not rows:
             return True, f"No documents stuck in {stage} stage"
 
-        # Push them back to the queue
-        redis_client = get_redis()
-        count = 0
-        for row in rows:
-            doc_id = str(row[0])
-            redis_client.lpush(queue_name, doc_id)
-            count += 1
+        # Push them back to the queue in one variadic LPUSH
+        doc_ids = [str(row[0]) for row in rows]
+        get_redis().lpush(queue_name, *doc_ids)
 
-        return True, f"Re-queued {count} documents to {queue_name}"
+        return True, f"Re-queued {len(doc_ids)} documents to {queue_name}"
 
     except Exception as e:
         return False, f"Failed to requeue documents: {str(e)}"
@@ -143,16 +169,7 @@ def requeue_error_documents(target_stage: str, alert: Dict, analysis: Dict) -> T
     if not target_stage:
         target_stage = 'extracting'  # Most errors occur at extraction
 
-    stage_to_queue = {
-        'chunking': 'jobs:chunk',
-        'embedding': 'jobs:embed',
-        'evaluating': 'jobs:evaluate',
-        'extracting': 'jobs:extract',
-        'resolving': 'jobs:resolve',
-        'crawling': 'jobs:crawl'
-    }
-
-    queue_name = stage_to_queue.get(target_stage)
+    queue_name = _STAGE_TO_QUEUE.get(target_stage)
     if not queue_name:
         return False, f"Unknown target stage: {target_stage}"
 
@@ -168,28 +185,74 @@ def requeue_error_documents(target_stage: str, alert: Dict, analysis: Dict) -> T
         if not rows:
             return True, "No documents in error state"
 
-        redis_client = get_redis()
-        count = 0
-        for row in rows:
-            doc_id = str(row[0])
-            # Reset stage so the worker picks it up cleanly
-            execute_query(
-                """UPDATE research.documents
-                   SET processing_stage = %s, error_message = NULL, updated_at = NOW()
-                   WHERE id = %s""",
-                (target_stage, doc_id)
-            )
-            redis_client.lpush(queue_name, doc_id)
-            count += 1
-
-        return True, f"Re-queued {count} error documents to {queue_name}"
+        doc_ids = [str(row[0]) for row in rows]
+        # Reset stage so the worker picks them up cleanly
+        execute_query(
+            """UPDATE research.documents
+               SET processing_stage = %s, error_message = NULL, updated_at = NOW()
+               WHERE id = ANY(%s::uuid[])""",
+            (target_stage, doc_ids)
+        )
+        get_redis().lpush(queue_name, *doc_ids)
+
+        return True, f"Re-queued {len(doc_ids)} error documents to {queue_name}"
 
     except Exception as e:
         return False, f"Failed to requeue error documents: {str(e)}"
 
 
+# Scan one SCAN page (cursor ARGV[1], pattern ARGV[2]) and delete its
+# stale locks server-side in one round-trip; returns {next_cursor, deleted}.
+# A lock is stale if its TTL is over ARGV[3] seconds or it has no expiry (-1).
+_CLEAR_STALE_LOCKS_LUA = """
+local reply = redis.call('SCAN', ARGV[1], 'MATCH', ARGV[2], 'COUNT', 500)
+local deleted = 0
+for _, key in ipairs(reply[2]) do
+    local ttl = redis.call('TTL', key)
+    if ttl > tonumber(ARGV[3]) or ttl == -1 then
+        redis.call('DEL', key)
+        deleted = deleted + 1
+    end
+end
+return {reply[1], deleted}
+"""
+
+_clear_stale_locks_script = None
+
+
+def _clear_stale_locks_pipelined(redis_client, lock_pattern: str, max_ttl: int) -> int:
+    """Client-side equivalent of _CLEAR_STALE_LOCKS_LUA.
+
+    Used where Lua scripting is unavailable. TTLs for each SCAN batch are
+    fetched in one pipeline and the stale keys deleted in one call, so the
+    cost is about two round-trips per batch rather than two per key.
+    """
+    cursor = 0
+    deleted_count = 0
+
+    while True:
+        cursor, keys = redis_client.scan(cursor, match=lock_pattern, count=500)
+
+        if keys:
+            pipe = redis_client.pipeline(transaction=False)
+            for key in keys:
+                pipe.ttl(key)
+            ttls = pipe.execute()
+
+            # If TTL > max_ttl seconds or no TTL (-1), consider stale
+            stale = [key for key, ttl in zip(keys, ttls) if ttl > max_ttl or ttl == -1]
+            if stale:
+                deleted_count += redis_client.delete(*stale)
+
+        if cursor == 0:
+            break
+
+    return deleted_count
+
+
 def clear_stale_locks(param: str, alert: Dict, analysis: Dict) -> Tuple[bool, str]:
     """Clear Redis locks older than 1 hour (for distributed lock issues)."""
+    global _clear_stale_locks_script
 
     redis_client = get_redis()
 
@@ -197,22 +260,27 @@ def clear_stale_locks(param: str, alert: Dict, analysis: Dict) -> Tuple[bool, st
     lock_pattern = "lock:*"
 
     try:
-        # Scan for lock keys
-        cursor = 0
-        deleted_count = 0
-
-        while True:
-            cursor, keys = redis_client.scan(cursor, match=lock_pattern, count=100)
-
-            for key in keys:
-                # Check TTL - if > 3600 seconds or no TTL, consider stale
-                ttl = redis_client.ttl(key)
-                if ttl > 3600 or ttl == -1:  # -1 means no expiry
-                    redis_client.delete(key)
-                    deleted_count += 1
-
-            if cursor == 0:
-                break
+        # register_script runs via EVALSHA, loading the script on first use
+        if _clear_stale_locks_script is None:
+            _clear_stale_locks_script = redis_client.register_script(_CLEAR_STALE_LOCKS_LUA)
+
+        try:
+            # One SCAN page per call, so other clients (every worker's
+            # BRPOP) run between pages instead of waiting out the whole
+            # keyspace walk
+            cursor = "0"
+            deleted_count = 0
+            while True:
+                cursor, deleted = _clear_stale_locks_script(
+                    args=[cursor, lock_pattern, 3600], client=redis_client
+                )
+                deleted_count += int(deleted)
+                if str(cursor) == "0":
+                    break
+        except redis.exceptions.ResponseError as e:
+            # Scripting disabled or restricted (e.g. ACLs, managed Redis)
+            print(f"[executor] Lua lock cleanup unavailable ({e}), using pipelined scan")
+            deleted_count = _clear_stale_locks_pipelined(redis_client, lock_pattern, 3600)
 
         return True, f"Cleared {deleted_count} stale locks"
 
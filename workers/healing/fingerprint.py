@@ -0,0 +1,21 @@
+"""Alert fingerprinting shared by the safety checks and the analyzer."""
+
+import hashlib
+from typing import Dict
+
+
+def create_alert_fingerprint(alert: Dict) -> str:
+    """Create a hash fingerprint of an alert for deduplication.
+
+    The digest is prefixed with its algorithm, so keys built from older
+    fingerprints (MD5) never collide with current ones.
+    """
+    # Use type + component + details to identify duplicate alerts
+    key_parts = [
+        alert.get('type', ''),
+        alert.get('component', ''),
+        alert.get('details', '')[:100]  # First 100 chars of details
+    ]
+
+    fingerprint_str = '|'.join(key_parts)
+    return f"sha256:{hashlib.sha256(fingerprint_str.encode()).hexdigest()}"
@@ -2,86 +2,89 @@
 
 import sys
 import os
-import hashlib
-from typing import Dict
+from typing import Dict, Tuple
 
 sys.path.insert(0, "/app")
 
 from shared.redis_client import get_redis
 
+from fingerprint import create_alert_fingerprint
 
-def is_action_allowed(action: str) -> bool:
-    """Check if an action is in the allow list and not in deny list."""
-    allow_list = os.environ.get("AUTO_FIX_ALLOW", "restart_worker,requeue_documents,clear_stale_locks").split(',')
-    deny_list = os.environ.get("AUTO_FIX_DENY", "restart_container,database_operations,delete_data").split(',')
 
-    action_type = action.split(':')[0] if ':' in action else action
+_ALLOW = frozenset()
+_DENY = frozenset()
 
-    # Deny list takes precedence
-    if action_type in deny_list:
-        return False
 
-    # Must be in allow list
-    return action_type in allow_list
+def reload_policy():
+    """(Re)read the AUTO_FIX_ALLOW / AUTO_FIX_DENY lists from the environment.
 
+    Called once at import; call again to pick up changed settings.
+    """
+    global _ALLOW, _DENY
+    _ALLOW = frozenset(os.environ.get("AUTO_FIX_ALLOW", "restart_worker,requeue_documents,clear_stale_locks").split(','))
+    _DENY = frozenset(os.environ.get("AUTO_FIX_DENY", "restart_container,database_operations,delete_data").split(','))
 
-def check_rate_limits() -> bool:
-    """Check if we've exceeded MAX_ACTIONS_PER_HOUR."""
-    max_actions = int(os.environ.get("MAX_ACTIONS_PER_HOUR", 10))
 
-    redis_client = get_redis()
-    key = "healing:action_count"
-
-    # Get current count
-    count = redis_client.get(key)
-    if count is None:
-        count = 0
-    else:
-        count = int(count)
+reload_policy()
 
-    if count >= max_actions:
-        return False
 
-    return True
+def is_action_allowed(action: str) -> bool:
+    """Check if an action is in the allow list and not in deny list."""
+    action_type = action.split(':', 1)[0]
 
+    # Deny list takes precedence
+    return action_type not in _DENY and action_type in _ALLOW
+
+
+# Take one slot from the hourly action budget, atomically. The TTL is set
+# only when the window opens, so it is a fixed window that really expires
+# (re-arming EXPIRE on every INCR would keep extending it). A full budget
+# is left untouched and reported as denied.
+_ACQUIRE_ACTION_SLOT_LUA = """
+local count = tonumber(redis.call('GET', KEYS[1]) or '0')
+local slots = tonumber(ARGV[3])
+if count + slots > tonumber(ARGV[1]) then
+    return {0, count}
+end
+count = redis.call('INCRBY', KEYS[1], slots)
+if count == slots or redis.call('TTL', KEYS[1]) == -1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return {1, count}
+"""
+
+_acquire_action_slot_script = None
+
+
+def try_acquire(slots: int = 1) -> Tuple[bool, int]:
+    """Reserve an action costing ``slots`` against MAX_ACTIONS_PER_HOUR.
+
+    Returns (allowed, count): whether the action may run, and the number
+    of slots used in the current one-hour window. An action is refused
+    outright if its whole cost does not fit in the remaining budget.
+    """
+    global _acquire_action_slot_script
+    max_actions = int(os.environ.get("MAX_ACTIONS_PER_HOUR", 10))
 
-def record_action(action: str):
-    """Increment action counter with 1-hour TTL."""
     redis_client = get_redis()
-    key = "healing:action_count"
+    if _acquire_action_slot_script is None:
+        _acquire_action_slot_script = redis_client.register_script(_ACQUIRE_ACTION_SLOT_LUA)
 
-    # Increment and set TTL
-    pipe = redis_client.pipeline()
-    pipe.incr(key)
-    pipe.expire(key, 3600)  # 1 hour TTL
-    pipe.execute()
+    allowed, count = _acquire_action_slot_script(
+        keys=["healing:action_count"], args=[max_actions, 3600, slots], client=redis_client
+    )
+    return bool(allowed), int(count)
 
 
 def check_idempotency(alert: Dict) -> bool:
     """Check if we've already processed this exact alert recently."""
     # Create a fingerprint of the alert
-    fingerprint = _create_alert_fingerprint(alert)
+    fingerprint = create_alert_fingerprint(alert)
 
     redis_client = get_redis()
     key = f"healing:processed:{fingerprint}"
 
-    # Check if this fingerprint exists
-    if redis_client.exists(key):
-        return False  # Already processed
-
-    # Mark as processed with 10-minute TTL
-    redis_client.setex(key, 600, "1")
-    return True
-
-
-def _create_alert_fingerprint(alert: Dict) -> str:
-    """Create a hash fingerprint of an alert for deduplication."""
-    # Use type + component + details to identify duplicate alerts
-    key_parts = [
-        alert.get('type', ''),
-        alert.get('component', ''),
-        alert.get('details', '')[:100]  # First 100 chars of details
-    ]
-
-    fingerprint_str = '|'.join(key_parts)
-    return hashlib.md5(fingerprint_str.encode()).hexdigest()
+    # Mark as processed with 10-minute TTL, unless already marked. SET NX
+    # checks and marks in one atomic step, so two workers handling the
+    # same alert cannot both get through.
+    return bool(redis_client.set(key, "1", nx=True, ex=600))
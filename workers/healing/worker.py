@@ -5,6 +5,9 @@ the reasoning LLM (llama3 on llm-reason), generates fix strategies, and
 executes approved actions. All healing actions are logged to the
 research.healing_log table for audit trail and learning.
 
+Alerts are analyzed concurrently (HEALING_CONCURRENCY at a time); the
+rate limit, cooldown and action execution are serialized.
+
 Safety-first design:
 - Rate limiting: MAX_ACTIONS_PER_HOUR limit
 - Cooldown period between actions
@@ -18,22 +21,28 @@ import os
 import json
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 sys.path.insert(0, "/app")
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 from shared.redis_client import pop_job
 from shared.db import execute_query
 
 from analyzer import analyze_alert_with_llm
-from executor import execute_healing_action
+from executor import execute_healing_action, action_cost
 from safety import (
     is_action_allowed,
-    check_rate_limits,
-    check_idempotency,
-    record_action
+    try_acquire,
+    check_idempotency
 )
-from audit_logger import log_healing_action
+from audit_logger import log_healing_action, stop_audit_log
 
 logging.basicConfig(
     level=logging.INFO,
@@ -49,18 +58,23 @@ class HealingAgent:
         self.alert_queue = os.environ.get("ALERT_QUEUE", "monitoring:alerts")
         self.auto_fix_enabled = os.environ.get("AUTO_FIX_ENABLED", "true").lower() == "true"
         self.cooldown = int(os.environ.get("COOLDOWN_BETWEEN_ACTIONS", 120))
+        self.concurrency = max(1, int(os.environ.get("HEALING_CONCURRENCY", 4)))
         self.last_action_time = None
+        # Alerts are analyzed concurrently, but the rate limit, cooldown
+        # and action execution stay serialized behind this lock
+        self._action_lock = threading.Lock()
 
         logger.info(f"Healing agent initialized:")
         logger.info(f"  - Alert queue: {self.alert_queue}")
         logger.info(f"  - Auto-fix enabled: {self.auto_fix_enabled}")
         logger.info(f"  - Cooldown: {self.cooldown}s")
+        logger.info(f"  - Concurrency: {self.concurrency}")
         logger.info(f"  - Allow list: {os.environ.get('AUTO_FIX_ALLOW', 'N/A')}")
 
     def process_alert(self, alert_json: str):
         """Process a single alert from the monitoring agent."""
         try:
-            alert = json.loads(alert_json)
+            alert = json_loads(alert_json)
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse alert JSON: {e}")
             return
@@ -112,27 +126,40 @@ class HealingAgent:
             )
             return
 
-        if not check_rate_limits():
-            logger.warning(f"Rate limit exceeded, deferring action")
-            log_healing_action(
-                alert_id=alert_id,
-                action_type=proposed_action,
-                component=component,
-                decision='deferred',
-                reason='Rate limit exceeded'
-            )
-            return
+        with self._action_lock:
+            self._act(alert, analysis)
 
-        # Cooldown check
-        if self.last_action_time:
-            time_since_last = (datetime.now() - self.last_action_time).total_seconds()
-            if time_since_last < self.cooldown:
-                wait_time = self.cooldown - time_since_last
-                logger.info(f"Cooldown active, waiting {wait_time:.0f}s")
-                time.sleep(wait_time)
+    def _act(self, alert: dict, analysis: dict):
+        """Rate-limit, cool down and execute (or escalate) an approved action."""
+        alert_id = alert.get('id', 'unknown')
+        component = alert.get('component', 'unknown')
+        proposed_action = analysis.get('action')
+        confidence = analysis.get('confidence', 0.0)
+        reasoning = analysis.get('reasoning', '')
 
         # Execute the healing action
         if self.auto_fix_enabled and confidence >= 0.7:
+            # Reserve the action against the hourly budget up front
+            allowed, count = try_acquire(action_cost(proposed_action))
+            if not allowed:
+                logger.warning(f"Rate limit exceeded ({count} actions this hour), deferring action")
+                log_healing_action(
+                    alert_id=alert_id,
+                    action_type=proposed_action,
+                    component=component,
+                    decision='deferred',
+                    reason='Rate limit exceeded'
+                )
+                return
+
+            # Cooldown check
+            if self.last_action_time:
+                time_since_last = (datetime.now() - self.last_action_time).total_seconds()
+                if time_since_last < self.cooldown:
+                    wait_time = self.cooldown - time_since_last
+                    logger.info(f"Cooldown active, waiting {wait_time:.0f}s")
+                    time.sleep(wait_time)
+
             logger.info(f"Executing auto-fix: {proposed_action}")
 
             success, result_message = execute_healing_action(proposed_action, alert, analysis)
@@ -153,7 +180,6 @@ class HealingAgent:
                 logger.error(f"Healing action failed: {result_message}")
 
             self.last_action_time = datetime.now()
-            record_action(proposed_action)
 
         else:
             reason = f"Low confidence ({confidence:.2f})" if confidence < 0.7 else "Auto-fix disabled"
@@ -178,18 +204,43 @@ class HealingAgent:
 
         logger.info(f"Healing agent started, listening on {self.alert_queue}")
 
-        while self._shutdown.is_running():
-            try:
-                alert_json = pop_job(self.alert_queue, timeout=5)
-                if alert_json:
-                    self.process_alert(alert_json)
-            except Exception as e:
-                logger.error(f"Error processing alert: {e}", exc_info=True)
-
-            time.sleep(0.5)
-
+        # Alerts are handled on a pool so a burst is analyzed in parallel
+        # rather than one LLM call at a time. The semaphore stops popping
+        # while every worker is busy, leaving the backlog in Redis.
+        slots = threading.BoundedSemaphore(self.concurrency)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while self._shutdown.is_running():
+                if not slots.acquire(timeout=5):
+                    continue
+                # BRPOP wakes as soon as an alert is pushed, so there is no
+                # sleep between pops. An empty result that comes back early
+                # means Redis is unreachable; back off before retrying.
+                popped_at = time.monotonic()
+                try:
+                    alert_json = pop_job(self.alert_queue, timeout=5)
+                    if alert_json:
+                        pool.submit(self._process_alert_safely, alert_json, slots)
+                        continue
+                except Exception as e:
+                    logger.error(f"Error receiving alert: {e}", exc_info=True)
+                slots.release()
+                if time.monotonic() - popped_at < 1:
+                    time.sleep(1)
+
+        # Stop the audit flusher and write out buffered entries before
+        # the DB pool is closed
+        stop_audit_log()
         self._shutdown.cleanup()
 
+    def _process_alert_safely(self, alert_json: str, slots: threading.BoundedSemaphore):
+        """Pool task: process one alert, logging errors and freeing its slot."""
+        try:
+            self.process_alert(alert_json)
+        except Exception as e:
+            logger.error(f"Error processing alert: {e}", exc_info=True)
+        finally:
+            slots.release()
+
 
 def ensure_healing_log_table():
     """Ensure healing_log table exists."""
@@ -210,8 +261,8 @@ def ensure_healing_log_table():
         """)
 
         execute_query("""
-            CREATE INDEX IF NOT EXISTS idx_healing_log_created
-            ON research.healing_log(created_at DESC)
+            CREATE INDEX IF NOT EXISTS idx_healing_log_created_brin
+            ON research.healing_log USING brin (created_at)
         """)
 
         execute_query("""
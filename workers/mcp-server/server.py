@@ -1,13 +1,21 @@
 """MCP Server exposing the automotive knowledge base via SSE transport.
 
 Runs on port 8002 and provides tools for DTC lookup, semantic search,
-code listing, and system statistics.
+code listing, and system statistics. Tool results are cached briefly;
+POST /cache/flush clears the cache.
 """
 import sys
 import json
+import time
+from collections import OrderedDict
 
 sys.path.insert(0, "/app")
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from mcp.server import Server
 from mcp.server.sse import SseServerTransport
 from mcp.types import Tool, TextContent
@@ -21,92 +29,139 @@ from tools import lookup_dtc, search_knowledge, list_dtc_codes, get_system_stats
 mcp_server = Server("automotive-knowledge-base")
 
 
-@mcp_server.list_tools()
-async def handle_list_tools():
-    """Return the list of available MCP tools."""
-    return [
-        Tool(
-            name="lookup_dtc",
-            description="Look up full details for a specific automotive DTC "
-                       "(Diagnostic Trouble Code) including causes, diagnostic "
-                       "steps, related sensors, and TSB references.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "code": {
-                        "type": "string",
-                        "description": "DTC code (e.g., 'P0301', 'B0100', 'C0035')"
-                    }
+# Tool descriptors are static, so they are built once at import
+_TOOLS = [
+    Tool(
+        name="lookup_dtc",
+        description="Look up full details for a specific automotive DTC "
+                   "(Diagnostic Trouble Code) including causes, diagnostic "
+                   "steps, related sensors, and TSB references.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "code": {
+                    "type": "string",
+                    "description": "DTC code (e.g., 'P0301', 'B0100', 'C0035')"
+                }
+            },
+            "required": ["code"]
+        }
+    ),
+    Tool(
+        name="search_knowledge",
+        description="Semantic vector search across the automotive knowledge "
+                   "base. Use natural language queries to find relevant "
+                   "diagnostic information.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Natural language search query"
                 },
-                "required": ["code"]
-            }
-        ),
-        Tool(
-            name="search_knowledge",
-            description="Semantic vector search across the automotive knowledge "
-                       "base. Use natural language queries to find relevant "
-                       "diagnostic information.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "Natural language search query"
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "description": "Max results (default 10)",
-                        "default": 10
-                    },
-                    "min_trust": {
-                        "type": "number",
-                        "description": "Minimum trust score filter (0-1)",
-                        "default": 0.0
-                    }
+                "limit": {
+                    "type": "integer",
+                    "description": "Max results (default 10)",
+                    "default": 10
                 },
-                "required": ["query"]
-            }
-        ),
-        Tool(
-            name="list_dtc_codes",
-            description="List available DTC codes with optional filtering by "
-                       "category and confidence score.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "category": {
-                        "type": "string",
-                        "description": "Filter by category (e.g., 'Powertrain')"
-                    },
-                    "min_confidence": {
-                        "type": "number",
-                        "description": "Minimum confidence score (0-1)",
-                        "default": 0.0
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "description": "Max results (default 50)",
-                        "default": 50
-                    }
+                "min_trust": {
+                    "type": "number",
+                    "description": "Minimum trust score filter (0-1)",
+                    "default": 0.0
+                }
+            },
+            "required": ["query"]
+        }
+    ),
+    Tool(
+        name="list_dtc_codes",
+        description="List available DTC codes with optional filtering by "
+                   "category and confidence score.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "category": {
+                    "type": "string",
+                    "description": "Filter by category (e.g., 'Powertrain')"
+                },
+                "min_confidence": {
+                    "type": "number",
+                    "description": "Minimum confidence score (0-1)",
+                    "default": 0.0
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Max results (default 50)",
+                    "default": 50
                 }
             }
-        ),
-        Tool(
-            name="get_system_stats",
-            description="Get knowledge base coverage and quality metrics "
-                       "including total codes, documents, confidence scores, "
-                       "and category breakdowns.",
-            inputSchema={
-                "type": "object",
-                "properties": {}
-            }
-        ),
-    ]
+        }
+    ),
+    Tool(
+        name="get_system_stats",
+        description="Get knowledge base coverage and quality metrics "
+                   "including total codes, documents, confidence scores, "
+                   "and category breakdowns.",
+        inputSchema={
+            "type": "object",
+            "properties": {}
+        }
+    ),
+]
+
+
+@mcp_server.list_tools()
+async def handle_list_tools():
+    """Return the list of available MCP tools."""
+    return _TOOLS
+
+
+def _dumps(result) -> str:
+    """Serialize a tool result to compact JSON text."""
+    if orjson is not None:
+        return orjson.dumps(result, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(result, default=str)
+
+
+# Tool results are cached as serialized text for a few minutes, keyed by
+# tool name and normalized arguments, so repeated lookups of popular codes
+# and searches skip the database. Stats change constantly and are only
+# reused for a short while.
+_RESULT_CACHE_SIZE = 1024
+_RESULT_TTL = 300
+_STATS_TTL = 30
+_result_cache = OrderedDict()  # (name, args) -> (expires_at, text)
+
+
+def _cache_key(name: str, arguments: dict):
+    """Canonical cache key for a tool call."""
+    args = dict(arguments or {})
+    if name == "search_knowledge" and isinstance(args.get("query"), str):
+        # Whitespace only: the query embedding is case-sensitive
+        args["query"] = " ".join(args["query"].split())
+    elif name == "lookup_dtc" and isinstance(args.get("code"), str):
+        args["code"] = args["code"].strip().upper()
+    return name, json.dumps(args, sort_keys=True, default=str)
+
+
+def _is_error(result) -> bool:
+    """True for error results, which tools return rather than raise."""
+    if isinstance(result, dict):
+        return "error" in result
+    if isinstance(result, list):
+        return any(isinstance(r, dict) and "error" in r for r in result)
+    return False
 
 
 @mcp_server.call_tool()
 async def handle_call_tool(name: str, arguments: dict):
     """Handle MCP tool calls."""
+    key = _cache_key(name, arguments)
+    cached = _result_cache.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        _result_cache.move_to_end(key)
+        return [TextContent(type="text", text=cached[1])]
+
     try:
         if name == "lookup_dtc":
             result = lookup_dtc(arguments["code"])
@@ -127,14 +182,23 @@ async def handle_call_tool(name: str, arguments: dict):
         else:
             result = {"error": f"Unknown tool: {name}"}
 
+        text = _dumps(result)
+        # Errors (an Ollama blip, a code not ingested yet) are not cached
+        if not _is_error(result):
+            ttl = _STATS_TTL if name == "get_system_stats" else _RESULT_TTL
+            _result_cache[key] = (time.monotonic() + ttl, text)
+            _result_cache.move_to_end(key)
+            if len(_result_cache) > _RESULT_CACHE_SIZE:
+                _result_cache.popitem(last=False)
+
         return [TextContent(
             type="text",
-            text=json.dumps(result, indent=2, default=str)
+            text=text
         )]
     except Exception as e:
         return [TextContent(
             type="text",
-            text=json.dumps({"error": str(e)})
+            text=_dumps({"error": str(e)})
         )]
 
 
@@ -143,6 +207,13 @@ async def health(request):
     return JSONResponse({"status": "running", "service": "mcp-server"})
 
 
+# Drop all cached tool results (e.g. after a bulk re-ingest)
+async def flush_cache(request):
+    flushed = len(_result_cache)
+    _result_cache.clear()
+    return JSONResponse({"status": "flushed", "entries": flushed})
+
+
 # Set up SSE transport
 sse = SseServerTransport("/messages/")
 
@@ -159,6 +230,7 @@ async def handle_sse(request):
 app = Starlette(
     routes=[
         Route("/health", health),
+        Route("/cache/flush", flush_cache, methods=["POST"]),
         Route("/sse", handle_sse),
         Mount("/messages/", app=sse.handle_post_message),
     ]
@@ -125,7 +125,7 @@ def search_knowledge(query: str, limit: int = 10,
         LEFT JOIN research.chunk_evaluations ce ON dc.id = ce.chunk_id
         WHERE dc.embedding IS NOT NULL
             AND (ce.trust_score IS NULL OR ce.trust_score >= %s)
-        ORDER BY dc.embedding <=> %s::vector
+        ORDER BY dc.embedding::halfvec(768) <=> %s::halfvec(768)
         LIMIT %s""",
         (embedding_str, min_trust, embedding_str, limit),
         fetch=True
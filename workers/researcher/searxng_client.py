@@ -1,7 +1,8 @@
 """Tier 0: Real web search via SearXNG for discovering DTC code URLs."""
 import os
 import time
-import requests
+
+from shared.http_client import get_session
 
 SEARXNG_BASE_URL = os.environ.get("SEARXNG_URL", "http://searxng:8080")
 SEARXNG_TIMEOUT = int(os.environ.get("SEARXNG_TIMEOUT", 15))
@@ -24,7 +25,7 @@ def search_dtc(dtc_code, focus=None):
         query += f" {focus}"
 
     try:
-        resp = requests.get(
+        resp = get_session().get(
             f"{SEARXNG_BASE_URL}/search",
             params={
                 "q": query,
@@ -23,3 +23,12 @@ class Config:
     WORKER_QUEUE = os.environ.get("WORKER_QUEUE", "jobs:default")
     NEXT_QUEUE = os.environ.get("NEXT_QUEUE", "")
     POLL_TIMEOUT = int(os.environ.get("POLL_TIMEOUT", 5))
+    WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", 1))
+    EVAL_CONCURRENCY = int(os.environ.get("EVAL_CONCURRENCY", 4))
+    EVAL_BATCH_SIZE = int(os.environ.get("EVAL_BATCH_SIZE", 4))
+    # Opt-in: reuses a near-duplicate text's vector without comparing
+    # embeddings, so it trades exactness for fewer Ollama calls
+    EMBED_FUZZY_CACHE = (
+        os.environ.get("EMBED_FUZZY_CACHE", "false").lower() == "true"
+    )
+    MAX_DOC_BYTES = int(os.environ.get("MAX_DOC_BYTES", 100 * 1024 * 1024))
@@ -4,11 +4,13 @@ import psycopg2
 import psycopg2.pool
 from shared.config import Config
 import logging
+import threading
 import time
 
 logger = logging.getLogger(__name__)
 
 _pool = None
+_thread_state = threading.local()
 
 
 def get_pool():
@@ -81,14 +83,43 @@ def get_connection(max_retries=3, retry_delay=1):
     raise psycopg2.OperationalError("Failed to get valid connection after retries")
 
 
-def return_connection(conn):
-    """Return a connection to the pool."""
+def return_connection(conn, close=False):
+    """Return a connection to the pool.
+
+    Pass close=True (or return an already-closed connection) to discard
+    it instead of handing it to the next caller.
+    """
     try:
-        get_pool().putconn(conn)
+        get_pool().putconn(conn, close=close or bool(conn.closed))
     except Exception as e:
         logger.warning(f"Failed to return connection to pool: {e}")
 
 
+def get_thread_connection():
+    """Return the calling thread's held connection, checking one out if needed.
+
+    For long-lived worker threads that run many short jobs: each thread
+    keeps one pooled connection for its lifetime instead of going
+    through the pool (and its lock) per job. Callers must end their
+    transaction before returning; the pool closes held connections on
+    shutdown. Keep the number of such threads below the pool's maxconn.
+    """
+    conn = getattr(_thread_state, "conn", None)
+    if conn is None or conn.closed:
+        if conn is not None:
+            return_connection(conn)
+        conn = _thread_state.conn = get_connection()
+    return conn
+
+
+def drop_thread_connection():
+    """Discard the calling thread's held connection after an error."""
+    conn = getattr(_thread_state, "conn", None)
+    _thread_state.conn = None
+    if conn is not None:
+        return_connection(conn, close=True)
+
+
 def execute_query(query, params=None, fetch=False, max_retries=2):
     """Execute a query with automatic retry on connection failure."""
     last_exception = None
@@ -0,0 +1,31 @@
+"""Process-wide HTTP session for Ollama, SearXNG and OpenAI calls."""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Lazily create the shared keep-alive session.
+
+    Connections are pooled per host, so repeated Ollama, SearXNG and
+    OpenAI calls reuse open sockets (and TLS sessions) instead of
+    reconnecting for every request. The
+    pool is sized for the worker thread pools that share it.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=10, pool_maxsize=40)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
@@ -66,6 +66,29 @@ def store_bytes(key, data, content_type="application/octet-stream"):
     return key
 
 
+def store_stream(key, stream, length, content_type="text/plain"):
+    """Store content read from a file-like object as a MinIO object.
+
+    Args:
+        key: Object key.
+        stream: Binary file-like object positioned at the start of the data.
+        length: Number of bytes to read from stream.
+        content_type: MIME type.
+
+    Returns:
+        str: The object key.
+    """
+    client = get_minio()
+    client.put_object(
+        Config.MINIO_BUCKET,
+        key,
+        stream,
+        length=length,
+        content_type=content_type
+    )
+    return key
+
+
 def get_content(key):
     """Retrieve text content from MinIO.
 
@@ -1,7 +1,23 @@
 """Client for Ollama LLM API (embeddings and text generation)."""
-import requests
 import json
 from shared.config import Config
+from shared.http_client import get_session
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _response_json(response):
+    """Decode a JSON response body, with orjson when it is installed.
+
+    Embedding responses are hundreds of floats per input, where orjson
+    decodes several times faster than the stdlib parser.
+    """
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
 
 
 def generate_embedding(text, model=None, base_url=None):
@@ -24,13 +40,54 @@ def generate_embedding(text, model=None, base_url=None):
         "model": model or Config.EMBEDDING_MODEL,
         "prompt": text
     }
-    response = requests.post(url, json=payload, timeout=120)
+    response = get_session().post(url, json=payload, timeout=120)
     response.raise_for_status()
-    return response.json()["embedding"]
+    return _response_json(response)["embedding"]
+
+
+def generate_embeddings_batch(texts, model=None, base_url=None,
+                              batch_size=64):
+    """Generate embeddings for many texts with as few requests as possible.
+
+    Texts are sent batch_size at a time to Ollama's /api/embed endpoint,
+    which embeds a list of inputs in one call. Servers that predate
+    /api/embed (404) are handled by falling back to one
+    generate_embedding call per text.
+
+    Args:
+        texts: Input texts to embed.
+        model: Model name override. Default: Config.EMBEDDING_MODEL.
+        base_url: Ollama URL override. Default: Config.OLLAMA_BASE_URL.
+        batch_size: Maximum number of texts per request.
+
+    Returns:
+        list[list[float]]: One embedding per input text, in order.
+
+    Raises:
+        requests.exceptions.RequestException: On HTTP failure.
+    """
+    url = f"{base_url or Config.OLLAMA_BASE_URL}/api/embed"
+    model = model or Config.EMBEDDING_MODEL
+    embeddings = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        response = get_session().post(
+            url, json={"model": model, "input": batch},
+            timeout=120 + 10 * len(batch)
+        )
+        if response.status_code == 404:
+            return embeddings + [
+                generate_embedding(text, model=model, base_url=base_url)
+                for text in texts[start:]
+            ]
+        response.raise_for_status()
+        embeddings.extend(_response_json(response)["embeddings"])
+    return embeddings
 
 
 def generate_completion(prompt, model=None, base_url=None, temperature=0.1,
-                        system_prompt=None, format_json=False):
+                        system_prompt=None, format_json=False,
+                        max_tokens=None):
     """Generate a text completion from Ollama.
 
     Args:
@@ -40,6 +97,7 @@ def generate_completion(prompt, model=None, base_url=None, temperature=0.1,
         temperature: Sampling temperature (lower = more deterministic).
         system_prompt: Optional system-level instruction.
         format_json: If True, request structured JSON output from Ollama.
+        max_tokens: Optional cap on generated tokens (Ollama num_predict).
 
     Returns:
         str: The generated text.
@@ -57,10 +115,12 @@ def generate_completion(prompt, model=None, base_url=None, temperature=0.1,
         payload["system"] = system_prompt
     if format_json:
         payload["format"] = "json"
+    if max_tokens:
+        payload["options"]["num_predict"] = max_tokens
 
-    response = requests.post(url, json=payload, timeout=300)
+    response = get_session().post(url, json=payload, timeout=300)
     response.raise_for_status()
-    return response.json()["response"]
+    return _response_json(response)["response"]
 
 
 def ensure_model_available(model_name, base_url=None):
@@ -72,7 +132,7 @@ def ensure_model_available(model_name, base_url=None):
     tags_url = f"{url_base}/api/tags"
 
     try:
-        response = requests.get(tags_url, timeout=30)
+        response = get_session().get(tags_url, timeout=30)
         response.raise_for_status()
         models = [m["name"] for m in response.json().get("models", [])]
         if model_name in models or f"{model_name}:latest" in models:
@@ -83,7 +143,7 @@ def ensure_model_available(model_name, base_url=None):
 
     print(f"Pulling model {model_name} (this may take several minutes)...")
     pull_url = f"{url_base}/api/pull"
-    response = requests.post(
+    response = get_session().post(
         pull_url,
         json={"name": model_name},
         stream=True,
@@ -14,6 +14,7 @@ import time
 import json
 import requests
 
+from shared.http_client import get_session
 from shared.redis_client import get_redis
 
 OPENAI_API_BASE = "https://api.openai.com/v1"
@@ -234,7 +235,7 @@ def chat_completion(messages, model="gpt-4o-mini", temperature=0.1,
         raise RuntimeError("No OpenAI API keys available (all rate-limited)")
 
     try:
-        resp = requests.post(
+        resp = get_session().post(
             f"{OPENAI_API_BASE}/chat/completions",
             headers={
                 "Authorization": f"Bearer {api_key}",
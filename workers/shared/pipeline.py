@@ -80,3 +80,51 @@ def get_document_info(doc_id):
            FROM research.documents WHERE id = %s""",
         (doc_id,)
     )
+
+
+def iter_document_chunks(doc_id, batch_size=256, min_relevance=None):
+    """Yield a document's chunks in chunk_index order, a batch at a time.
+
+    Each batch is a short keyset query (chunk_index > last seen) on its
+    own pooled connection, so memory stays bounded by batch_size and no
+    transaction is held open while the caller works on a batch.
+
+    Args:
+        doc_id: Document UUID string.
+        batch_size: Maximum rows per batch.
+        min_relevance: If set, skip chunks whose evaluation scored below
+            it. Chunks not yet evaluated are always included.
+
+    Yields:
+        list: Up to batch_size (chunk_id, content) tuples.
+    """
+    last_index = -1
+    while True:
+        if min_relevance is None:
+            rows = execute_query(
+                """SELECT id, content, chunk_index
+                   FROM research.document_chunks
+                   WHERE document_id = %s AND chunk_index > %s
+                   ORDER BY chunk_index
+                   LIMIT %s""",
+                (doc_id, last_index, batch_size), fetch=True
+            )
+        else:
+            rows = execute_query(
+                """SELECT dc.id, dc.content, dc.chunk_index
+                   FROM research.document_chunks dc
+                   LEFT JOIN research.chunk_evaluations ce
+                       ON dc.id = ce.chunk_id
+                   WHERE dc.document_id = %s AND dc.chunk_index > %s
+                     AND (ce.relevance_score IS NULL
+                          OR ce.relevance_score >= %s)
+                   ORDER BY dc.chunk_index
+                   LIMIT %s""",
+                (doc_id, last_index, min_relevance, batch_size), fetch=True
+            )
+        if not rows:
+            return
+        yield [(chunk_id, content) for chunk_id, content, _ in rows]
+        if len(rows) < batch_size:
+            return
+        last_index = rows[-1][2]